@@ -21,20 +21,59 @@ __maintainer_email__ = "michael.statt@modelyst.io"
 __version__ = "1.0.0a7"
 
 
-from sqlalchemy.orm import registry
-
-# External packages that we reexport for convenience
-from sqlmodel import select
-
-from dbgen.core.args import Constant
-from dbgen.core.decorators import transform
-from dbgen.core.entity import BaseEntity, Entity
-from dbgen.core.etl_step import ETLStep
-from dbgen.core.func import Environment, Import
-from dbgen.core.model import Model
-from dbgen.core.model_settings import BaseModelSettings
-from dbgen.core.node.extract import Extract
-from dbgen.core.node.query import Query
-from dbgen.core.node.transforms import PythonTransform
-from dbgen.core.tags import tags
-from dbgen.utils.typing import IDType
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, Dict, List
+
+# Public names are imported lazily on first access so that importing dbgen (and the CLI) stays cheap
+_LAZY_IMPORTS: Dict[str, str] = {
+    # External packages that we reexport for convenience
+    'registry': 'sqlalchemy.orm',
+    'select': 'sqlmodel',
+    'Constant': 'dbgen.core.args',
+    'transform': 'dbgen.core.decorators',
+    'BaseEntity': 'dbgen.core.entity',
+    'Entity': 'dbgen.core.entity',
+    'ETLStep': 'dbgen.core.etl_step',
+    'Environment': 'dbgen.core.func',
+    'Import': 'dbgen.core.func',
+    'Model': 'dbgen.core.model',
+    'BaseModelSettings': 'dbgen.core.model_settings',
+    'Extract': 'dbgen.core.node.extract',
+    'Query': 'dbgen.core.node.query',
+    'PythonTransform': 'dbgen.core.node.transforms',
+    'tags': 'dbgen.core.tags',
+    'IDType': 'dbgen.utils.typing',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted({*globals(), *_LAZY_IMPORTS})
+
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import registry  # pragma: no cover
+    from sqlmodel import select  # pragma: no cover
+
+    from dbgen.core.args import Constant  # pragma: no cover
+    from dbgen.core.decorators import transform  # pragma: no cover
+    from dbgen.core.entity import BaseEntity, Entity  # pragma: no cover
+    from dbgen.core.etl_step import ETLStep  # pragma: no cover
+    from dbgen.core.func import Environment, Import  # pragma: no cover
+    from dbgen.core.model import Model  # pragma: no cover
+    from dbgen.core.model_settings import BaseModelSettings  # pragma: no cover
+    from dbgen.core.node.extract import Extract  # pragma: no cover
+    from dbgen.core.node.query import Query  # pragma: no cover
+    from dbgen.core.node.transforms import PythonTransform  # pragma: no cover
+    from dbgen.core.tags import tags  # pragma: no cover
+    from dbgen.utils.typing import IDType  # pragma: no cover
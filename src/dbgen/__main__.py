@@ -15,9 +15,11 @@ import sys
 from os import getcwd
 
 from dbgen.cli.main import app
+from dbgen.utils.log import install_rich_traceback
 
 
 def main():
+    install_rich_traceback()
     app()
 
 
@@ -19,13 +19,9 @@ from typing import List, Optional, Tuple
 from uuid import UUID
 
 import typer
-from sqlmodel import Session, func, select
 
-from dbgen.configuration import get_engines, stdout_handler
-from dbgen.core.metadata import ETLStepEntity, ETLStepRunEntity, RunEntity
-from dbgen.core.run.etl_step_run import RemoteETLStepRun
-from dbgen.core.run.utilities import RunConfig
-from dbgen.utils.log import LogLevel
+from dbgen.configuration import get_engines
+from dbgen.utils.log import LogLevel, StdoutCapture
 
 if TYPE_CHECKING:
     from sqlalchemy.future import Engine  # pragma: no cover
@@ -36,6 +32,10 @@ etl_step_app = typer.Typer()
 def get_runnable_etl_steps(
     all_runs: bool = True, meta_engine: Optional['Engine'] = None
 ) -> GenType[Tuple[str, datetime, UUID], None, None]:
+    from sqlmodel import Session, func, select
+
+    from dbgen.core.metadata import ETLStepEntity, ETLStepRunEntity, RunEntity
+
     statement = (
         select(  # type: ignore
             ETLStepEntity.name,
@@ -88,7 +88,17 @@ def run_etl_step(
     start: Optional[str] = typer.Option(None, help="ETLStep to start run at"),
     until: Optional[str] = typer.Option(None, help="ETLStep to finish run at."),
     batch: Optional[int] = typer.Option(None, help="Batch size for all etl_steps"),
+    capture_stdout: StdoutCapture = typer.Option(
+        StdoutCapture.ALWAYS, help="When to redirect the stdout of transforms into the debug logs."
+    ),
 ):
+    from sqlmodel import Session
+
+    from dbgen.configuration import stdout_handler
+    from dbgen.core.metadata import ETLStepRunEntity, RunEntity
+    from dbgen.core.run.etl_step_run import RemoteETLStepRun
+    from dbgen.core.run.utilities import RunConfig
+
     # Retrieve the configured engines for
     main_engine, meta_engine = get_engines()
     run_config: RunConfig = RunConfig(
@@ -100,6 +110,7 @@ def run_etl_step(
         progress_bar=False,
         batch_size=batch,
         log_level=level,
+        capture_stdout=capture_stdout,
     )
     stdout_handler.setLevel(level.get_log_level())
     # Validate that the etl_step id provided is in the ETLStepEntity Table for remote running
@@ -25,7 +25,8 @@ from dbgen.cli.model import model_app
 from dbgen.cli.new import new_app
 from dbgen.cli.options import chdir_option, config_option
 from dbgen.cli.run import run_app
-from dbgen.configuration import config, get_connections
+from dbgen.configuration import get_config as get_dbgen_config
+from dbgen.configuration import get_connections
 from dbgen.utils.misc import which
 
 app = typer.Typer(no_args_is_help=True)
@@ -64,6 +65,7 @@ def get_config(
     """
     Prints out the configuration of dbgen given an optional config_file or using the envvar DBGEN_CONFIG
     """
+    config = get_dbgen_config()
     styles.theme_typer_print(styles.LOGO_STYLE)
     # If out_pth provided write the current config to the path provided and return
     if out_pth:
@@ -114,7 +116,7 @@ def test_conn(
                 raise typer.Exit(2)
             # If we have valid executible run the command with the dsn provided
             command = exes[0]
-            if command is not None and not config.testing:
+            if command is not None and not get_dbgen_config().testing:
                 subprocess.check_call(
                     [command, conn.url(False, True)],
                 )
@@ -21,8 +21,6 @@ from uuid import UUID
 import typer
 from rich.console import Console
 from rich.table import Table
-from sqlalchemy import update
-from sqlmodel import Session, select
 
 import dbgen.cli.styles as styles
 from dbgen.cli.options import (
@@ -33,8 +31,7 @@ from dbgen.cli.options import (
     verbose_option,
 )
 from dbgen.cli.utils import state, test_connection, validate_model_str
-from dbgen.configuration import config, get_connections
-from dbgen.core.metadata import ModelEntity
+from dbgen.configuration import get_config, get_connections
 
 model_app = typer.Typer(name='model', no_args_is_help=True)
 
@@ -42,6 +39,10 @@ model_app = typer.Typer(name='model', no_args_is_help=True)
 @model_app.command('list')
 def list_models(config_file: Path = config_option, tags: List[str] = typer.Option(None, '-t')):
     """List the models in the metadatabase."""
+    from sqlmodel import Session, select
+
+    from dbgen.core.metadata import ModelEntity
+
     # Notify of config file
     _, meta_conn = get_connections()
     test_connection(meta_conn)
@@ -73,6 +74,11 @@ def list_models(config_file: Path = config_option, tags: List[str] = typer.Optio
 
 @model_app.command('tag')
 def tag(model_id: UUID, tags: List[str], config_file: Path = config_option):
+    from sqlalchemy import update
+    from sqlmodel import Session, select
+
+    from dbgen.core.metadata import ModelEntity
+
     # Notify of config file
     _, meta_conn = get_connections()
     test_connection(meta_conn)
@@ -96,6 +102,10 @@ def model_serialize(
     ),
     config_file: Path = config_option,
 ):
+    from sqlmodel import Session, select
+
+    from dbgen.core.metadata import ModelEntity
+
     model = validate_model_str(model_str)
 
     # Notify of config file
@@ -127,6 +137,9 @@ def model_export(
     ),
     config_file: Path = config_option,
 ):
+    from sqlmodel import Session, select
+
+    from dbgen.core.metadata import ModelEntity
 
     # Notify of config file
     _, meta_conn = get_connections()
@@ -145,6 +158,24 @@ def model_export(
     styles.good_typer_print(f"Wrote serialized graph to {out_file}")
 
 
+@model_app.command('compile')
+def model_compile(
+    model_str: str = model_string_option,
+    out_file: Path = typer.Option(
+        'compiled_model.json', '-o', '--out', help='Path to write the compiled model artifact to'
+    ),
+    config_file: Path = config_option,
+    _chdir: Path = chdir_option,
+):
+    """Validate a model and write an artifact that dbgen run --compiled can load without re-validating."""
+    from dbgen.core.compiled_model import CompiledModel
+
+    model_str = model_str or get_config().model_str
+    model = validate_model_str(model_str)
+    CompiledModel.compile(model, model_str).write(out_file)
+    styles.good_typer_print(f"Compiled Model(name={model.name!r}) to {out_file}")
+
+
 @model_app.command('validate')
 def validate(
     model_str: str = model_string_option,
@@ -155,7 +186,7 @@ def validate(
     """Quick utility method for quickly validating a model will compile without any need for database connections."""
     # Start connection from config
     # Use config model_str if none is provided
-    model_str = model_str or config.model_str
+    model_str = model_str or get_config().model_str
     model = validate_model_str(model_str)
     styles.good_typer_print(f"Model(name={model.name!r}) was successfully validated")
     styles.good_typer_print(
@@ -19,13 +19,6 @@ import typer
 
 from dbgen.cli.styles import bad_typer_print
 
-try:
-    from cookiecutter.main import cookiecutter  # type: ignore
-
-    has_cookiecutter = True
-except ImportError:
-    has_cookiecutter = False
-
 # Create project from the cookiecutter-pypackage.git repo template
 new_app = typer.Typer(name='new')
 
@@ -48,8 +41,10 @@ def new(
     output_dir: Path = typer.Option(Path('.'), '--output', '-o'),
     config_file: Path = typer.Option(None, '--config', '-c'),
 ):
-
-    if not has_cookiecutter:
+    # cookiecutter is slow to import so it is only loaded when creating a new model
+    try:
+        from cookiecutter.main import cookiecutter  # type: ignore
+    except ImportError:
         from dbgen import __version__
 
         bad_typer_print(
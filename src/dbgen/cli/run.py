@@ -23,7 +23,6 @@ import typer
 from rich.console import Console
 from rich.table import Column, Table
 from rich.text import Text
-from sqlmodel import Session, select
 
 import dbgen.cli.styles as styles
 import dbgen.exceptions as exceptions
@@ -34,12 +33,15 @@ from dbgen.cli.options import (
     model_string_option,
     version_option,
 )
-from dbgen.cli.queries import get_runs
-from dbgen.cli.utils import confirm_build, set_confirm, test_connection, validate_model_str
-from dbgen.configuration import config, get_connections, root_logger, stdout_handler
-from dbgen.core.metadata import ETLStepRunEntity, ModelEntity, RunEntity, Status
-from dbgen.core.run.utilities import RunConfig
-from dbgen.utils.log import LogLevel, add_file_handler
+from dbgen.cli.utils import (
+    add_cwd_to_path,
+    confirm_build,
+    set_confirm,
+    test_connection,
+    validate_model_str,
+)
+from dbgen.configuration import RowCount, get_config, get_connections
+from dbgen.utils.log import LogLevel, StdoutCapture, add_file_handler
 
 run_app = typer.Typer(name='run')
 logger = getLogger(__name__)
@@ -58,6 +60,9 @@ def status(
     _config_file: Path = config_option,
 ):
     """Print a table summarizing DBgen Model runs."""
+    from dbgen.cli.queries import get_runs
+    from dbgen.core.metadata import ETLStepRunEntity
+
     column_dict = {'error': Column('Error'), 'status': Column('Status', style='green')}
     _, meta_conn = get_connections()
     test_connection(meta_conn)
@@ -131,8 +136,21 @@ def run_model(
     ),
     level: LogLevel = typer.Option(LogLevel.INFO, help='Use the RemoteETLStep Runner'),
     bar: bool = typer.Option(True, help="Show progress bar"),
-    skip_row_count: bool = typer.Option(False, help="Show progress bar"),
+    skip_row_count: bool = typer.Option(
+        False, help="Skip counting the rows to extract (same as --row-count skip)."
+    ),
+    row_count: RowCount = typer.Option(
+        RowCount.EXACT,
+        help="How to count the rows to extract: an exact count, the planner's estimate, "
+        "the estimate replaced by an exact count in the background (lazy), or skip counting.",
+    ),
     skip_on_error: bool = typer.Option(False, help="Skip a row in etl_step on error"),
+    capture_stdout: StdoutCapture = typer.Option(
+        StdoutCapture.ALWAYS, help="When to redirect the stdout of transforms into the debug logs."
+    ),
+    stdout_sample_rate: int = typer.Option(
+        100, help="Capture the stdout of one in every N transform calls when --capture-stdout=sampled."
+    ),
     fast_fail: bool = typer.Option(
         False, '--fast-fail', help="Exclude all downstream ETLSteps once one has failed."
     ),
@@ -141,6 +159,12 @@ def run_model(
     ),
     batch: Optional[int] = typer.Option(None, help="Batch size for all etl_steps in run."),
     batch_number: int = typer.Option(10, help="Default number of batches per etl_step."),
+    itersize: Optional[int] = typer.Option(
+        None, help="Rows fetched per round trip from the server side cursors of queries."
+    ),
+    metrics_interval: float = typer.Option(
+        1.0, help="Seconds between writes of an etl_step's progress to the metadatabase."
+    ),
     pdb: bool = typer.Option(False, '--pdb', help="Drop into pdb on breakpoints"),
     log_file: Path = log_file_option,
     log_file_level: LogLevel = typer.Option(
@@ -161,19 +185,40 @@ def run_model(
         False,
         help="Only rerun the etl_steps that failed or were excluded in the previous run.",
     ),
+    compiled: Optional[Path] = typer.Option(
+        None,
+        help="Load the model from this compiled artifact, recompiling it first if the model's source has changed.",
+    ),
     version: bool = version_option,
     _chdir: Path = chdir_option,
 ):
     """Run a model."""
     if ctx.invoked_subcommand is not None:
         return
+    from sqlmodel import Session, select
+
+    from dbgen.configuration import root_logger, stdout_handler
+    from dbgen.core.metadata import RunEntity, Status
+    from dbgen.core.run.utilities import RunConfig
+
+    config = get_config()
     # Start connection from config
     main_conn, meta_conn = get_connections()
     # Use config model_str if none is provided
     if model_str is None:
         model_str = config.model_str
-    # validate the model_str
-    model = validate_model_str(model_str)
+    # validate the model_str, unless an up to date compiled model exists
+    if compiled:
+        from dbgen.core.compiled_model import CompiledModel, load_compiled_model
+
+        add_cwd_to_path()
+        model = load_compiled_model(compiled, model_str)
+        if model is None:
+            model = validate_model_str(model_str)
+            CompiledModel.compile(model, model_str).write(compiled)
+            logger.info(f"Recompiled model to {compiled}")
+    else:
+        model = validate_model_str(model_str)
     styles.delimiter(styles.typer.colors.GREEN)
     styles.good_typer_print(f"Running model [theme]{model.name!r}[/theme]...")
     styles.delimiter(styles.typer.colors.GREEN)
@@ -187,11 +232,16 @@ def run_model(
         progress_bar=bar,
         log_level=level,
         skip_row_count=skip_row_count,
+        row_count=row_count,
         fast_fail=fast_fail,
         fail_downstream=fail_downstream,
         skip_on_error=skip_on_error,
+        capture_stdout=capture_stdout,
+        stdout_sample_rate=stdout_sample_rate,
         batch_size=batch,
+        itersize=itersize,
         batch_number=batch_number,
+        metrics_interval=metrics_interval,
         cpu_count=user_cpu_count or cpu_count(),
     )
     # Set the stdout logger to the --level value
@@ -280,11 +330,15 @@ def run_model(
 @run_app.command('initialize')
 def run_initialize(model_id: UUID, config_file: Path = config_option):
     """Initialize a run."""
+    from sqlmodel import Session
+
+    from dbgen.core.metadata import ModelEntity, RunEntity
+
     # Notify of config file
     _, meta_conn = get_connections()
     test_connection(meta_conn)
     meta_engine = meta_conn.get_engine()
-    typer.echo(config.display())
+    typer.echo(get_config().display())
     with Session(meta_engine) as session:
         model = session.get(ModelEntity, model_id)
         if not model:
@@ -24,9 +24,9 @@ from rich.traceback import Traceback
 
 from dbgen.cli.styles import LOGO_STYLE, bad_typer_print, typer_print
 from dbgen.configuration import update_config
-from dbgen.core.model import Model
 
 if TYPE_CHECKING:
+    from dbgen.core.model import Model  # pragma: no cover
     from dbgen.utils.sql import Connection  # pragma: no cover
 
 # Errors
@@ -93,7 +93,12 @@ def version_callback(value: bool):
         raise typer.Exit()
 
 
-def validate_model_str(model_str: str) -> Model:
+def add_cwd_to_path() -> None:
+    """Add the current working directory to the front of the path so the user's model can be imported."""
+    sys.path.insert(0, os.getcwd())
+
+
+def validate_model_str(model_str: str) -> 'Model':
     """
     Validate the user input model import str checking for malformed and invalid inputs.py
 
@@ -106,9 +111,10 @@ def validate_model_str(model_str: str) -> Model:
     Returns:
         Model: the output model after checks are in place
     """
+    from dbgen.core.model import Model
+
     # Add current workind directory to the path at the end
-    cwd = os.getcwd()
-    sys.path.insert(0, cwd)
+    add_cwd_to_path()
 
     basic_error = lambda fmt, val: typer.BadParameter(fmt.format(*val), param_hint='--model')
 
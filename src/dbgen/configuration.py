@@ -16,19 +16,21 @@
 import os
 import tempfile
 from enum import Enum
+from logging import Logger
 from pathlib import Path
 from textwrap import dedent
-from typing import TYPE_CHECKING, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Optional, Tuple
 
 from pydantic import BaseSettings, PostgresDsn, SecretStr, validator
-from pydantic.tools import parse_obj_as
 
 from dbgen.utils.log import LogLevel, setup_logger
-from dbgen.utils.sql import Connection
 
 if TYPE_CHECKING:
+    from rich.logging import RichHandler  # pragma: no cover
     from sqlalchemy.future import Engine  # pragma: no cover
 
+    from dbgen.utils.sql import Connection  # pragma: no cover
+
 
 # Force postgresql schemes for connection for sqlalchemy
 class PostgresqlDsn(PostgresDsn):
@@ -42,13 +44,23 @@ class ValidationEnum(str, Enum):
     OFF = 'off'
 
 
+class RowCount(str, Enum):
+    """How the number of rows an ETLStep will extract is counted before extraction."""
+
+    EXACT = 'exact'
+    ESTIMATE = 'estimate'
+    LAZY = 'lazy'
+    SKIP = 'skip'
+
+
 hidden_options = ('pdb', 'testing')
 
 
 class DBgenConfiguration(BaseSettings):
     """Settings for the pg4j, especially database connections."""
 
-    main_dsn: PostgresqlDsn = parse_obj_as(PostgresqlDsn, "postgresql://postgres@localhost:5432/dbgen")
+    # Validated on construction as BaseSettings validates defaults
+    main_dsn: PostgresqlDsn = "postgresql://postgres@localhost:5432/dbgen"  # type: ignore
     main_schema: str = "public"
     main_password: SecretStr = ""  # type: ignore
     meta_dsn: Optional[PostgresqlDsn]
@@ -109,15 +121,47 @@ class DBgenConfiguration(BaseSettings):
         return self.display()
 
 
-config = DBgenConfiguration()
-root_logger, stdout_handler = setup_logger(config.log_level, config.log_level)
+_config: Optional[DBgenConfiguration] = None
+_logger: Optional[Tuple[Logger, 'RichHandler']] = None
+
+
+def get_config() -> DBgenConfiguration:
+    """Get the global configuration, reading it and setting up the dbgen logger on first use."""
+    global _config, _logger
+    if _config is None:
+        _config = DBgenConfiguration()
+        _logger = setup_logger(_config.log_level, _config.log_level)
+    return _config
+
+
+def _get_logger() -> Tuple[Logger, 'RichHandler']:
+    get_config()
+    assert _logger is not None
+    return _logger
+
+
+def __getattr__(name: str) -> Any:
+    # The config and logger are only built once something asks for them, which keeps the CLI startup fast
+    if name == 'config':
+        return get_config()
+    if name == 'root_logger':
+        return _get_logger()[0]
+    if name == 'stdout_handler':
+        return _get_logger()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if TYPE_CHECKING:
+    config: DBgenConfiguration  # pragma: no cover
+    root_logger: Logger  # pragma: no cover
+    stdout_handler: 'RichHandler'  # pragma: no cover
 
 
 def update_config(config_file: 'Path') -> DBgenConfiguration:
-    global config
+    config = get_config()
     input_config = DBgenConfiguration(_env_file=config_file)
     if input_config.meta_schema != config.meta_schema:
-        root_logger.warning(
+        _get_logger()[0].warning(
             f"WARNING: Input config file {str(config_file)!r} has a meta_schema value set that is different than the current value at {DBgenConfiguration.Config.env_file!r}."
             " This setting will be ignored as setting the meta_schema in an CLI input config file is not fully implemented."
             " To set this variable, please use the DBGEN_CONFIG environmental variable rather than the -c/--config CLI argument."
@@ -128,6 +172,10 @@ def update_config(config_file: 'Path') -> DBgenConfiguration:
 
 
 def get_connections() -> Tuple['Connection', 'Connection']:
+    # Imported here as sqlalchemy and psycopg are slow to import and not needed to read the config
+    from dbgen.utils.sql import Connection
+
+    config = get_config()
     main_conn = Connection.from_uri(config.main_dsn, config.main_schema, password=config.main_password)
     meta_dsn = config.meta_dsn or config.main_dsn
     meta_password = config.meta_password or config.main_password
@@ -12,18 +12,30 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import json
 import logging
-from datetime import date, datetime
+import zlib
+from copy import deepcopy
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from hashlib import md5
 from pathlib import Path, PosixPath
-from typing import Any, Callable, ClassVar, Dict, Tuple, TypeVar, Union
+from typing import Any, Callable, ClassVar, Dict, Optional, Set, Tuple, Type, TypeVar, Union
 from uuid import UUID
 
-from pydantic import BaseModel, Field
-from pydantic.fields import FieldInfo
+from pydantic import BaseModel, Field, PrivateAttr
+from pydantic.fields import FieldInfo, Undefined
 from pydantic.main import ModelMetaclass
-from pydasher import HashMixIn
+from pydasher import HashMixIn, hasher
+from pydasher.datatypes import DefaultTypes
+from pydasher.import_module import import_string
+from pydasher.serialization import MODEL_TYPE_NAME, TYPE_NAME, VALUE_NAME, serialize
+
+from dbgen.exceptions import SerializationError
 
 _T = TypeVar("_T")
+_BaseT = TypeVar("_BaseT", bound="Base")
 
 
 def __dataclass_transform__(
@@ -49,6 +61,145 @@ encoders = {
     PosixPath: lambda x: str(x),
 }
 
+# Binary format: magic bytes, the object's hash, an md5 checksum of the payload, then the zlib compressed json
+BINARY_MAGIC = b'DBG1'
+_BINARY_HEADER_LENGTH = len(BINARY_MAGIC) + 32
+
+
+def _frozen_error(self, *_args, **_kwargs):
+    raise TypeError(f"{type(self).__name__} belongs to a frozen dbgen object and cannot be modified")
+
+
+class FrozenList(list):
+    """A list field of a frozen Base object, it hashes and serializes like a list but cannot be modified."""
+
+    append = extend = insert = pop = remove = clear = sort = reverse = _frozen_error
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _frozen_error
+
+    def __reduce__(self):
+        return (type(self), (list(self),))
+
+
+class FrozenDict(dict):
+    """A dict field of a frozen Base object, it hashes and serializes like a dict but cannot be modified."""
+
+    pop = popitem = clear = update = setdefault = _frozen_error
+    __setitem__ = __delitem__ = __ior__ = _frozen_error
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+
+class FrozenSet(set):
+    """A set field of a frozen Base object, it hashes and serializes like a set but cannot be modified."""
+
+    add = discard = remove = pop = clear = update = _frozen_error
+    intersection_update = difference_update = symmetric_difference_update = _frozen_error
+    __ior__ = __iand__ = __isub__ = __ixor__ = _frozen_error
+
+    def __reduce__(self):
+        return (type(self), (list(self),))
+
+
+def _freeze(thing: Any) -> Any:
+    """Freeze a field value in place where possible, returning the read only version of any container."""
+    if isinstance(thing, Base):
+        if thing._memoize_hash and not thing._frozen:
+            for key in thing._hashed_fields():
+                thing.__dict__[key] = _freeze(thing.__dict__[key])
+            object.__setattr__(thing, '_frozen', True)
+        return thing
+    if isinstance(thing, list):
+        return FrozenList(_freeze(val) for val in thing)
+    if isinstance(thing, tuple) and not hasattr(thing, '_fields'):
+        return tuple(_freeze(val) for val in thing)
+    if isinstance(thing, dict):
+        return FrozenDict((key, _freeze(val)) for key, val in thing.items())
+    if isinstance(thing, set):
+        return FrozenSet(_freeze(val) for val in thing)
+    return thing
+
+
+_model_types: Dict[str, Type[BaseModel]] = {}
+_constructors: Dict[str, Callable[[Any], Any]] = {
+    DefaultTypes.TIMEDELTA.value: lambda x: timedelta(seconds=x),
+    DefaultTypes.DATE.value: date.fromisoformat,
+    DefaultTypes.DATETIME.value: datetime.fromisoformat,
+    DefaultTypes.TIME.value: time.fromisoformat,
+    DefaultTypes.PATH.value: Path,
+    DefaultTypes.DECIMAL.value: Decimal,
+    DefaultTypes.UUID.value: UUID,
+    DefaultTypes.BYTES.value: lambda x: x.encode('utf-8'),
+}
+
+
+def _serialize_settings(thing: Any, serialized: Any, encoders: Dict[Any, Callable[..., Any]]) -> None:
+    """
+    Add the settings of nested models back into their serialization in place.
+
+    pydasher only serializes the hashed fields of nested models, so settings excluded from the hash would
+    otherwise be lost when a model is rebuilt from its serialization, such as during remote runs.
+    """
+    if isinstance(thing, BaseModel) and isinstance(serialized, dict):
+        values = serialized[VALUE_NAME]
+        for key, val in values.items():
+            _serialize_settings(getattr(thing, key, None), val, encoders)
+        for key in sorted(getattr(thing, '_settings_', ())):
+            if key not in values:
+                values[key] = serialize(getattr(thing, key), encoders, id_only=False)
+    elif isinstance(thing, list) and isinstance(serialized, list):
+        for val, serialized_val in zip(thing, serialized):
+            _serialize_settings(val, serialized_val, encoders)
+    elif isinstance(thing, tuple) and isinstance(serialized, dict):
+        for val, serialized_val in zip(thing, serialized[VALUE_NAME]):
+            _serialize_settings(val, serialized_val, encoders)
+    elif isinstance(thing, dict) and isinstance(serialized, dict):
+        for key, serialized_val in serialized[VALUE_NAME].items():
+            _serialize_settings(thing[key], serialized_val, encoders)
+
+
+def deserialize_trusted(serialized_thing: Any) -> Any:
+    """
+    Rebuild objects serialized with Base.serialize without running any pydantic validation.
+
+    Only use this on data written by dbgen itself, as validators and custom __init__ methods are skipped.
+    """
+    if isinstance(serialized_thing, list):
+        return [deserialize_trusted(val) for val in serialized_thing]
+    if not isinstance(serialized_thing, dict):
+        return serialized_thing
+    value = serialized_thing[VALUE_NAME]
+    type_ = serialized_thing[TYPE_NAME]
+    if type_ == DefaultTypes.BASE_MODEL.value:
+        model_string = serialized_thing[MODEL_TYPE_NAME]
+        model_type = _model_types.get(model_string)
+        if model_type is None:
+            model_type = _model_types[model_string] = import_string(model_string)
+        fields = model_type.__fields__
+        values = {}
+        for key, val in value.items():
+            val = deserialize_trusted(val)
+            field = fields.get(key)
+            # Enums are serialized as their raw values so they need to be cast back
+            if (
+                field is not None
+                and isinstance(field.type_, type)
+                and issubclass(field.type_, Enum)
+                and not isinstance(val, (Enum, list, dict, set, tuple, type(None)))
+            ):
+                val = field.type_(val)
+            values[key] = val
+        return model_type.construct(**values)
+    elif type_ == DefaultTypes.DICT.value:
+        return {key: deserialize_trusted(val) for key, val in value.items()}
+    elif type_ == DefaultTypes.TUPLE.value:
+        return tuple(deserialize_trusted(val) for val in value)
+    elif type_ == DefaultTypes.SET.value:
+        return {deserialize_trusted(val) for val in value}
+    elif type_ in _constructors:
+        return _constructors[type_](value)
+    raise TypeError(f"Found unknown type during deserialization:\n{value}\n{type_}")
+
 
 class Base(HashMixIn, BaseModel, metaclass=BaseMeta):
     """Common methods shared by many DbGen objects."""
@@ -57,6 +208,14 @@ class Base(HashMixIn, BaseModel, metaclass=BaseMeta):
     _logger_name: ClassVar[
         Union[Callable[["Base", Dict[str, Any]], str], str]
     ] = lambda cls, _: cls.canonical_name()
+    # Whether frozen copies memoize their hash, see Base.frozen
+    _memoize_hash: ClassVar[bool] = True
+    # Fields that only configure how an object runs, such as batching or concurrency, and not what it outputs.
+    # They are left out of the hash so adding one keeps the ids of existing etl_steps, and are still
+    # serialized when nested so remote runs use the same settings
+    _settings_: ClassVar[Set[str]] = set()
+    _frozen: bool = PrivateAttr(False)
+    _hashcache: Optional[str] = PrivateAttr(None)
 
     def __new__(cls, *_args, **kwargs):
         # Call  cls._logger_name function with class and kwargs as arguments
@@ -77,3 +236,98 @@ class Base(HashMixIn, BaseModel, metaclass=BaseMeta):
 
     def __repr__(self) -> str:
         return f'{self.canonical_name()}({self.hash})'
+
+    @classmethod
+    def _hashed_fields(cls) -> Set[str]:
+        return {
+            key
+            for key in cls.__fields__
+            if key not in cls._hashexclude_ and (cls._hashinclude_ is None or key in cls._hashinclude_)
+        }
+
+    def __setattr__(self, name, value):
+        # Entities are built by sqlalchemy without their private attributes so these are read with getattr
+        if getattr(self, '_frozen', False) and name in self._hashed_fields():
+            raise TypeError(f'{self.canonical_name()} is frozen and its field {name!r} cannot be assigned')
+        super().__setattr__(name, value)
+
+    def _copy_and_set_values(self, *args, **kwargs):
+        # Copies can be updated so they are never frozen and never keep the memoized hash
+        output = super()._copy_and_set_values(*args, **kwargs)
+        object.__setattr__(output, '_frozen', False)
+        object.__setattr__(output, '_hashcache', None)
+        return output
+
+    def __deepcopy__(self: _BaseT, memo: Dict[int, Any]) -> _BaseT:
+        # Pickling drops runtime state such as connections and callables so the copy is built directly,
+        # deep copying the fields and sharing the private attributes
+        output = object.__new__(type(self))
+        memo[id(self)] = output
+        object.__setattr__(output, '__dict__', deepcopy(self.__dict__, memo))
+        object.__setattr__(output, '__fields_set__', set(self.__fields_set__))
+        for name in self.__private_attributes__:
+            value = getattr(self, name, Undefined)
+            if value is not Undefined:
+                object.__setattr__(output, name, value)
+        return output
+
+    def frozen(self: _BaseT) -> _BaseT:
+        """
+        Get a deep copy that can no longer change, so it and every object nested in it memoize their hash.
+
+        Hashing walks the whole object so it is only cached once nothing it covers can change. The hashed
+        fields of the copy cannot be assigned and their lists, dicts, and sets cannot be modified in place.
+        """
+        output = deepcopy(self)
+        _freeze(output)
+        return output
+
+    @property
+    def hex(self) -> str:
+        hashcache = getattr(self, '_hashcache', None)
+        if hashcache is not None:
+            return hashcache
+        hex_ = hasher(self)
+        if getattr(self, '_frozen', False):
+            object.__setattr__(self, '_hashcache', hex_)
+        return hex_
+
+    def serialize(self) -> Any:
+        serialized = super().serialize()
+        _serialize_settings(self, serialized, self.__config__.json_encoders)
+        return serialized
+
+    @classmethod
+    def deserialize_trusted(cls: Type[_T], serialized_data) -> _T:
+        """Deserialize data written by Base.serialize, skipping validation."""
+        return deserialize_trusted(serialized_data)
+
+    def serialize_binary(self) -> bytes:
+        """Serialize to a compact binary format headed by the object's hash and a payload checksum."""
+        payload = zlib.compress(json.dumps(self.serialize(), separators=(',', ':')).encode('utf-8'))
+        return BINARY_MAGIC + self.uuid.bytes + md5(payload).digest() + payload
+
+    @classmethod
+    def deserialize_binary(cls: Type[_T], data: bytes, expected_uuid: Optional[UUID] = None) -> _T:
+        """
+        Deserialize the output of serialize_binary without validation.
+
+        Raises:
+            SerializationError: if the data is malformed, corrupted, or not for the expected hash
+        """
+        data = bytes(data)
+        if len(data) < _BINARY_HEADER_LENGTH or not data.startswith(BINARY_MAGIC):
+            raise SerializationError("Invalid binary serialization, unknown format.")
+        header = data[len(BINARY_MAGIC) : _BINARY_HEADER_LENGTH]
+        payload = data[_BINARY_HEADER_LENGTH:]
+        if md5(payload).digest() != header[16:]:
+            raise SerializationError("Invalid binary serialization, the checksum does not match.")
+        stored_uuid = UUID(bytes=header[:16])
+        if expected_uuid is not None and stored_uuid != expected_uuid:
+            raise SerializationError(
+                f"Invalid binary serialization, expected hash {expected_uuid} but found {stored_uuid}."
+            )
+        output = deserialize_trusted(json.loads(zlib.decompress(payload)))
+        if not isinstance(output, cls):
+            raise SerializationError(f"Binary serialization is for {type(output)} not {cls}.")
+        return output
@@ -0,0 +1,255 @@
+#   Copyright 2022 Modelyst LLC
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Compile a validated model into an artifact that can be loaded again without re-validation."""
+import json
+import sys
+from hashlib import md5
+from importlib.util import find_spec
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, Field
+from pydasher.import_module import import_string
+
+from dbgen import __version__
+from dbgen.core.entity import BaseEntity
+from dbgen.core.etl_step import ETLStep
+from dbgen.core.func import Func
+from dbgen.core.metadata import meta_registry
+from dbgen.core.model import Model
+from dbgen.exceptions import SerializationError
+
+COMPILED_MODEL_VERSION = 2
+
+logger = getLogger(__name__)
+
+
+def _source_files(module_names: Iterable[str]) -> List[Path]:
+    """Find the python source files of the top level packages of the given modules without importing them."""
+    files: Set[Path] = set()
+    for top_level in sorted({name.split('.')[0] for name in module_names}):
+        spec = find_spec(top_level)
+        if spec is None:
+            raise SerializationError(f"Cannot find the source of module {top_level!r}")
+        if spec.submodule_search_locations:
+            for location in spec.submodule_search_locations:
+                files.update(Path(location).rglob('*.py'))
+        elif spec.origin and spec.origin.endswith('.py'):
+            files.add(Path(spec.origin))
+    return sorted(files)
+
+
+def _defining_files(model: Model) -> List[str]:
+    """Find the source files of the modules defining every node class and every Func's original callable."""
+    module_names: Set[str] = set()
+
+    def visit(thing: Any) -> None:
+        if isinstance(thing, Func) and thing._func is not None:
+            module_names.add(thing._func.__module__)
+        if isinstance(thing, BaseModel):
+            module_names.add(type(thing).__module__)
+            for key in thing.__fields__:
+                visit(getattr(thing, key))
+        elif isinstance(thing, (list, tuple, set)):
+            for val in thing:
+                visit(val)
+        elif isinstance(thing, dict):
+            for val in thing.values():
+                visit(val)
+
+    for etl_step in model.etl_steps:
+        visit(etl_step)
+    files: Set[str] = set()
+    for module_name in module_names:
+        # Functions materialized from source are in modules named after their Func and carry their own code
+        if module_name.startswith('<'):
+            continue
+        if module_name == '__main__':
+            raise SerializationError(f"Cannot compile Model {model.name!r} with objects defined in __main__")
+        module_file = getattr(sys.modules.get(module_name), '__file__', None)
+        if module_file:
+            files.add(module_file)
+    return sorted(files)
+
+
+def get_source_hash(module_names: Iterable[str], files: Iterable[str] = ()) -> str:
+    """Hash the dbgen version, the packages of the given modules, and the given source files."""
+    source_hash = md5(__version__.encode('utf-8'))
+    for path in sorted({*_source_files(module_names), *map(Path, files)}):
+        source_hash.update(str(path).encode('utf-8'))
+        source_hash.update(path.read_bytes())
+    return source_hash.hexdigest()
+
+
+def _checksum(payload: Dict[str, Any]) -> str:
+    return md5(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+class CompiledETLStep(BaseModel):
+    """A serialized ETLStep along with its precomputed hash and node order."""
+
+    hash: str
+    etl_step: Dict[str, Any]
+    sorted_nodes: List[Tuple[str, int]]
+
+    @classmethod
+    def compile(cls, etl_step: ETLStep) -> 'CompiledETLStep':
+        # Record the sorted nodes as positions in the extract, transforms, and loads fields
+        positions = {id(etl_step.extract): ('extract', 0)}
+        positions.update({id(node): ('transforms', i) for i, node in enumerate(etl_step.transforms)})
+        positions.update({id(node): ('loads', i) for i, node in enumerate(etl_step.loads)})
+        etl_step._get_dependency()
+        return cls(
+            hash=etl_step.hash,
+            etl_step=etl_step.serialize(),
+            sorted_nodes=[positions[id(node)] for node in etl_step._sort_nodes()],
+        )
+
+    def to_etl_step(self) -> ETLStep:
+        etl_step = ETLStep.deserialize_trusted(self.etl_step)
+        fields: Dict[str, List[Any]] = {
+            'extract': [etl_step.extract],
+            'transforms': etl_step.transforms,
+            'loads': etl_step.loads,
+        }
+        etl_step._sorted_nodes = [fields[field][i] for field, i in self.sorted_nodes]
+        etl_step._sorted_load_nodes = [
+            etl_step.loads[i] for field, i in self.sorted_nodes if field == 'loads'
+        ]
+        if etl_step.dependency is not None:
+            etl_step._dependency = (etl_step.additional_dependencies, etl_step.dependency)
+        return etl_step
+
+
+class CompiledModel(BaseModel):
+    """
+    A validated model serialized alongside its precomputed graph.
+
+    The artifact is only trusted while the dbgen version and the source files of the model are unchanged,
+    which covers the packages of the model and its Entities along with the files defining its nodes and
+    functions as recorded at compile time.
+    """
+
+    version: int = COMPILED_MODEL_VERSION
+    dbgen_version: str = __version__
+    model_str: str
+    source_modules: List[str]
+    source_files: List[str] = Field(default_factory=list)
+    source_hash: str
+    name: str
+    settings_class: str
+    settings: Dict[str, Any] = Field(default_factory=dict)
+    entity_classes: List[str]
+    custom_registry: bool = False
+    etl_steps: List[CompiledETLStep]
+    edges: List[Tuple[str, str]] = Field(default_factory=list)
+
+    @classmethod
+    def compile(cls, model: Model, model_str: str) -> 'CompiledModel':
+        if model.meta_registry is not meta_registry:
+            raise SerializationError(
+                f"Cannot compile Model {model.name!r} as it uses a custom meta registry."
+            )
+        entity_classes = sorted(
+            f"{mapper.class_.__module__}.{mapper.class_.__qualname__}" for mapper in model.registry.mappers
+        )
+        unimportable = [cls for cls in entity_classes if '<locals>' in cls or cls.startswith('__main__.')]
+        if unimportable:
+            raise SerializationError(
+                f"Cannot compile Model {model.name!r} with unimportable Entities: {unimportable}"
+            )
+        # A custom registry is found again through the Entity classes that were declared with it
+        if model.registry is not BaseEntity._sa_registry and not entity_classes:
+            raise SerializationError(f"Cannot compile Model {model.name!r} with an empty custom registry.")
+        settings_class = type(model.settings)
+        source_modules = sorted({model_str.split(':')[0], *(cls.rsplit('.', 1)[0] for cls in entity_classes)})
+        source_files = _defining_files(model)
+        return cls(
+            model_str=model_str,
+            source_modules=source_modules,
+            source_files=source_files,
+            source_hash=get_source_hash(source_modules, source_files),
+            name=model.name,
+            settings_class=f"{settings_class.__module__}.{settings_class.__qualname__}",
+            settings=json.loads(model.settings.json()),
+            entity_classes=entity_classes,
+            custom_registry=model.registry is not BaseEntity._sa_registry,
+            etl_steps=[CompiledETLStep.compile(etl_step) for etl_step in model.etl_steps],
+            edges=list(model._etl_step_graph().edges),
+        )
+
+    def is_current(self, model_str: Optional[str] = None) -> bool:
+        """Check that the artifact was compiled from the current sources by this version of dbgen."""
+        if self.version != COMPILED_MODEL_VERSION or self.dbgen_version != __version__:
+            return False
+        if model_str is not None and model_str != self.model_str:
+            return False
+        try:
+            return get_source_hash(self.source_modules, self.source_files) == self.source_hash
+        except (SerializationError, OSError):
+            return False
+
+    def to_model(self) -> Model:
+        """Rebuild the model without validating any of the etl_steps or their nodes."""
+        from networkx import DiGraph
+
+        entity_classes = [import_string(entity_class) for entity_class in self.entity_classes]
+        registry = entity_classes[0]._sa_registry if self.custom_registry else BaseEntity._sa_registry
+        etl_steps = [compiled.to_etl_step() for compiled in self.etl_steps]
+        model: Model = Model.construct(
+            name=self.name,
+            etl_steps=etl_steps,
+            registry=registry,
+            meta_registry=meta_registry,
+            settings=import_string(self.settings_class).parse_obj(self.settings),
+        )
+        graph = DiGraph()
+        for etl_step, compiled in zip(etl_steps, self.etl_steps):
+            graph.add_node(etl_step.name, id=compiled.hash, **etl_step.dict(include={'name', 'dependency'}))
+        graph.add_edges_from(self.edges)
+        model._graph = ([(id(etl_step), etl_step._get_dependency()) for etl_step in etl_steps], graph)
+        return model
+
+    def write(self, path: Path) -> None:
+        payload = json.loads(self.json())
+        path.write_text(json.dumps({'checksum': _checksum(payload), 'compiled_model': payload}))
+
+    @classmethod
+    def read(cls, path: Path) -> 'CompiledModel':
+        try:
+            contents = json.loads(path.read_text())
+            payload = contents['compiled_model']
+            checksum = contents['checksum']
+        except (ValueError, KeyError, TypeError) as exc:
+            raise SerializationError(f"Invalid compiled model at {path}") from exc
+        if checksum != _checksum(payload):
+            raise SerializationError(f"Checksum mismatch for compiled model at {path}")
+        return cls.parse_obj(payload)
+
+
+def load_compiled_model(path: Path, model_str: Optional[str] = None) -> Optional[Model]:
+    """Load a model from a compiled artifact, returning None if it is missing or out of date."""
+    if not path.exists():
+        return None
+    try:
+        compiled = CompiledModel.read(path)
+    except SerializationError as exc:
+        logger.warning(f"Ignoring compiled model: {exc}")
+        return None
+    if not compiled.is_current(model_str):
+        logger.info(f"Compiled model at {path} is out of date")
+        return None
+    return compiled.to_model()
@@ -177,12 +177,15 @@ class ExtractNode(FunctionNode[In, Out]):
         env: Optional[Environment] = None,
         outputs=None,
         kwargs: dict = None,
+        batched: bool = False,
     ):
         outputs = outputs or ['out']
         kwargs = kwargs or {}
 
         try:
-            node = PythonExtract(function=function, env=env, inputs=inputs, kwargs=kwargs, outputs=outputs)
+            node = PythonExtract(
+                function=function, env=env, inputs=inputs, kwargs=kwargs, outputs=outputs, batched=batched
+            )
         except ValidationError as exc:
             raise InvalidArgument(
                 f'Error occurred during the validation of the transform {function.__name__!r}'
@@ -234,12 +237,14 @@ def extract(function: Callable[In, Out]) -> Callable[In, FunctionNode[In, Out]]:
 
 @overload
 def extract(
-    *, env: Environment = None, outputs: List[str] = None
+    *, env: Environment = None, outputs: List[str] = None, batched: bool = False
 ) -> Callable[[Callable[In, Out]], Callable[In, FunctionNode[In, Out]]]:
     ...  # pragma: no cover
 
 
-def extract(function=None, *, env: Optional[Environment] = None, outputs: List[str] = None):
+def extract(
+    function=None, *, env: Optional[Environment] = None, outputs: List[str] = None, batched: bool = False
+):
 
     if function:
         if not outputs:
@@ -254,11 +259,11 @@ def extract(function=None, *, env: Optional[Environment] = None, outputs: List[s
                     bad_args = list(filter(lambda x: not isinstance(x, type), args))
                     if not bad_args:
                         outputs = [str(i) for i, _ in enumerate(args)]
-        func = partial(ExtractNode, function=function, env=env, outputs=outputs)
+        func = partial(ExtractNode, function=function, env=env, outputs=outputs, batched=batched)
 
         def set_inputs(*inputs: List[Arg], **kwargs) -> ExtractNode[In, Out]:
             return func(*inputs, kwargs=kwargs)
 
         return set_inputs
     else:
-        return partial(extract, env=env, outputs=outputs)
+        return partial(extract, env=env, outputs=outputs, batched=batched)
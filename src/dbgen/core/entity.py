@@ -34,6 +34,7 @@ from typing import (
     overload,
 )
 from uuid import UUID
+from weakref import WeakKeyDictionary
 
 from sqlalchemy import Column, DateTime
 from sqlalchemy.orm import registry
@@ -42,11 +43,11 @@ from sqlalchemy.sql.base import ImmutableColumnCollection
 from sqlalchemy.sql.schema import Table
 from sqlmodel.main import Field, FieldInfo, SQLModel, SQLModelMetaclass
 
-from dbgen.configuration import config as dbgen_config
+from dbgen.configuration import get_config
 from dbgen.core.args import ArgLike, Constant
 from dbgen.core.attribute import Attribute
 from dbgen.core.base import Base, BaseMeta
-from dbgen.core.node.load import Load, LoadEntity
+from dbgen.core.node.load import Load, LoadEntity, _entity_classes
 from dbgen.core.type_registry import column_registry
 from dbgen.exceptions import DBgenMissingInfo, InvalidArgument
 from dbgen.utils.postgresql_load import async_load_data, load_data
@@ -73,6 +74,8 @@ DEFAULT_ENTITY_REGISTRY = registry()
 _RESERVED_WORDS = {'hex', 'uuid', 'hash', 'load', 'clear_registry', 'foreign_key', 'cls'}
 
 logger = logging.getLogger('dbgen.core.entity')
+# LoadEntity of each Entity class along with the Table it was built from, used to detect registry changes
+_load_entity_cache: 'WeakKeyDictionary[Type[BaseEntity], Tuple[Table, LoadEntity]]' = WeakKeyDictionary()
 
 _T = TypeVar("_T")
 
@@ -163,7 +166,7 @@ class EntityMetaclass(SQLModelMetaclass, BaseMeta):
         schema = getattr(cls, schema_key, "") or overwrite_parent(bases, schema_key)
         table_args = getattr(cls, "__table_args__", None) or dict().copy()
         if not schema:
-            schema = dbgen_config.main_schema
+            schema = get_config().main_schema
         if schema:
             setattr(cls, schema_key, schema)
             table_args = table_args.copy()
@@ -207,6 +210,8 @@ class BaseEntity(Base, SQLModel, metaclass=EntityMetaclass):
     __table__: ClassVar[Table]
     _is_table: ClassVar[bool]
     _sa_registry: ClassVar[registry]
+    # Entity rows are mutated by the ORM so their hashes are never memoized
+    _memoize_hash: ClassVar[bool] = False
 
     class Config:
         """Pydantic Config"""
@@ -233,11 +238,26 @@ class BaseEntity(Base, SQLModel, metaclass=EntityMetaclass):
 
     @classmethod
     def _get_load_entity(cls) -> LoadEntity:
-        """Returns a LoadEntity which has the bare-minimum needed to load into this table."""
+        """Returns a LoadEntity which has the bare-minimum needed to load into this table.
+
+        The LoadEntity is cached per class and rebuilt if the class's table in the registry changes.
+        """
         # Check that entity is a table
         if not cls._is_table:
             raise ValueError(f"{cls.__qualname__} is not a table. Can't get LoadEntity of a non-table Entity")
         columns = cls._columns()
+        table = cls.metadata.tables[cls.__fulltablename__]
+        cached = _load_entity_cache.get(cls)
+        if cached is not None and cached[0] is table:
+            return cached[1]
+        load_entity = cls._build_load_entity(columns)
+        # We already have the class so there is no need to import it from the class string
+        load_entity._entity = cls
+        _load_entity_cache[cls] = (table, load_entity)
+        return load_entity
+
+    @classmethod
+    def _build_load_entity(cls, columns: ImmutableColumnCollection) -> LoadEntity:
         # Search for primary key name
         primary_keys = [x.name for x in cls.__table__.primary_key]
         if len(primary_keys) > 1:
@@ -359,6 +379,8 @@ class BaseEntity(Base, SQLModel, metaclass=EntityMetaclass):
         """Removes all Entity classes from the Entity registry"""
         cls.metadata.clear()
         cls._sa_registry.dispose()
+        _load_entity_cache.clear()
+        _entity_classes.clear()
 
     @classmethod
     def foreign_key(cls, primary_key: bool = False):
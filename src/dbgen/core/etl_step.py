@@ -16,6 +16,7 @@ import logging
 import re
 import traceback
 from bdb import BdbQuit
+from contextlib import nullcontext
 from functools import reduce
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 from uuid import UUID
@@ -24,22 +25,24 @@ from pydantic import Field, PrivateAttr
 from pydantic.class_validators import validator
 from sqlalchemy.future import Engine
 
+from dbgen.configuration import get_config
 from dbgen.core.args import Arg
 from dbgen.core.base import Base
 from dbgen.core.context import ETLStepContext, ModelContext, TagsContext
 from dbgen.core.decorators import ExtractNode, FunctionNode, TransformNode
 from dbgen.core.dependency import Dependency
-from dbgen.core.metadata import ETLStepEntity
 from dbgen.core.node.extract import Extract
 from dbgen.core.node.load import Load
 from dbgen.core.node.query import BaseQuery
 from dbgen.core.node.transforms import PythonTransform, Transform
 from dbgen.exceptions import DBgenMissingInfo, DBgenSkipException, ValidationError
 from dbgen.utils.graphs import topsort_with_dict
+from dbgen.utils.log import StdoutCapture, captured_stdout
 
 if TYPE_CHECKING:
     from networkx import DiGraph  # pragma: no cover
 
+    from dbgen.core.metadata import ETLStepEntity  # pragma: no cover
     from dbgen.core.node.computational_node import ComputationalNode  # pragma: no cover
     from dbgen.core.run.utilities import RunConfig  # pragma: no cover
 
@@ -57,12 +60,19 @@ class ETLStep(Base):
     loads: List[Load] = list_field
     tags: List[str] = list_field
     batch_size: Optional[int] = None
+    keyset: Optional[List[str]] = None
+    watermark: Optional[str] = None
     additional_dependencies: Optional[Dependency] = None
     dependency: Optional[Dependency] = None
     _graph: Optional["DiGraph"] = PrivateAttr(None)
+    _sorted_nodes: Optional[List["ComputationalNode"]] = PrivateAttr(None)
+    _sorted_load_nodes: Optional[List[Load]] = PrivateAttr(None)
+    _dependency: Optional[Tuple[Optional[Dependency], Dependency]] = PrivateAttr(None)
     _context: ETLStepContext = PrivateAttr(None)
     _hashexclude_ = {
         'dependency',
+        'keyset',
+        'watermark',
     }
 
     def __init__(self, name: str, **kwargs):
@@ -117,6 +127,26 @@ class ETLStep(Base):
                         f"Node {node} is looking for an output named {arg.name!r} on another node with a hash {arg.key!r}\n  "
                         + hint
                     )
+        # The extract is only set once the ETLStep's context has exited
+        if self.keyset and self.extract.hash != Extract().hash:
+            if not isinstance(self.extract, BaseQuery):
+                raise ValueError(
+                    f"ETLStep(name={self.name!r}) has a keyset but only Query extracts can be keyset paginated."
+                )
+            missing = [key for key in self.keyset if key not in self.extract.outputs]
+            if missing:
+                raise ValueError(
+                    f"ETLStep(name={self.name!r}) has keyset columns {missing} that are not outputs of its query."
+                )
+        if self.watermark and self.extract.hash != Extract().hash:
+            if not isinstance(self.extract, BaseQuery):
+                raise ValueError(
+                    f"ETLStep(name={self.name!r}) has a watermark but only Query extracts can be filtered by one."
+                )
+            if self.watermark not in self.extract.outputs:
+                raise ValueError(
+                    f"ETLStep(name={self.name!r}) has a watermark column {self.watermark!r} that is not an output of its query."
+                )
 
     def __str__(self) -> str:
         return f"ETLStep<{self.name}>"
@@ -137,24 +167,32 @@ class ETLStep(Base):
         rows_to_load: Dict[str, Dict[UUID, dict]] = {node.hash: {} for node in self.loads}
         processed_hashes = []
         inputs_skipped = 0
-        for input_hash, row in batch:
-            try:
-                _, skipped = self._transform(row, rows_to_load, run_config)
-                if not skipped:
-                    processed_hashes.append(input_hash)
-                else:
-                    inputs_skipped += 1
-            except (KeyboardInterrupt, SystemExit, BdbQuit):
-                raise
-            except BaseException:
-                if run_config.skip_on_error:
-                    inputs_skipped += 1
-                    if self._logger.isEnabledFor(logging.DEBUG):
-                        self._logger.debug(f'Skipped row due to error')
-                    continue
-                return None, None, None, inputs_skipped, traceback.format_exc()
+        # In batch mode stdout is captured once for the whole batch rather than around every transform call
+        capture = run_config.capture_stdout == StdoutCapture.BATCH and not get_config().pdb
+        with captured_stdout(self._logger.getChild('stdout')) if capture else nullcontext():
+            for input_hash, row in batch:
+                try:
+                    _, skipped = self._transform(row, rows_to_load, run_config)
+                    if not skipped:
+                        processed_hashes.append(input_hash)
+                    else:
+                        inputs_skipped += 1
+                except (KeyboardInterrupt, SystemExit, BdbQuit):
+                    raise
+                except BaseException:
+                    if run_config.skip_on_error:
+                        inputs_skipped += 1
+                        if self._logger.isEnabledFor(logging.DEBUG):
+                            self._logger.debug(f'Skipped row due to error')
+                        continue
+                    return None, None, None, inputs_skipped, traceback.format_exc()
         return processed_hashes, rows_to_load, len(batch), inputs_skipped, None
 
+    def _resolve_entities(self) -> None:
+        """Import the Entity classes of all loads up front rather than on the first transformed batch."""
+        for load in self.loads:
+            load.load_entity._load_entity()
+
     def remove_stored_func(self):
         """Removes all stored functions on this ETLStep's PythonTransforms to allow for pickling."""
         for node in self.transforms:
@@ -192,6 +230,7 @@ class ETLStep(Base):
                 raise TypeError(f"Unknown node type found during sorting! {type(node)}")
         self.transforms = transforms
         self.loads = loads
+        self._sorted_load_nodes = list(loads)
 
     def _computational_graph(self, force_rebuild: bool = True) -> "DiGraph":
         if self._graph is None or force_rebuild:
@@ -230,26 +269,56 @@ class ETLStep(Base):
         return self._graph
 
     def _sort_nodes(self, force_rebuild: bool = False) -> List["ComputationalNode"]:
-        graph = self._computational_graph(force_rebuild=force_rebuild)
-        sorted_node_ids = topsort_with_dict(graph)
-        sorted_nodes = [
-            graph.nodes[key]["data"]
-            for key in sorted_node_ids
-            if not isinstance(graph.nodes[key]["data"], Extract)
-        ]
-        return [self.extract, *sorted_nodes]
+        # The sorted order is cached until a node is added so batches never need to re-sort
+        if self._sorted_nodes is None or force_rebuild:
+            graph = self._computational_graph(force_rebuild=force_rebuild)
+            sorted_node_ids = topsort_with_dict(graph)
+            sorted_nodes = [
+                graph.nodes[key]["data"]
+                for key in sorted_node_ids
+                if not isinstance(graph.nodes[key]["data"], Extract)
+            ]
+            self._sorted_nodes = [self.extract, *sorted_nodes]
+            self._sorted_load_nodes = None
+            self._dependency = None
+        return list(self._sorted_nodes)
 
     def _sorted_loads(self) -> List[Load]:
-        sorted_nodes = self._sort_nodes()
-        return [node for node in sorted_nodes if isinstance(node, Load)]
+        if self._sorted_load_nodes is None:
+            sorted_nodes = self._sort_nodes()
+            self._sorted_load_nodes = [node for node in sorted_nodes if isinstance(node, Load)]
+        return self._sorted_load_nodes
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> 'ETLStep':
+        output = super().__deepcopy__(memo)
+        # The cached nodes are the ones copied with the fields so the copy refers to its own nodes
+        output._graph = None
+        if self._sorted_nodes is not None:
+            output._sorted_nodes = [memo[id(node)] for node in self._sorted_nodes]
+        if self._sorted_load_nodes is not None:
+            output._sorted_load_nodes = [memo[id(node)] for node in self._sorted_load_nodes]
+        return output
+
+    def _invalidate_graph(self) -> None:
+        """Clear the cached computational graph, sorted nodes, and dependency after the nodes change."""
+        self._graph = None
+        self._sorted_nodes = None
+        self._sorted_load_nodes = None
+        self._dependency = None
 
     def _get_dependency(self) -> Dependency:
-        dep_list = [self.additional_dependencies] if self.additional_dependencies else []
-        dep_list.extend([node._get_dependency() for node in self._sort_nodes()])
-        self.dependency = reduce(lambda p, n: p.merge(n), dep_list, Dependency())
+        # The cache is only valid for the additional dependencies it was computed with
+        if self._dependency is None or self._dependency[0] is not self.additional_dependencies:
+            dep_list = [self.additional_dependencies] if self.additional_dependencies else []
+            dep_list.extend([node._get_dependency() for node in self._sort_nodes()])
+            dependency = reduce(lambda p, n: p.merge(n), dep_list, Dependency())
+            self._dependency = (self.additional_dependencies, dependency)
+        self.dependency = self._dependency[1]
         return self.dependency
 
-    def _get_etl_step_row(self) -> ETLStepEntity:
+    def _get_etl_step_row(self) -> 'ETLStepEntity':
+        from dbgen.core.metadata import ETLStepEntity
+
         # Assemble stringified dependency fields as we can't store sets in postgres easily
         deps = self._get_dependency()
         dep_kwargs = {}
@@ -263,6 +332,7 @@ class ETLStep(Base):
             tags=",".join(self.tags),
             query=self.extract.render_query() if isinstance(self.extract, BaseQuery) else None,
             etl_step_json=self.serialize(),
+            etl_step_binary=self.serialize_binary(),
             **dep_kwargs,
         )
 
@@ -279,6 +349,7 @@ class ETLStep(Base):
         return ETLStepRun(etl_step=self).execute(main_engine, meta_engine, run_id, run_config, ordering)
 
     def add_node(self, node: 'ComputationalNode') -> None:
+        self._invalidate_graph()
         if isinstance(node, Extract):
             if self.extract.__class__ == DEFAULT_EXTRACT.__class__:
                 self.extract = node
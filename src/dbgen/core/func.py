@@ -14,21 +14,19 @@
 
 import ast
 import inspect
+import linecache
+import logging
 import os
 import re
-from importlib.util import module_from_spec, spec_from_file_location
 from inspect import (
     Parameter,
     getdoc,
-    getmembers,
-    getsourcefile,
     getsourcelines,
     isbuiltin,
     isclass,
     isfunction,
     signature,
 )
-from os.path import exists
 from pathlib import Path
 from textwrap import dedent
 from types import LambdaType
@@ -38,7 +36,6 @@ from pydantic import Field, constr, root_validator, validator
 from pydantic.fields import Undefined
 from typing_extensions import ParamSpec
 
-from dbgen.configuration import config
 from dbgen.core.base import Base
 from dbgen.exceptions import DBgenInternalError, InvalidArgument
 from dbgen.utils.misc import reserved_words
@@ -186,6 +183,9 @@ Output = TypeVar('Output')
 FuncIn = ParamSpec('FuncIn')
 FuncOut = TypeVar('FuncOut')
 
+# Functions materialized from source by this process keyed by the hash of their Func
+_materialized_funcs: Dict[str, Callable] = {}
+
 
 class Func(Base, Generic[FuncOut]):
     """
@@ -195,7 +195,8 @@ class Func(Base, Generic[FuncOut]):
     src: str
     name: str
     env: Environment
-    _func: Optional[Callable]
+    _func: Optional[Callable] = None
+    _stdout_logger: Optional[logging.Logger] = None
 
     class Config:
         """Pydantic Config"""
@@ -214,17 +215,21 @@ class Func(Base, Generic[FuncOut]):
         return "<Func (%d line%s)>" % (n, s)
 
     def __call__(self, *args, **kwargs) -> FuncOut:
-        if self._func is not None and self.path.exists():
-            return self._func(*args, **kwargs)
-        else:
-            f = self._from_src()
-            return f(*args, **kwargs)
+        f = self._func if self._func is not None else self._from_src()
+        return f(*args, **kwargs)
 
     def __repr__(self) -> str:
         return self.name
 
     # Properties #
 
+    @property
+    def stdout_logger(self) -> logging.Logger:
+        """Logger that captured stdout from this function is written to."""
+        if self._stdout_logger is None:
+            self._stdout_logger = logging.getLogger(f"dbgen.pyblock.{self.name}")
+        return self._stdout_logger
+
     @property
     def is_lam(self) -> bool:
         return self.src[:6] == "lambda"
@@ -272,8 +277,9 @@ class Func(Base, Generic[FuncOut]):
     #     ]
 
     @property
-    def path(self) -> Path:
-        return config.temp_dir / f"{self.name}_{self.hash}.py"
+    def filename(self) -> str:
+        """Name the materialized source is registered under in linecache for tracebacks."""
+        return f"<dbgen.func {self.name}_{self.hash}>"
 
     def file(self) -> str:
         lam = "f = " if self.is_lam else ""
@@ -286,12 +292,13 @@ class Func(Base, Generic[FuncOut]):
         Execute source code to get a callable
         """
 
-        if force or not exists(self.path):
-            with open(self.path, "w") as t:
-                t.write(self.file())
-
         if force or self._func is None:
-            self._func = self.path_to_func(str(self.path))
+            # Each process only materializes a given function once
+            key = self.hash
+            func = None if force else _materialized_funcs.get(key)
+            if func is None:
+                func = _materialized_funcs[key] = self.src_to_func(self.file(), self.filename)
+            self._func = func
 
         return self._func
 
@@ -310,26 +317,21 @@ class Func(Base, Generic[FuncOut]):
         self._func = value
 
     @staticmethod
-    def path_to_func(pth: str) -> Callable:
-
+    def src_to_func(src: str, filename: str) -> Callable:
+        """Compile and execute source code in memory, returning the single function it defines."""
+        # Register the source with linecache so tracebacks and inspect can still show it
+        linecache.cache[filename] = (len(src), None, src.splitlines(True), filename)
         try:
-            spec = spec_from_file_location("random", pth)
-            assert spec and spec.loader, "Spec or Spec.loader are broken"
-            mod = module_from_spec(spec)
-            spec.loader.exec_module(mod)  # type: ignore
-            transforms = [o for o in getmembers(mod) if isfunction(o[1]) and getsourcefile(o[1]) == pth]
-            assert len(transforms) == 1, "Bad input file %s has %d functions, not 1" % (
-                pth,
-                len(transforms),
-            )
-            return transforms[0][1]
-
+            namespace: Dict[str, Any] = {'__name__': filename}
+            exec(compile(src, filename, 'exec'), namespace)
+            transforms = [
+                obj for obj in namespace.values() if isfunction(obj) and obj.__code__.co_filename == filename
+            ]
+            assert len(transforms) == 1, "Bad source %s has %d functions, not 1" % (filename, len(transforms))
+            return transforms[0]
         except Exception as e:
-            if exists(pth):
-                with open(pth) as f:
-                    content = f.read()
             raise DBgenInternalError(
-                f"Error while trying to load source code. You may be missing an import in your Transforms Env object. \nPath:{pth}\nFile Contents:\n--------\n{content}\n--------\nLoad Error: {e}"
+                f"Error while trying to load source code. You may be missing an import in your Transforms Env object. \nSource:{filename}\nFile Contents:\n--------\n{src}\n--------\nLoad Error: {e}"
             )
 
 
@@ -16,17 +16,17 @@ from enum import Enum
 from typing import List, Optional
 from uuid import UUID
 
-from sqlalchemy import Column, func
+from sqlalchemy import BigInteger, Column, func
 from sqlalchemy.orm import registry
 from sqlalchemy.sql.expression import text
 from sqlmodel import Field, Relationship, select
 from sqlmodel.sql.sqltypes import GUID, AutoString
 
-from dbgen.configuration import config
+from dbgen.configuration import get_config
 from dbgen.core.entity import BaseEntity, get_created_at_field, id_field
 from dbgen.utils.sql import create_view
 
-META_SCHEMA = config.meta_schema
+META_SCHEMA = get_config().meta_schema
 meta_registry = registry()
 
 
@@ -73,6 +73,7 @@ class ETLStepEntity(Root, registry=meta_registry, table=True):
     column_needed: Optional[str]
     column_yielded: Optional[str]
     etl_step_json: Optional[dict]
+    etl_step_binary: Optional[bytes]
     etl_step_runs: List['ETLStepRunEntity'] = Relationship(back_populates='etl_step')
     models: List['ModelEntity'] = Relationship(back_populates='etl_steps', link_model=ModelETLStepMap)
 
@@ -108,6 +109,7 @@ class ETLStepRunEntity(Root, registry=meta_registry, table=True):
     memory_usage: Optional[float]
     query: Optional[str]
     error: Optional[str]
+    checkpoint: Optional[dict]
     run: RunEntity = Relationship(back_populates='etl_step_runs')
     etl_step: ETLStepEntity = Relationship(back_populates='etl_step_runs')
 
@@ -118,6 +120,30 @@ class Repeats(Root, registry=meta_registry, table=True):
     input_hash: UUID = Field(..., primary_key=True)
 
 
+class Watermark(Root, registry=meta_registry, table=True):
+    __tablename__ = "watermark"
+    etl_step_id: Optional[UUID] = ETLStepEntity.foreign_key(primary_key=True)
+    run_id: Optional[int] = RunEntity.foreign_key()
+    watermark: Optional[dict]
+    updated_at: Optional[datetime]
+
+
+class FileManifest(Root, registry=meta_registry, table=True):
+    __tablename__ = "file_manifest"
+    etl_step_id: Optional[UUID] = ETLStepEntity.foreign_key(primary_key=True)
+    path: str = Field(..., primary_key=True)
+    size: int = Field(..., sa_column=Column(BigInteger, nullable=False))
+    mtime: float
+
+
+class SchemaFingerprint(Root, registry=meta_registry, table=True):
+    __tablename__ = "schema_fingerprint"
+    registry_name: str = Field(..., primary_key=True)
+    database: str = Field(..., primary_key=True)
+    fingerprint: str
+    updated_at: Optional[datetime]
+
+
 run_view_statement = (
     select(
         ETLStepEntity.name,
@@ -12,28 +12,39 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from collections import Counter
+from collections import Counter, defaultdict
+from datetime import datetime
 from json import loads
-from typing import TYPE_CHECKING, Dict, Generic, List, Tuple, TypeVar
+from typing import TYPE_CHECKING, Dict, Generic, List, Optional, Set, Tuple, TypeVar
 from uuid import UUID
 
 import sqlalchemy
-from networkx import DiGraph
 from pydantic import Field, PrivateAttr, validator
 from sqlalchemy import MetaData, inspect, text
 from sqlalchemy.future import Engine
 from sqlalchemy.orm import registry as sa_registry
+from sqlmodel import Session, select
 
 from dbgen.core.base import Base
 from dbgen.core.context import ModelContext
+from dbgen.core.dependency import Dependency
 from dbgen.core.entity import BaseEntity
 from dbgen.core.etl_step import ETLStep
-from dbgen.core.metadata import ModelEntity, RunEntity, meta_registry
+from dbgen.core.metadata import ModelEntity, RunEntity, SchemaFingerprint, meta_registry
 from dbgen.core.model_settings import BaseModelSettings
 from dbgen.exceptions import ModelRunError
 from dbgen.utils.graphs import serialize_graph, topsort_with_dict
+from dbgen.utils.sql import (
+    add_column,
+    add_column_foreign_keys,
+    get_metadata_fingerprint,
+    get_missing_columns,
+    get_missing_tables,
+)
 
 if TYPE_CHECKING:
+    from networkx import DiGraph  # pragma: no cover
+
     from dbgen.core.run.utilities import RunConfig  # pragma: no cover
 
 SettingType = TypeVar('SettingType', bound=BaseModelSettings)
@@ -46,6 +57,7 @@ class Model(Base, Generic[SettingType]):
     meta_registry: sa_registry = Field(default_factory=lambda: meta_registry)
     settings: SettingType = Field(default_factory=lambda: BaseModelSettings())
     _context: ModelContext = PrivateAttr(None)
+    _graph: Optional[Tuple[List[Tuple[int, Dependency]], "DiGraph"]] = PrivateAttr(None)
     _hashinclude_ = {"name", "etl_steps"}
 
     class Config:
@@ -96,19 +108,35 @@ class Model(Base, Generic[SettingType]):
     def _etl_step_graph(self) -> "DiGraph":
         from networkx import DiGraph
 
-        graph = DiGraph()
+        # Each etl_step's dependency is computed once and the graph is reused until one changes
+        dependencies = {etl_step.name: etl_step._get_dependency() for etl_step in self.etl_steps}
+        graph_key = [(id(etl_step), dependencies[etl_step.name]) for etl_step in self.etl_steps]
+        if self._graph is not None and self._graph[0] == graph_key:
+            return self._graph[1]
+
+        # Index the etl_steps that yield each table and column so the edges are found by lookup
+        table_yielders: Dict[str, Set[str]] = defaultdict(set)
+        column_yielders: Dict[str, Set[str]] = defaultdict(set)
+        for name, dependency in dependencies.items():
+            for table in dependency.tables_yielded:
+                table_yielders[table].add(name)
+            for column in dependency.columns_yielded:
+                column_yielders[column].add(name)
 
-        # Add edges for every Arg in graph
-        edges: List[Tuple[str, str]] = []
-        for source_name, source in self.etl_steps_dict().items():
-            for target_name, target in self.etl_steps_dict().items():
-                if source_name != target_name:
-                    if source._get_dependency().test(target._get_dependency()):
-                        edges.append((target_name, source_name))
+        # Add an edge from every etl_step that yields something another etl_step needs
+        edges: Set[Tuple[str, str]] = set()
+        for name, dependency in dependencies.items():
+            for table in dependency.tables_needed:
+                edges.update((source, name) for source in table_yielders.get(table, ()) if source != name)
+            for column in dependency.columns_needed:
+                edges.update((source, name) for source in column_yielders.get(column, ()) if source != name)
 
-        for etl_step in self.etl_steps_dict().values():
+        graph = DiGraph()
+        order = {etl_step.name: i for i, etl_step in enumerate(self.etl_steps)}
+        for etl_step in self.etl_steps:
             graph.add_node(etl_step.name, id=etl_step.hash, **etl_step.dict(include={'name', 'dependency'}))
-        graph.add_edges_from(edges)
+        graph.add_edges_from(sorted(edges, key=lambda edge: (order[edge[0]], order[edge[1]])))
+        self._graph = (graph_key, graph)
         return graph
 
     def _sort_graph(self) -> List[ETLStep]:
@@ -154,18 +182,64 @@ class Model(Base, Generic[SettingType]):
         meta_only: bool = False,
         create: bool = True,
     ) -> None:
-        """Syncs the state of the models registry with the database."""
+        """
+        Syncs the state of the models registry with the database.
+
+        A fingerprint of each registry's metadata is stored in the meta schema after every sync so
+        subsequent syncs of an unchanged registry only check that its tables still exist.
+        """
         if not build and not create:
             raise ValueError("Not building and not creating, sync is doing nothing...")
-        if not meta_only:
-            if build:
-                self.drop_metadata(main_engine, self.registry.metadata)
-            if create:
-                self.create_metadata(main_engine, self.registry.metadata)
         if build:
+            if not meta_only:
+                self.drop_metadata(main_engine, self.registry.metadata)
             self.drop_metadata(meta_engine, self.meta_registry.metadata)
         if create:
-            self.create_metadata(meta_engine, self.meta_registry.metadata)
+            # The meta registry is synced first as it stores the fingerprints
+            self.sync_metadata(meta_engine, meta_engine, self.meta_registry.metadata, 'meta')
+            if not meta_only:
+                self.sync_metadata(main_engine, meta_engine, self.registry.metadata, 'main')
+
+    def sync_metadata(self, engine: Engine, meta_engine: Engine, metadata: MetaData, registry_name: str):
+        """Create the missing tables and columns of the metadata unless its fingerprint is unchanged."""
+        fingerprint = get_metadata_fingerprint(metadata)
+        database = engine.url.render_as_string(hide_password=True)
+        with meta_engine.connect() as meta_conn:
+            try:
+                stored = meta_conn.execute(
+                    select(SchemaFingerprint.fingerprint).where(
+                        SchemaFingerprint.registry_name == registry_name,
+                        SchemaFingerprint.database == database,
+                    )
+                ).scalar()
+            except sqlalchemy.exc.ProgrammingError:
+                # The meta schema has not been created yet
+                stored = None
+        if stored == fingerprint:
+            with engine.connect() as conn:
+                missing_tables = get_missing_tables(conn, metadata)
+            if not missing_tables:
+                self._logger.debug(f"Schema fingerprint of the {registry_name} registry is unchanged")
+                return
+            self._logger.debug(f"Tables {missing_tables} are missing despite an unchanged fingerprint")
+        # Columns are added before create_all so the views selecting from their tables can be replaced
+        added_columns = self.add_missing_columns(engine, metadata)
+        self.create_metadata(engine, metadata)
+        if added_columns:
+            # Foreign keys wait for create_all as they may reference tables that did not exist yet
+            with engine.begin() as conn:
+                for column in added_columns:
+                    add_column_foreign_keys(conn, column)
+        with Session(meta_engine) as meta_session:
+            meta_session.merge(
+                SchemaFingerprint(
+                    registry_name=registry_name,
+                    database=database,
+                    fingerprint=fingerprint,
+                    updated_at=datetime.now(),
+                )
+            )
+            meta_session.commit()
 
     def drop_metadata(self, engine: Engine, metadata: MetaData):
         try:
@@ -188,7 +262,23 @@ class Model(Base, Generic[SettingType]):
         except sqlalchemy.exc.InternalError as exc:
             raise ValueError("Error occurred during database creation") from exc
 
-    def _get_model_row(self):
+    def add_missing_columns(self, engine: Engine, metadata: MetaData) -> List[sqlalchemy.Column]:
+        """Add the columns that were added to the registry since their tables were created."""
+        added: List[sqlalchemy.Column] = []
+        with engine.begin() as conn:
+            for column in get_missing_columns(conn, metadata):
+                if column.primary_key:
+                    self._logger.warning(
+                        f"Identifying column {column.name!r} is missing from {column.table.fullname!r}, "
+                        "rebuild the database with --build to add it."
+                    )
+                    continue
+                self._logger.info(f"Adding missing column {column.name!r} to {column.table.fullname!r}")
+                add_column(conn, column)
+                added.append(column)
+        return added
+
+    def _get_model_row(self, include_etl_steps: bool = True):
         graph = self._etl_step_graph()
 
         def default(obj):
@@ -204,6 +294,6 @@ class Model(Base, Generic[SettingType]):
         return ModelEntity(
             id=self.uuid,
             name=self.name,
-            etl_steps=[x._get_etl_step_row() for x in self.etl_steps],
+            etl_steps=[x._get_etl_step_row() for x in self.etl_steps] if include_etl_steps else [],
             graph_json=loads(graph_json),
         )
@@ -12,10 +12,11 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+from itertools import islice
 from typing import TYPE_CHECKING, Any, Callable, Dict
 from typing import Generator
 from typing import Generator as GenType
-from typing import Mapping, Optional, TypeVar, Union
+from typing import List, Mapping, Optional, Sequence, Tuple, TypeVar, Union
 
 from pydantic import Field, PrivateAttr, root_validator, validator
 
@@ -25,6 +26,10 @@ from dbgen.core.node.computational_node import ComputationalNode
 if TYPE_CHECKING:
     from dbgen.core.run.utilities import RunConfig
 extractor_type = GenType[Dict[str, Mapping[str, Any]], None, None]
+# A batch is either a sequence of rows or a mapping of each output to its column of values
+BATCH_TYPE = Union[Sequence[Any], Mapping[str, Sequence[Any]]]
+# The number of rows per batch when extract_batches wraps extract and no batch_size is configured
+DEFAULT_EXTRACT_BATCH_SIZE = 1000
 
 Output = TypeVar('Output')
 T = TypeVar('T')
@@ -61,6 +66,31 @@ class Extract(ComputationalNode[T]):
     def length(self) -> Optional[int]:
         return None
 
+    # Overwrite these when the extractor reads whole batches of rows at a time
+    def yields_batches(self) -> bool:
+        """Whether the runners should read the rows through extract_batches instead of extract."""
+        return False
+
+    def extract_batches(self) -> GenType[BATCH_TYPE, None, None]:
+        """Yield the rows of extract in lists of the configured batch_size."""
+        batch_size = getattr(self._run_config, 'batch_size', None) or DEFAULT_EXTRACT_BATCH_SIZE
+        rows = iter(self.extract())
+        while batch := list(islice(rows, batch_size)):
+            yield batch
+
+    # Overwrite these when the extractor skips the files recorded in the manifest of previous runs
+    def uses_manifest(self) -> bool:
+        """Whether the runners should hand the etl_step's file manifest to the extractor and save it after."""
+        return False
+
+    def set_manifest(self, manifest: Dict[str, Tuple[int, float]]) -> None:
+        """Receive the size and modification time of each file by absolute path as of the last run."""
+        pass
+
+    def get_manifest(self) -> Dict[str, Tuple[int, float]]:
+        """Get the size and modification time of each file extracted by this run."""
+        return {}
+
     # Internal Do not Overwrite
 
     def _set_run_config(self, run_config: 'RunConfig'):
@@ -93,6 +123,39 @@ class Extract(ComputationalNode[T]):
                 )
             return {list(self.outputs)[0]: row}
 
+    def process_batch(self, batch: BATCH_TYPE) -> List[Dict[str, Any]]:
+        """
+        Convert a batch of rows into a dictionary per row, checking the batch as a whole rather than each row.
+
+        The rows of a batch must all be of the same kind, either mappings, tuples of every output, or single
+        values when there is only one output.
+        """
+        if isinstance(batch, Mapping):
+            if len({len(column) for column in batch.values()}) > 1:
+                raise ValueError(f"{self} extracted a batch of columns with different lengths")
+            return [dict(zip(batch.keys(), values)) for values in zip(*batch.values())]
+        if not batch:
+            return []
+        outputs = list(self.outputs)
+        first_row = batch[0]
+        if isinstance(first_row, Mapping):
+            return [dict(row) for row in batch]
+        elif isinstance(first_row, tuple):
+            lengths = set(map(len, batch))
+            if lengths != {len(outputs)}:
+                raise ValueError(
+                    f"Expected {len(outputs)} outputs from extract {self}, "
+                    f"but got rows of length {sorted(lengths)}."
+                )
+            return [dict(zip(outputs, row)) for row in batch]
+        if len(outputs) != 1:
+            raise ValueError(
+                f"{self} expected multiple outputs but output a batch of {type(first_row)} "
+                "which cannot have its length measured"
+            )
+        output = outputs[0]
+        return [{output: value} for value in batch]
+
     def __enter__(self):
         """Call setup when extract used in with block."""
         self.setup()
@@ -107,9 +170,18 @@ class Extract(ComputationalNode[T]):
 
 # TODO add better error messaging when user passes in a non-arg to pyblock
 class PythonExtract(Extract[Output]):
+    """
+    Extract the rows yielded by a python generator function.
+
+    When batched is set the function yields whole batches of rows instead, as a list of rows or a dictionary
+    of output columns, and the runners check and hash each batch at once.
+    """
 
     env: Optional[Environment] = Field(default_factory=lambda: Environment(imports=set()))
     function: Func[Output]
+    batched: bool = False
+    _settings_ = {'batched'}
+    _hashexclude_ = _settings_
 
     @validator('function', pre=True)
     def convert_callable_to_func(cls, function: Union[Func[Output], Callable[..., Output]], values):
@@ -139,7 +211,24 @@ class PythonExtract(Extract[Output]):
                 ), f"Too many arguments supplied to Func. Number of Inputs: {number_of_inputs}, Max Number of Args: {num_max_args}\n"
         return values
 
+    def yields_batches(self) -> bool:
+        return self.batched
+
     def extract(self) -> Generator[Output, None, None]:
+        if not self.batched:
+            yield from self._call_function()
+            return
+        # Batches are flattened for callers that read one row at a time
+        for batch in self._call_function():
+            if isinstance(batch, Mapping):
+                yield from self.process_batch(batch)  # type: ignore
+            else:
+                yield from batch
+
+    def extract_batches(self) -> Generator[BATCH_TYPE, None, None]:
+        yield from self._call_function()  # type: ignore
+
+    def _call_function(self) -> Generator[Any, None, None]:
         inputvars = self._get_inputs({})
         args = {key: val for key, val in inputvars.items() if key.isdigit()}
         kwargs = {key: val for key, val in inputvars.items() if key not in args}
@@ -11,7 +11,7 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
-from functools import partial
+from datetime import date, datetime, time, timedelta
 from itertools import chain
 from typing import (
     TYPE_CHECKING,
@@ -33,17 +33,19 @@ from pydantic import Field, PrivateAttr
 from pydantic import ValidationError as PydValidationError
 from pydantic import root_validator, validate_model, validator
 from pydantic.error_wrappers import ErrorWrapper
+from pydantic.errors import MissingError
+from pydantic.fields import SHAPE_SINGLETON, ModelField
 from pydasher import hasher
 from pydasher.import_module import import_string
 
-from dbgen.configuration import ValidationEnum, config
+from dbgen.configuration import ValidationEnum, get_config
 from dbgen.core.args import Arg, Constant
 from dbgen.core.base import Base
 from dbgen.core.dependency import Dependency
 from dbgen.core.node.computational_node import ComputationalNode
 from dbgen.core.type_registry import column_registry
 from dbgen.exceptions import ValidationError
-from dbgen.utils.lists import broadcast, is_broadcastable
+from dbgen.utils.lists import broadcast_columns
 from dbgen.utils.postgresql_load import async_load_data, load_data
 
 if TYPE_CHECKING:
@@ -56,6 +58,18 @@ def hash_tuple(tuple_to_hash: Tuple[Any, ...]) -> UUID:
     return UUID(hasher(tuple_to_hash))
 
 
+# Entity classes imported from their class strings, shared by every LoadEntity in this process
+_entity_classes: Dict[str, Type['BaseEntity']] = {}
+
+
+def _resolve_entity_class(entity_class_str: str) -> Type['BaseEntity']:
+    """Import an Entity class from its class string, caching it for the rest of the process."""
+    entity = _entity_classes.get(entity_class_str)
+    if entity is None:
+        entity = _entity_classes[entity_class_str] = import_string(entity_class_str)
+    return entity
+
+
 class LoadEntity(Base):
     """Object for passing minimum info to the Load object for database insertion."""
 
@@ -69,6 +83,19 @@ class LoadEntity(Base):
     required: Set[str] = Field(default_factory=set)
     foreign_keys: Set[str] = Field(default_factory=set)
     _entity: Optional[Type['BaseEntity']] = PrivateAttr(None)
+    _validators: Dict[Tuple[Tuple[str, ...], ValidationEnum, bool], 'LoadValidator'] = PrivateAttr(
+        default_factory=dict
+    )
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        # The entity class and compiled validators are resolved again lazily in each process
+        state['__private_attribute_values__'] = {
+            **state['__private_attribute_values__'],
+            '_entity': None,
+            '_validators': {},
+        }
+        return state
 
     def __str__(self):
         return (
@@ -88,8 +115,7 @@ class LoadEntity(Base):
                 self._logger.warning(f"No Entity Class String found cannot validate data!")
                 return None
             try:
-                entity = import_string(self.entity_class_str)
-                self._entity: 'BaseEntity' = entity
+                self._entity = _resolve_entity_class(self.entity_class_str)
             except ImportError:
                 self._logger.warning(
                     f"Cannot load entity from class string {self.entity_class_str} cannot validate data!"
@@ -97,83 +123,46 @@ class LoadEntity(Base):
                 return None
         return self._entity
 
-    # TODO Merge validate and strict validate into one method
-    # TODO Decide whether use default is a valid flag for dbgen
-    def _validate(self, input_data: Dict[str, Any], use_defaults: bool = False, insert: bool = False):
-        entity = self._load_entity()
-        if entity is None:
-            return input_data
-        validated_data, fields_set, errors = validate_model(entity, input_data)
-        # If we have errors during validation check if we are inserting
-        # if we are not inserting we ignore missing values as updates don't require all info
-        # TODO decide whether there is a better way to handle required info
-        if errors:
-            sub_errors = errors.errors()
-            # If insert is not true we cannot check required fields as we are inserting with primary key
-            if not insert:
-                sub_errors = list(filter(lambda x: x.get('type') != 'value_error.missing', sub_errors))
-            # if we still have sub-errors raise the errors to the user
-            if sub_errors:
-                raise errors
-        base_fields = {'id', 'etl_step_id', 'created_at'}
-        return {
-            k: v
-            for k, v in validated_data.items()
-            if k not in base_fields and (use_defaults or k in fields_set)
-        }
-
-    def _strict_validate(self, input_data: Dict[str, Any], use_defaults: bool = False, insert: bool = False):
-        # Check basic validation
-        self._validate(input_data, use_defaults=use_defaults, insert=insert)
-        # Add additional check for expected type for strict typing
-        errors = []
-        for key, val in input_data.items():
-            type_str = self.attributes[key]
-            # if the type str ends with brackets the expected type is an array
-            # TODO check the elements types for lists
-            if type_str.endswith('[]'):
-                expected_type: type = list
-            else:
-                expected_type = column_registry[type_str].get_python_type()
-            # If the val is not the expected type append a TypeError and continue on so we can collect all the errors
-            if not isinstance(val, expected_type):
-                errors.append(
-                    ErrorWrapper(
-                        TypeError(
-                            "Strict validation found an error:\n"
-                            f"{key!r} on Entity {self.name!r} has column type of {type_str!r} which expects a python type of {expected_type!r}, but provided value was type {type(val)}"
-                        ),
-                        loc=key,
-                    )
-                )
-        # If we found any errors raise them
-        if errors:
-            raise PydValidationError(errors, self.__class__)
-        return input_data
+    def _get_validator(
+        self, columns: Sequence[str], validation: ValidationEnum, insert: bool = False
+    ) -> 'LoadValidator':
+        """Get the cached batch validator for the given columns, compiling it on first use."""
+        key = (tuple(columns), validation, insert)
+        load_validator = self._validators.get(key)
+        if load_validator is None:
+            load_validator = self._validators[key] = LoadValidator(self, columns, validation, insert)
+        return load_validator
 
     def _get_hash(self, arg_dict: Dict[str, Any]) -> UUID:
-        id_fks = (str(arg_dict[val]) for val in sorted(self.identifying_foreign_keys))
-        id_attrs = []
+        (row_hash,) = self._get_hashes({key: (val,) for key, val in arg_dict.items()}, 1)
+        return row_hash
+
+    def _get_hashes(self, columns: Mapping[str, Sequence[Any]], length: int) -> List[UUID]:
+        """Get the identifying hash of each of the `length` rows in a batch of columns."""
+        id_columns: List[Sequence[Any]] = []
         for attr_name in sorted(self.identifying_attributes):
             type_str = self.attributes[attr_name]
             data_type = column_registry[type_str]
             type_func = list if type_str == data_type.array_oid else data_type.python_type
             try:
-                arg_val = arg_dict[attr_name]
-                if arg_val is None or isinstance(arg_val, type_func):
-                    coerced_val = arg_val
-                else:
-                    raise TypeError(
+                column = columns[attr_name]
+            except KeyError:
+                raise KeyError(
+                    f"Cannot find id_attribute {attr_name!r} in arg_dict for hashing: {dict(columns)}"
+                )
+            for arg_val in column:
+                if arg_val is not None and not isinstance(arg_val, type_func):
+                    exc = TypeError(
                         f"Type Coercing is turned off. You are trying to insert into attribute {self.name}({attr_name}) which has a type of {type_func} but you provided a type {type(arg_val)}.\n"
                         "If you want to turn Type Coercement on set the configuration variable DBGEN_TYPE_COERCING=true in your config file or environment variable"
                     )
-            except TypeError as exc:
-                raise ValueError(f"Error coercing value {arg_val!r} to type {type_func}:\n{exc}") from exc
-            except KeyError:
-                raise KeyError(f"Cannot find id_attribute {attr_name!r} in arg_dict for hashing: {arg_dict}")
-            id_attrs.append(coerced_val)
-        tuple_to_hash = (*id_attrs, *id_fks)
-        return hash_tuple(tuple_to_hash)
+                    raise ValueError(f"Error coercing value {arg_val!r} to type {type_func}:\n{exc}") from exc
+            id_columns.append(column)
+        for fk_name in sorted(self.identifying_foreign_keys):
+            id_columns.append([str(val) for val in columns[fk_name]])
+        if not id_columns:
+            return [hash_tuple(())] * length
+        return [hash_tuple(tuple_to_hash) for tuple_to_hash in zip(*id_columns)]
 
     @property
     def full_name(self) -> str:
@@ -184,6 +173,146 @@ class LoadEntity(Base):
         return self.identifying_foreign_keys.union(self.identifying_attributes)
 
 
+def _prefix_loc(error: Any, index: int) -> List[ErrorWrapper]:
+    """Flatten pydantic errors and prefix their locations with the row index."""
+    if isinstance(error, ErrorWrapper):
+        return [ErrorWrapper(error.exc, loc=(index, *error.loc_tuple()))]
+    return [wrapper for sub_error in error for wrapper in _prefix_loc(sub_error, index)]
+
+
+# Types whose pydantic validator returns a value of exactly that type unchanged
+_PASSTHROUGH_TYPES = frozenset((str, int, float, bool, bytes, UUID, datetime, date, time, timedelta, dict))
+
+
+class LoadValidator:
+    """Validates a batch of columns bound for a single LoadEntity.
+
+    The per-column work (field lookup, expected python types, missing required fields) is done once on
+    construction so validating a batch only costs a type check for values that already have the
+    field's type. All errors in the batch are collected and raised together with the row index in
+    the error location.
+    """
+
+    def __init__(
+        self, load_entity: LoadEntity, columns: Sequence[str], validation: ValidationEnum, insert: bool
+    ):
+        self.name = load_entity.name
+        self.columns = tuple(columns)
+        self.validation = validation
+        self.insert = insert
+        self.entity = load_entity._load_entity()
+        self.fields: Dict[str, Tuple[ModelField, Optional[type]]] = {}
+        self.missing: List[str] = []
+        self.use_model = False
+        if self.entity is not None:
+            fields = self.entity.__fields__
+            config = self.entity.__config__
+            # Custom validators may depend on other values so fall back on full model validation
+            self.use_model = bool(
+                self.entity.__pre_root_validators__
+                or self.entity.__post_root_validators__
+                or any(field.class_validators for field in fields.values())
+            )
+            modifies_str = (
+                config.anystr_strip_whitespace
+                or config.anystr_lower
+                or config.min_anystr_length
+                or config.max_anystr_length is not None
+            )
+            for col in self.columns:
+                field = fields.get(col)
+                if field is None:
+                    continue
+                passthrough = field.outer_type_ if field.shape == SHAPE_SINGLETON else None
+                if passthrough not in _PASSTHROUGH_TYPES or (modifies_str and passthrough in (str, bytes)):
+                    passthrough = None
+                self.fields[col] = (field, passthrough)
+            # Updates don't require all info so only check required fields on insert
+            if insert:
+                self.missing = [
+                    name for name, field in fields.items() if field.required and name not in columns
+                ]
+        self.strict_types: Dict[str, type] = {}
+        if validation == ValidationEnum.STRICT:
+            for col in self.columns:
+                type_str = load_entity.attributes[col]
+                self.strict_types[col] = (
+                    list if type_str.endswith('[]') else column_registry[type_str].get_python_type()
+                )
+        self.type_strs = {col: load_entity.attributes.get(col) for col in self.strict_types}
+
+    def __call__(self, columns: Mapping[str, Sequence[Any]]) -> Dict[str, Sequence[Any]]:
+        errors: List[ErrorWrapper] = [ErrorWrapper(MissingError(), loc=name) for name in self.missing]
+        validated: Dict[str, Sequence[Any]] = dict(columns)
+        if self.use_model:
+            validated = self._validate_model(columns, errors)
+        else:
+            for col, (field, passthrough) in self.fields.items():
+                validated[col] = self._validate_column(col, columns[col], field, passthrough, errors)
+        if self.strict_types:
+            # Strict validation checks the raw values and does not coerce them
+            for col, expected_type in self.strict_types.items():
+                self._check_column_type(col, columns[col], expected_type, errors)
+            validated = dict(columns)
+        if errors:
+            raise PydValidationError(errors, self.entity or LoadEntity)
+        return validated
+
+    def _validate_column(
+        self,
+        col: str,
+        values: Sequence[Any],
+        field: ModelField,
+        passthrough: Optional[type],
+        errors: List[ErrorWrapper],
+    ) -> List[Any]:
+        out = []
+        allow_none = field.allow_none
+        for i, value in enumerate(values):
+            if type(value) is passthrough or (value is None and allow_none):
+                out.append(value)
+                continue
+            value, error = field.validate(value, {}, loc=col, cls=self.entity)  # type: ignore
+            if error:
+                errors.extend(_prefix_loc(error, i))
+            out.append(value)
+        return out
+
+    def _validate_model(
+        self, columns: Mapping[str, Sequence[Any]], errors: List[ErrorWrapper]
+    ) -> Dict[str, Sequence[Any]]:
+        keys = list(columns)
+        out: Dict[str, Any] = {key: [] for key in keys}
+        for i, row in enumerate(zip(*columns.values())):
+            values, _, error = validate_model(self.entity, dict(zip(keys, row)))  # type: ignore
+            if error:
+                # Missing fields are the same for every row and are reported once
+                row_errors = [
+                    err
+                    for err in error.raw_errors
+                    if not (isinstance(err, ErrorWrapper) and isinstance(err.exc, MissingError))
+                ]
+                errors.extend(_prefix_loc(row_errors, i))
+            for key, value in zip(keys, row):
+                out[key].append(values.get(key, value))
+        return out
+
+    def _check_column_type(
+        self, col: str, values: Sequence[Any], expected_type: type, errors: List[ErrorWrapper]
+    ) -> None:
+        for i, value in enumerate(values):
+            if not isinstance(value, expected_type):
+                errors.append(
+                    ErrorWrapper(
+                        TypeError(
+                            "Strict validation found an error:\n"
+                            f"{col!r} on Entity {self.name!r} has column type of {self.type_strs[col]!r} which expects a python type of {expected_type!r}, but provided value was type {type(value)}"
+                        ),
+                        loc=(i, col),
+                    )
+                )
+
+
 T = TypeVar('T')
 
 
@@ -286,37 +415,29 @@ class Load(ComputationalNode[T]):
         if any(map(lambda x: len(x) == 0, arg_dict.values())):
             # self._logger.debug(f'Row {arg_dict} produced 0 rows for load {self}')
             return {self.outputs[0]: []}
-        # Check for broadcastability
+        # Broadcast the inputs into equal length columns
         try:
-            is_broadcastable(*arg_dict.values())
+            columns: Mapping[str, Sequence[Any]] = dict(
+                zip(arg_dict.keys(), broadcast_columns(*arg_dict.values()))
+            )
         except ValueError as exc:
             raise ValueError(
                 f"While assembling rows for loading into {self} found two sequences in the inputs to the load with non-equal, >1 length\n"
                 "This can occur when two outputs from pyblocks/queries are unequal in length.\n"
                 "If so, please make the relevant cartesian product of the two lists before loading\n"
             ) from exc
-        try:
-            broadcasted_values = [
-                {key: val for key, val in zip(arg_dict.keys(), row)} for row in broadcast(*arg_dict.values())
-            ]
-        except ValueError as exc:
-            raise ValueError(
-                f"Error occurred during the loading of row {(str(arg_dict)[:100])} into entity {self.load_entity.full_name}"
-            ) from exc
-
-        # Load
-        validation = self.validation or config.validation
-        if validation == ValidationEnum.STRICT:
-            validation_func = self.load_entity._strict_validate
-        elif validation == ValidationEnum.COERCE:
-            validation_func = self.load_entity._validate
+        num_rows = len(next(iter(columns.values()), ()))
 
-        try:
-            broadcasted_values = list(map(partial(validation_func, insert=self.insert), broadcasted_values))
-        except PydValidationError as exc:
-            raise ValidationError(
-                f"Error occurred during data validation while loading into {self.load_entity.full_name!r}:\n{exc}"
-            ) from exc
+        # Validate the whole batch of broadcasted rows at once
+        validation = self.validation or get_config().validation
+        if validation != ValidationEnum.OFF:
+            load_validator = self.load_entity._get_validator(tuple(columns), validation, self.insert)
+            try:
+                columns = load_validator(columns)
+            except PydValidationError as exc:
+                raise ValidationError(
+                    f"Error occurred during data validation while loading into {self.load_entity.full_name!r}:\n{exc}"
+                ) from exc
         # If we have a user supplied Primary Key go get it and broadcast it
         if self.primary_key is not None:
             primary_arg_val = self.primary_key.arg_get(row)
@@ -330,23 +451,17 @@ class Load(ComputationalNode[T]):
                 ValueError(f"Unknown Primary Key Type: {primary_arg_val}")
 
             if len(primary_keys) == 1:
-                primary_keys *= len(broadcasted_values)
-            elif len(primary_keys) != len(broadcasted_values):
+                primary_keys *= num_rows
+            elif len(primary_keys) != num_rows:
                 raise ValueError(
-                    f"Cannot broadcast Primary Key to Max Length: {len(primary_keys)} {len(broadcasted_values)}"
+                    f"Cannot broadcast Primary Key to Max Length: {len(primary_keys)} {num_rows}"
                 )
         else:
             # If we don't have a primary key get it from the identifying info on the broadcasted
             # Values
-            primary_keys = [self.load_entity._get_hash(row) for row in broadcasted_values]
-        sorted_keys = sorted(self.inputs.keys())
-        # Update rows to load dict in place
-        rows_to_load[self.hash].update(
-            {
-                primary_key: [value[key] for key in sorted_keys]
-                for primary_key, value in zip(primary_keys, broadcasted_values)
-            }
-        )
+            primary_keys = self.load_entity._get_hashes(columns, num_rows)
+        # Update rows to load dict in place, the columns are already in sorted input order
+        rows_to_load[self.hash].update(zip(primary_keys, zip(*columns.values())))
 
         return {self.outputs[0]: primary_keys}
 
@@ -12,9 +12,10 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import json
 from typing import TYPE_CHECKING, Any, Dict
 from typing import Generator as GenType
-from typing import Optional, Type, TypeVar, Union, overload
+from typing import Iterable, List, Optional, Sequence, Tuple, Type, TypeVar, Union, cast, overload
 
 from pydantic import Field
 from sqlalchemy import text
@@ -36,6 +37,17 @@ SCHEMA_DEFAULT = "public"
 T = TypeVar('T')
 
 postgresql_dialect = postgresql.dialect()  # type: ignore
+# The number of rows fetched per round trip from server side cursors
+DEFAULT_ITERSIZE = 2000
+
+
+def _plan_rows(plan: Any) -> Optional[int]:
+    """Get the estimated number of rows from the output of EXPLAIN (FORMAT JSON)."""
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    if not plan:
+        return None
+    return int(plan[0]['Plan']['Plan Rows'])
 
 
 class BaseQuery(Extract[T]):
@@ -44,6 +56,10 @@ class BaseQuery(Extract[T]):
     dependency: Dependency = Field(default_factory=Dependency)
     _connection: 'SAConnection'
     _yield_per: Optional[int] = None
+    _keyset: Optional[List[str]] = None
+    _checkpoint: Optional[Dict[str, Any]] = None
+    _watermark: Optional[str] = None
+    _watermark_range: Tuple[Any, Any] = (None, None)
 
     def _get_dependency(self) -> Dependency:
         return self.dependency
@@ -70,17 +86,25 @@ class BaseQuery(Extract[T]):
 
     def render_query(self) -> str:
         """Stringifies the query with the bound parameters."""
-        compiled_query = (
-            text(self.query).bindparams(**self.params).compile(compile_kwargs={'literal_binds': True})
-        )
+        query, params = self._statement()
+        compiled_query = text(query).bindparams(**params).compile(compile_kwargs={'literal_binds': True})
         return str(compiled_query)
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        # Connections belong to the process that opened them so they are never pickled
+        private_values = dict(state['__private_attribute_values__'])
+        private_values.pop('_connection', None)
+        state['__private_attribute_values__'] = private_values
+        return state
+
     def set_connection(self, connection: 'SAConnection', yield_per: Optional[int] = None):
         self._connection = connection
         self._yield_per = yield_per
 
-    def length(self) -> int:
-        rows: int = self._connection.execute(text(self.count_statement)).scalar()  # type: ignore
+    def length(self, connection: Optional['SAConnection'] = None) -> int:
+        connection = connection or self._connection
+        rows: int = connection.execute(text(self.count_statement)).scalar()  # type: ignore
         return rows
 
     async def _async_length(self, *, connection: 'AsyncConnection' = None, **_) -> Optional[int]:
@@ -93,9 +117,21 @@ class BaseQuery(Extract[T]):
         (count,) = out if out else (None,)
         return count
 
+    def estimated_length(self, connection: Optional['SAConnection'] = None) -> Optional[int]:
+        """Use the query planner's row estimate rather than executing the query."""
+        connection = connection or self._connection
+        plan = connection.execute(text(self.explain_statement)).scalar()
+        return _plan_rows(plan)
+
+    async def _async_estimated_length(self, *, connection: 'AsyncConnection' = None, **_) -> Optional[int]:
+        assert connection
+        result = await connection.execute(self.explain_statement)
+        out = await result.fetchone()
+        return _plan_rows(out[0] if out else None)
+
     @property
     def compiled_query(self):
-        return str(text(self.query).compile(dialect=postgresql_dialect))
+        return str(text(self._statement()[0]).compile(dialect=postgresql_dialect))
 
     @property
     def count_statement(self):
@@ -103,19 +139,93 @@ class BaseQuery(Extract[T]):
             text(f'select count(1) from ({self.render_query()}) as X').compile(dialect=postgresql_dialect)
         )
 
+    @property
+    def explain_statement(self):
+        return str(text(f'EXPLAIN (FORMAT JSON) {self.render_query()}').compile(dialect=postgresql_dialect))
+
     def extract(
         self,
     ) -> GenType[T, None, None]:
-        if self._yield_per:
-            result = self._connection.execution_options(stream_results=True).execute(
-                text(self.query).bindparams(**self.params)
-            )
-            while chunk := result.fetchmany(self._yield_per):
-                for row in chunk:
-                    yield dict(row)  # type: ignore
-        else:
-            result = self._connection.execute(text(self.query).bindparams(**self.params))
-            yield from result.mappings()  # type: ignore
+        # Stream the rows through a server side cursor so only itersize rows are held in memory at once
+        itersize = self._yield_per or DEFAULT_ITERSIZE
+        query, params = self._keyset_statement() if self._keyset else self._statement()
+        result = self._connection.execution_options(stream_results=True, max_row_buffer=itersize).execute(
+            text(query).bindparams(**params)
+        )
+        output_indices = self._output_indices(list(result.keys()))
+        while chunk := result.fetchmany(itersize):
+            yield from self._map_rows(chunk, output_indices)  # type: ignore
+
+    def set_watermark(self, column: Optional[str], low: Any = None, high: Any = None):
+        """Only extract the rows whose watermark column is above low and at most high."""
+        self._watermark = column
+        self._watermark_range = (low, high)
+
+    def max_watermark(self, column: str, connection: Optional['SAConnection'] = None) -> Any:
+        """Get the high water mark of a column in the query's rows."""
+        connection = connection or self._connection
+        quote = postgresql_dialect.identifier_preparer.quote
+        statement = text(f'SELECT max({quote(column)}) FROM ({self.query}) AS watermark').bindparams(
+            **self.params
+        )
+        return connection.execute(statement).scalar()
+
+    def _statement(self) -> Tuple[str, Dict[str, Any]]:
+        """Get the query and its parameters restricted to the watermark range if one is set."""
+        if self._watermark is None:
+            return self.query, self.params
+        column = postgresql_dialect.identifier_preparer.quote(self._watermark)
+        conditions, params = [], dict(self.params)
+        for (operator, param), value in zip(
+            (('>', '_dbgen_watermark_low'), ('<=', '_dbgen_watermark_high')), self._watermark_range
+        ):
+            if value is not None:
+                conditions.append(f'{column} {operator} :{param}')
+                params[param] = value
+        if not conditions:
+            return self.query, self.params
+        return f"SELECT * FROM ({self.query}) AS watermark WHERE {' AND '.join(conditions)}", params
+
+    def set_keyset(self, keyset: Optional[List[str]], checkpoint: Optional[Dict[str, Any]] = None):
+        """Extract in order of the unique keyset columns, starting after the checkpoint if given."""
+        self._keyset = keyset
+        self._checkpoint = checkpoint
+
+    def get_checkpoint(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the keyset values of an extracted row to resume the extraction after it."""
+        assert self._keyset, 'Checkpoints are only available for keyset paginated queries'
+        return {key: row[key] for key in self._keyset}
+
+    def _keyset_statement(self) -> Tuple[str, Dict[str, Any]]:
+        """Get the query ordered by the keyset columns and restricted to the rows after the checkpoint."""
+        keyset = cast(List[str], self._keyset)
+        quote = postgresql_dialect.identifier_preparer.quote
+        key_columns = ', '.join(quote(key) for key in keyset)
+        query, params = self._statement()
+        where = ''
+        if self._checkpoint is not None:
+            key_params = [f'_dbgen_keyset_{i}' for i in range(len(keyset))]
+            where = f"WHERE ({key_columns}) > ({', '.join(f':{param}' for param in key_params)})"
+            params = {**params, **dict(zip(key_params, (self._checkpoint[key] for key in keyset)))}
+        return f'SELECT * FROM ({query}) AS keyset {where} ORDER BY {key_columns}', params
+
+    def _map_rows(self, rows: Sequence[Any], output_indices: Optional[List[int]]) -> Iterable[Any]:
+        if output_indices is None:
+            return map(dict, rows)
+        elif output_indices == list(range(len(self.outputs))):
+            return map(tuple, rows)
+        return (tuple(row[i] for i in output_indices) for row in rows)
+
+    def _output_indices(self, columns: List[str]) -> Optional[List[int]]:
+        """
+        Find the index of each output in the query's columns.
+
+        Rows are only yielded as tuples when the columns are exactly the outputs, otherwise they are yielded
+        as dictionaries so that the extracted rows, and therefore their repeat hashes, are unchanged.
+        """
+        if len(columns) != len(set(columns)) or set(columns) != set(self.outputs):
+            return None
+        return [columns.index(output) for output in self.outputs]
 
 
 class ExternalQuery(BaseQuery[T]):
@@ -12,13 +12,30 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from itertools import chain
+import atexit
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from enum import Enum
+from functools import partial
 from traceback import format_exc
-from typing import TYPE_CHECKING, Any, Callable, Dict, Mapping, Optional, Tuple, TypeVar, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
-from pydantic import Field, root_validator, validator
+from pydantic import Field, PrivateAttr, root_validator, validator
 
-from dbgen.configuration import config
+from dbgen.configuration import get_config
 from dbgen.core.func import Environment, Func, func_from_callable
 from dbgen.core.node.computational_node import ComputationalNode
 from dbgen.exceptions import (
@@ -27,8 +44,8 @@ from dbgen.exceptions import (
     DBgenPythonTransformError,
     DBgenSkipException,
 )
-from dbgen.utils.lists import broadcast
-from dbgen.utils.log import capture_stdout
+from dbgen.utils.lists import broadcast_columns
+from dbgen.utils.log import StdoutCapture, capture_stdout, captured_stdout
 
 if TYPE_CHECKING:
     from dbgen.core.run.utilities import RunConfig
@@ -46,6 +63,7 @@ class PythonTransform(Transform[Output]):
 
     env: Optional[Environment] = Field(default_factory=lambda: Environment(imports=set()))
     function: Func[Output]
+    _calls: int = PrivateAttr(0)
 
     @validator('function', pre=True)
     def convert_callable_to_func(cls, function: Union[Func[Output], Callable[..., Output]], values):
@@ -92,7 +110,7 @@ class PythonTransform(Transform[Output]):
                 kwargs['settings'] = run_config.settings
 
         try:
-            output = self.apply(args, kwargs)
+            output = self.apply(args, kwargs, capture=self._should_capture(run_config))
             return self._process_outputs(output)
         except (DBgenSkipException, DBgenPythonTransformError):
             raise
@@ -121,44 +139,146 @@ class PythonTransform(Transform[Output]):
     def name(self):
         return self.function.name
 
-    def apply(self, args, kwargs):
-        wrapped = capture_stdout(self.function) if not config.pdb else self.function
+    def _should_capture(self, run_config: Optional['RunConfig']) -> bool:
+        """Check the run's stdout capture policy to see if this call should be captured."""
+        if get_config().pdb:
+            return False
+        policy = run_config.capture_stdout if run_config else StdoutCapture.ALWAYS
+        if policy == StdoutCapture.SAMPLED:
+            assert run_config
+            # Capture the first call and every stdout_sample_rate-th call after it
+            capture = self._calls % run_config.stdout_sample_rate == 0
+            self._calls += 1
+            return capture
+        return policy == StdoutCapture.ALWAYS
+
+    def apply(self, args, kwargs, capture: bool = True):
+        wrapped = capture_stdout(self.function, self.function.stdout_logger) if capture else self.function
         output = wrapped(*args.values(), **kwargs)
         return output
 
     def map(self, *args, **kwargs):
-        return MapTransform(inputs=args, kwargs=kwargs, env=self.env, outputs=self.outputs)
+        return MapTransform(
+            inputs=args, kwargs=kwargs, function=self.function, env=self.env, outputs=self.outputs
+        )
 
 
 not_list = lambda x: not isinstance(x, (list, tuple))
 
 
+class MapExecutor(str, Enum):
+    """How a MapTransform fans its calls out over the mapped elements."""
+
+    SERIAL = 'serial'
+    THREAD = 'thread'
+    PROCESS = 'process'
+
+
+# Pools are shared by every MapTransform in a process and keyed by pid so forked children never reuse a parent's pool
+_POOLS: Dict[Tuple[int, MapExecutor, Optional[int]], Executor] = {}
+
+
+def _shutdown_pools() -> None:
+    for pool in _POOLS.values():
+        pool.shutdown(wait=False)
+    _POOLS.clear()
+
+
+atexit.register(_shutdown_pools)
+
+
+def _get_pool(executor: MapExecutor, max_workers: Optional[int]) -> Executor:
+    key = (os.getpid(), executor, max_workers)
+    pool = _POOLS.get(key)
+    if pool is None:
+        pool_class = ThreadPoolExecutor if executor == MapExecutor.THREAD else ProcessPoolExecutor
+        pool = pool_class(max_workers=max_workers)
+        _POOLS[key] = pool
+    return pool
+
+
+def _map_chunk(
+    function: Callable, num_args: int, kwarg_names: Sequence[str], rows: Sequence[Tuple[Any, ...]]
+) -> List[Any]:
+    """Apply function to each broadcasted row, splitting the row into args and kwargs by position."""
+    if not kwarg_names:
+        return [function(*row) for row in rows]
+    return [function(*row[:num_args], **dict(zip(kwarg_names, row[num_args:]))) for row in rows]
+
+
+def _capture_chunk(
+    function: Func, num_args: int, kwarg_names: Sequence[str], rows: Sequence[Tuple[Any, ...]]
+) -> List[Any]:
+    """Picklable entrypoint for process pools as the capture_stdout wrapper cannot be sent to a worker."""
+    with captured_stdout(function.stdout_logger):
+        return _map_chunk(function, num_args, kwarg_names, rows)
+
+
 class MapTransform(PythonTransform[Output]):
     broadcast: bool = True
+    executor: MapExecutor = MapExecutor.SERIAL
+    max_workers: Optional[int] = None
+    chunksize: int = 64
+    _settings_ = {'executor', 'max_workers', 'chunksize'}
+    _hashexclude_ = _settings_
 
-    def apply(self, args, kwargs):
-        wrapped = capture_stdout(self.function) if not config.pdb else self.function
+    @validator('chunksize')
+    def positive_chunksize(cls, chunksize: int) -> int:
+        if chunksize < 1:
+            raise ValueError(f'chunksize must be a positive integer: {chunksize}')
+        return chunksize
 
-        # If we don't want to broadcast
-        zipper = broadcast if self.broadcast else zip
-
-        listified_inputs = {
-            key: [val] if not_list(val) else val for key, val in chain(args.items(), kwargs.items())
-        }
+    def apply(self, args, kwargs, capture: bool = True):
+        # Precompute the layout of the broadcasted rows, positional args first then kwargs
+        num_args = len(args)
+        kwarg_names = tuple(kwargs)
+        columns = [[val] if not_list(val) else val for val in (*args.values(), *kwargs.values())]
         try:
-            input_dicts = (dict(zip(listified_inputs, x)) for x in zipper(*listified_inputs.values()))
+            rows = self._zip_columns(columns)
         except Exception as exc:
             raise BroadcastException('Error occurred while broadcasting inputs to the MapTransform') from exc
 
-        output = [
-            wrapped(*arg_curr, **kwarg_curr) for arg_curr, kwarg_curr in map(self._make_input, input_dicts)
-        ]
-        tupled_outputs = tuple(zip(*list((x,) if not isinstance(x, tuple) else x for x in output)))
-        return tupled_outputs
-
-    @staticmethod
-    def _make_input(input_dict: Dict[str, Any]) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
-        """Utility for taking dict of args and kwargs and splitting into tuple"""
-        input_args = tuple(v for k, v in input_dict.items() if k.isdigit())
-        input_kwargs = {k: v for k, v in input_dict.items() if not k.isdigit()}
-        return input_args, input_kwargs
+        if self.executor == MapExecutor.PROCESS and not get_config().pdb:
+            output = self._process_map(num_args, kwarg_names, rows, capture)
+        else:
+            # stdout is process wide so one capture around the whole map also covers pool threads
+            with captured_stdout(self.function.stdout_logger) if capture else nullcontext():
+                if self.executor == MapExecutor.THREAD and not get_config().pdb:
+                    output = self._thread_map(num_args, kwarg_names, rows)
+                else:
+                    output = _map_chunk(self.function, num_args, kwarg_names, rows)
+
+        if not output:
+            return tuple(() for _ in self.outputs)
+        return tuple(zip(*[x if isinstance(x, tuple) else (x,) for x in output]))
+
+    def _zip_columns(self, columns: List[Sequence[Any]]) -> List[Tuple[Any, ...]]:
+        if not self.broadcast:
+            return list(zip(*columns))
+        return list(zip(*broadcast_columns(*columns)))
+
+    def _chunks(self, rows: List[Tuple[Any, ...]]) -> List[List[Tuple[Any, ...]]]:
+        return [rows[i : i + self.chunksize] for i in range(0, len(rows), self.chunksize)]
+
+    def _thread_map(
+        self, num_args: int, kwarg_names: Sequence[str], rows: List[Tuple[Any, ...]]
+    ) -> List[Any]:
+        pool = _get_pool(MapExecutor.THREAD, self.max_workers)
+        runner = partial(_map_chunk, self.function, num_args, kwarg_names)
+        output: List[Any] = []
+        for chunk_output in pool.map(runner, self._chunks(rows)):
+            output.extend(chunk_output)
+        return output
+
+    def _process_map(
+        self, num_args: int, kwarg_names: Sequence[str], rows: List[Tuple[Any, ...]], capture: bool
+    ) -> List[Any]:
+        pool = _get_pool(MapExecutor.PROCESS, self.max_workers)
+        # Send a copy without the materialized function so the Func can be pickled
+        function = self.function.copy()
+        function.set_func(None)
+        runner = partial(_capture_chunk if capture else _map_chunk, function, num_args, kwarg_names)
+        output: List[Any] = []
+        for chunk_output in pool.map(runner, self._chunks(rows)):
+            output.extend(chunk_output)
+        return output
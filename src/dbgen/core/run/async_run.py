@@ -24,7 +24,6 @@ from uuid import UUID
 
 import psutil
 from psycopg import AsyncConnection
-from psycopg.rows import dict_row
 from psycopg_pool import AsyncConnectionPool
 from pydasher import hasher
 from sqlalchemy.future import Engine
@@ -34,11 +33,12 @@ from dbgen.core.base import encoders
 from dbgen.core.dashboard import BarNames, Dashboard
 from dbgen.core.etl_step import ETLStep
 from dbgen.core.metadata import ETLStepRunEntity, Repeats, RunEntity, Status
-from dbgen.core.node.extract import Extract
-from dbgen.core.node.query import BaseQuery
-from dbgen.core.run.utilities import BaseETLStepExecutor
+from dbgen.core.node.extract import Extract, PythonExtract
+from dbgen.core.node.load import _resolve_entity_class
+from dbgen.core.node.query import BaseQuery, ExternalQuery
+from dbgen.core.run.utilities import BaseETLStepExecutor, RowCount, RunMetricsWriter
 from dbgen.exceptions import DBgenExternalError, TransformerError
-from dbgen.utils.log import setup_logger
+from dbgen.utils.log import LogLevel, setup_logger
 from dbgen.utils.typing import NAMESPACE_TYPE, ROWS_TO_LOAD_TYPE
 
 if TYPE_CHECKING:
@@ -49,6 +49,18 @@ TRANSFORM_RETURN_TYPE = Union[
     Tuple[None, None, None, int, str], Tuple[list, Dict[str, Dict[UUID, dict]], int, int, None]
 ]
 
+
+def _initialize_worker(level: LogLevel, std_out_level: LogLevel, entity_class_strs: List[str]) -> None:
+    """Set up logging and import the loaded Entity classes once when a transform worker starts."""
+    setup_logger(level, std_out_level)
+    for entity_class_str in entity_class_strs:
+        try:
+            _resolve_entity_class(entity_class_str)
+        except ImportError:
+            # The LoadEntity warns about unresolvable entities when it first validates
+            pass
+
+
 # TODO Add data to the Async Run object to minimize data passing around1
 # TODO Refactor the methods to reduce verbosity and increase clarity
 # TODO Type annottate queues
@@ -74,24 +86,32 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
             ).all()
         )
         self._logger.debug(f'Found {len(self._old_repeats)} repeated rows')
-        (
-            inputs_extracted,
-            unique_inputs,
-            inputs_processed,
-            inputs_skipped,
-            rows_inserted,
-            rows_updated,
-            memory_usage,
-            exc,
-        ) = asyncio.run(
-            self.main(
-                self.etl_step,
-                main_dsn=str(main_engine.url),
-                meta_dsn=str(meta_engine.url),
-                batch_size=batch_size,
-                dashboard=dashboard,
+        self._set_manifest(self.etl_step.extract, meta_session)
+        if self.etl_step.watermark:
+            extract = self.etl_step.extract
+            engine = extract.connection.get_engine() if isinstance(extract, ExternalQuery) else main_engine
+            with engine.connect() as connection:
+                self._set_watermark(extract, meta_session, connection)
+        with RunMetricsWriter(meta_engine, etl_step_run, self.run_config.metrics_interval) as metrics:
+            (
+                inputs_extracted,
+                unique_inputs,
+                inputs_processed,
+                inputs_skipped,
+                rows_inserted,
+                rows_updated,
+                memory_usage,
+                exc,
+            ) = asyncio.run(
+                self.main(
+                    self.etl_step,
+                    main_dsn=str(main_engine.url),
+                    meta_dsn=str(meta_engine.url),
+                    batch_size=batch_size,
+                    dashboard=dashboard,
+                    metrics=metrics,
+                )
             )
-        )
         if exc:
             etl_step_run.status = Status.failed
             etl_step_run.error = str(exc)
@@ -105,6 +125,8 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
             meta_session.close()
             return 1
 
+        self._save_watermark(meta_session, run_id)
+        self._save_manifest(meta_session)
         etl_step_run.status = Status.completed
         etl_step_run.inputs_extracted = inputs_extracted
         etl_step_run.unique_inputs = unique_inputs
@@ -131,6 +153,7 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
         meta_dsn: str,
         batch_size: int,
         dashboard: Optional[Dashboard],
+        metrics: Optional[RunMetricsWriter] = None,
     ):
         # Initialize multiprocessing start method
         conn_pool = AsyncConnectionPool(main_dsn, name='test', min_size=4)
@@ -140,6 +163,10 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
         loop = asyncio.get_running_loop()
         # Remove the stored functions on the etl_step for pickling
         etl_step.remove_stored_func()
+        # Extraction stays in this process so the workers get a copy without the extract's function
+        worker_etl_step = etl_step.frozen()
+        if isinstance(worker_etl_step.extract, PythonExtract):
+            worker_etl_step.extract.function.set_func(None)
         # Initialize the queues and type them
         transform_queue: asyncio.Queue[Tuple[Optional[UUID], Optional[NAMESPACE_TYPE]]] = asyncio.Queue()
         tform_results: asyncio.Queue[asyncio.Future[TRANSFORM_RETURN_TYPE]] = asyncio.Queue()
@@ -155,8 +182,16 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
             with ProcessPoolExecutor(
                 cpu_count(),
                 mp_context=context,
-                initializer=setup_logger,  # type: ignore
-                initargs=(self.run_config.log_level, self.run_config.log_level),
+                initializer=_initialize_worker,
+                initargs=(
+                    self.run_config.log_level,
+                    self.run_config.log_level,
+                    [
+                        load.load_entity.entity_class_str
+                        for load in etl_step.loads
+                        if load.load_entity.entity_class_str is not None
+                    ],
+                ),
             ) as executor:
                 mem_usage = asyncio.create_task(self.memory_usage(executor))
                 routines = (
@@ -169,9 +204,10 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
                         dashboard=dashboard,
                         etl_step_id=etl_step.uuid,
                         retry=self.run_config.retry,
+                        metrics=metrics,
                     ),
                     self.transformer(
-                        etl_step,
+                        worker_etl_step,
                         transform_queue,
                         tform_results,
                         loop,
@@ -183,8 +219,11 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
                         tform_results,
                         load_queue,
                         dashboard=dashboard,
+                        metrics=metrics,
+                    ),
+                    self.loader(
+                        etl_step, load_queue, repeats_queue, conn_pool, dashboard=dashboard, metrics=metrics
                     ),
-                    self.loader(etl_step, load_queue, repeats_queue, conn_pool, dashboard=dashboard),
                     self.repeat_loader(repeats_queue, meta_conn_pool, etl_step.uuid),
                     self.set_length(etl_step.extract, dashboard, conn_pool),
                 )
@@ -231,12 +270,35 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
         dashboard: Optional[Dashboard],
         etl_step_id: UUID,
         retry: bool,
+        metrics: Optional[RunMetricsWriter] = None,
     ) -> Tuple[int, int, int]:
         """Take a query and param and stream the outputs to the queue."""
         logger = self._logger.getChild('extractor')
         unique_inputs, inputs_extracted, inputs_processed = 0, 0, 0
         with extract:
-            if not isinstance(extract, BaseQuery):
+            if extract.yields_batches():
+                for extracted_batch in extract.extract_batches():
+                    rows = extract.process_batch(extracted_batch)
+                    for row, input_hash in zip(rows, self._hash_rows(rows, etl_step_id)):
+                        is_repeat = input_hash in self._old_repeats or input_hash in self._new_repeats
+                        inputs_extracted += 1
+                        if not is_repeat:
+                            # Rows repeated within the batches of this run are only transformed once
+                            unique_inputs += 1
+                            self._new_repeats.add(input_hash)
+                        if not is_repeat or retry:
+                            await queue.put((input_hash, {extract.hash: row}))
+                            inputs_processed += 1
+                    if dashboard:
+                        dashboard.advance_bar(BarNames.EXTRACTED, advance=len(rows))
+                    if metrics:
+                        metrics.update(inputs_extracted=inputs_extracted, unique_inputs=unique_inputs)
+                    # Yield to the transformer once per batch
+                    await asyncio.sleep(0)
+                await queue.put((None, None))
+                if dashboard:
+                    dashboard.set_total(inputs_extracted)
+            elif not isinstance(extract, BaseQuery):
                 for i, row in enumerate(extract.extract()):
                     if dashboard:
                         dashboard.advance_bar(BarNames.EXTRACTED, advance=1)
@@ -250,6 +312,8 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
                     else:
                         continue
                     if i % batch_size == 0:
+                        if metrics:
+                            metrics.update(inputs_extracted=inputs_extracted, unique_inputs=unique_inputs)
                         await asyncio.sleep(0.05)
                 await queue.put((None, None))
                 # Start the bars with the fully extracted total
@@ -257,10 +321,15 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
                     dashboard.set_total(i)
             else:
                 async with await AsyncConnection.connect(async_dsn) as conn:
-                    async with conn.cursor(row_factory=dict_row) as cursor:
-                        result = await cursor.execute(extract.compiled_query, extract.params)
+                    # A named cursor keeps the result set on the server and fetches itersize rows at a time
+                    async with conn.cursor(name='dbgen_extract') as cursor:
+                        cursor.itersize = self.run_config.itersize or batch_size
+                        await cursor.execute(extract.compiled_query, extract._statement()[1])
+                        assert cursor.description is not None
+                        columns = [column.name for column in cursor.description]
+                        output_indices = extract._output_indices(columns)
                         i = 0
-                        async for row in result:
+                        async for row in cursor:
                             logged = False
                             while (queue.qsize() / batch_size) < (load_queue.qsize() - 100):
                                 if not logged:
@@ -268,21 +337,33 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
                                     logged = True
                                 await asyncio.sleep(1)
 
-                            is_repeat, input_hash = self._check_repeat(row, etl_step_id)
+                            if output_indices is None:
+                                processed_row = dict(zip(columns, row))
+                            else:
+                                processed_row = extract.process_row(
+                                    tuple(row[index] for index in output_indices)
+                                )
+                            is_repeat, input_hash = self._check_repeat(processed_row, etl_step_id)
                             # increment unique inputs and extracted inputs
                             inputs_extracted += 1
                             unique_inputs += 1 if not is_repeat else 0
                             if not is_repeat or retry:
-                                await queue.put((input_hash, {extract.hash: extract.process_row(row)}))
+                                await queue.put((input_hash, {extract.hash: processed_row}))
                             else:
                                 continue
                             if dashboard:
                                 dashboard.advance_bar(BarNames.EXTRACTED, advance=1)
                             if i % batch_size == 0:
+                                if metrics:
+                                    metrics.update(
+                                        inputs_extracted=inputs_extracted, unique_inputs=unique_inputs
+                                    )
                                 await asyncio.sleep(0.05)
                             i += 1
 
                         await queue.put((None, None))
+        if metrics:
+            metrics.update(inputs_extracted=inputs_extracted, unique_inputs=unique_inputs)
         logger.debug('Extraction Finished')
         return inputs_extracted, unique_inputs, inputs_processed
 
@@ -331,6 +412,7 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
         load_queue: asyncio.Queue,
         dashboard: Optional[Dashboard],
         timeout: float = 0.05,
+        metrics: Optional[RunMetricsWriter] = None,
     ):
         task_set: Set[asyncio.Future[TRANSFORM_RETURN_TYPE]] = set()
         logger = self._logger.getChild('results')
@@ -354,6 +436,8 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
                 inputs_skipped += skipped
                 if tb is not None:
                     raise TransformerError(tb)
+                if metrics:
+                    metrics.update(inputs_skipped=inputs_skipped)
                 if dashboard and update:
                     dashboard.advance_bar(BarNames.TRANSFORMED, advance=update)
                 await load_queue.put((processed_hashes, rows_to_load, update))
@@ -366,6 +450,8 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
                     inputs_skipped += skipped
                     if tb is not None:
                         raise TransformerError(tb)
+                    if metrics:
+                        metrics.update(inputs_skipped=inputs_skipped)
                     if dashboard:
                         dashboard.advance_bar(BarNames.TRANSFORMED, advance=update)
                     await load_queue.put((processed_hashes, rows_to_load, update))
@@ -406,6 +492,7 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
         repeat_queue: 'asyncio.Queue[Set[UUID]]',
         conn_pool: AsyncConnectionPool,
         dashboard: Optional[Dashboard],
+        metrics: Optional[RunMetricsWriter] = None,
     ):
         rows_inserted = 0
         rows_updated = 0
@@ -437,6 +524,8 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
                             rows_inserted += rows_modified
                         else:
                             rows_updated += rows_modified
+                if metrics:
+                    metrics.update(rows_inserted=rows_inserted, rows_updated=rows_updated)
             if dashboard:
                 dashboard.advance_bar(BarNames.LOADED, advance=number_of_rows)
             await repeat_queue.put(processed_hashes)
@@ -483,15 +572,24 @@ class AsyncETLStepExecutor(BaseETLStepExecutor):
         self, extract: Extract, dashboard: Optional[Dashboard], conn_pool: AsyncConnectionPool
     ):
         logger = self._logger.getChild('set_length')
-        if isinstance(extract, BaseQuery):
-            logger.debug('querying for the query length')
+        row_count = self.run_config.row_count
+        if row_count == RowCount.SKIP:
+            return None
+        if not isinstance(extract, BaseQuery):
+            total = extract.length()
+        else:
+            # The length is fetched alongside the extraction so it never blocks it
             async with conn_pool.connection() as aconn:
                 logger.debug('got connection')
-                total = await extract._async_length(connection=aconn)
-
+                if row_count in (RowCount.ESTIMATE, RowCount.LAZY):
+                    logger.debug('querying for the estimated query length')
+                    total = await extract._async_estimated_length(connection=aconn)
+                    if row_count == RowCount.LAZY and total is not None and dashboard:
+                        dashboard.set_total(total)
+                if row_count in (RowCount.EXACT, RowCount.LAZY):
+                    logger.debug('querying for the query length')
+                    total = await extract._async_length(connection=aconn)
             logger.debug('got query length')
-        else:
-            total = extract.length()
         if total is not None and dashboard:
             dashboard.set_total(total)
         return total
@@ -14,19 +14,22 @@
 
 """Objects related to the running of Models and ETLSteps."""
 from bdb import BdbQuit
+from logging import getLogger
 from math import ceil
+from threading import Thread
 from time import time
 from traceback import format_exc
 from typing import TYPE_CHECKING, Any, Dict, Generator, List, Optional, Tuple
 from uuid import UUID
 
 from psycopg import connect as pg3_connect
+from pydantic import PrivateAttr
 from pydasher import hasher
 from sqlalchemy.future import Engine
 from sqlmodel import Session, select
 
 import dbgen.exceptions as exceptions
-from dbgen.configuration import config
+from dbgen.configuration import get_config
 from dbgen.core.base import Base, encoders
 from dbgen.core.dashboard import BarNames, Dashboard
 from dbgen.core.etl_step import ETLStep
@@ -34,17 +37,29 @@ from dbgen.core.metadata import ETLStepEntity, ETLStepRunEntity, Repeats, RunEnt
 from dbgen.core.node.extract import Extract
 from dbgen.core.node.query import BaseQuery, ExternalQuery
 from dbgen.core.run.async_run import AsyncETLStepExecutor
-from dbgen.core.run.utilities import BaseETLStepExecutor, RunConfig, update_run_by_id
+from dbgen.core.run.utilities import (
+    PROGRESS_FIELDS,
+    BaseETLStepExecutor,
+    RowCount,
+    RunConfig,
+    RunMetricsWriter,
+    to_json_value,
+    update_run_by_id,
+)
 from dbgen.exceptions import SerializationError
 from dbgen.utils.typing import NAMESPACE_TYPE
 
 if TYPE_CHECKING:
     from psycopg import Connection as PG3Connection
 
+logger = getLogger(__name__)
+
 
 class ETLStepExecutor(BaseETLStepExecutor):
     """Synchronous ETLStep Executor."""
 
+    _progress: Dict[str, int] = PrivateAttr(default_factory=dict)
+
     def execute(
         self,
         main_engine: Engine,
@@ -72,17 +87,22 @@ class ETLStepExecutor(BaseETLStepExecutor):
         self._logger.debug('Initializing extractor')
         extract = self.etl_step.extract
         extract._set_run_config(self.run_config)
+        self._set_manifest(extract, meta_session)
         with main_engine.connect() as extractor_connection:
             try:
                 with extract:
                     # Specifically handle Query extracts by passing in the connection to the database to key methods
                     if isinstance(extract, BaseQuery) and not isinstance(extract, ExternalQuery):
                         extract.set_connection(
-                            connection=extractor_connection, yield_per=self.etl_step.batch_size
+                            connection=extractor_connection,
+                            yield_per=self.run_config.itersize or self.etl_step.batch_size,
                         )
+                        if self.etl_step.keyset:
+                            extract.set_keyset(self.etl_step.keyset, self._get_checkpoint(meta_session))
+                    self._set_watermark(extract, meta_session)
 
                     self._logger.debug('Fetching extractor length')
-                    row_count = extract.length() if not self.run_config.skip_row_count else None
+                    row_count = self._get_row_count(extract)
                     # Commit the row count to the metadatabase
                     self._etl_step_run.inputs_extracted = row_count
                     meta_session.commit()
@@ -91,7 +111,7 @@ class ETLStepExecutor(BaseETLStepExecutor):
                     if batch_size is None and row_count:
                         batch_size = ceil(row_count / self.run_config.batch_number)
                     elif batch_size is None:
-                        batch_size = config.batch_size
+                        batch_size = get_config().batch_size
                     # Check for invalid batch sizess
                     if batch_size is not None and batch_size < 0:
                         raise ValueError(f"Invalid batch size batch_size must be >0: {batch_size}")
@@ -103,45 +123,75 @@ class ETLStepExecutor(BaseETLStepExecutor):
                     self._logger.debug('Looping through extracted rows...')
                     if dashboard is not None:
                         dashboard.add_etl_progress_bars(total=row_count)
-                    for batch_ind, batch in enumerate(self.batchify(extract, batch_size, dashboard)):
-                        (
-                            _,
-                            rows_to_load,
-                            rows_processed,
-                            inputs_skipped,
-                            exc,
-                        ) = self.etl_step.transform_batch(batch, self.run_config)
-                        # Check if transforms or loads raised an error
-                        if exc:
-                            msg = f"Error when running etl_step {self.etl_step.name}"
-                            self._logger.error(msg)
-                            self._etl_step_run.status = Status.failed
-                            self._etl_step_run.error = exc
-                            run = meta_session.get(RunEntity, run_id)
-                            assert run
-                            run.errors = run.errors + 1 if run.errors else 1
-                            meta_session.commit()
-                            meta_session.close()
-                            return 1
-                        if dashboard is not None:
-                            dashboard.advance_bar(BarNames.TRANSFORMED, advance=len(batch))
-                        rows_inserted, rows_updated = self._load_data(
-                            rows_to_load, connection=main_raw_connection
-                        )
-                        if dashboard is not None:
-                            dashboard.advance_bar(BarNames.LOADED, advance=rows_processed)
-                        self._load_repeats(meta_raw_connection)
-                        self._logger.debug(
-                            f'Done loading batch {batch_ind}. Inserted {rows_inserted} and updated {rows_updated} rows.'
-                        )
-
-                        # Commit changes to db
-                        self._etl_step_run.rows_inserted += rows_inserted
-                        self._etl_step_run.rows_updated += rows_updated
-                        self._etl_step_run.inputs_skipped += inputs_skipped
+                    # In lazy mode the exact count replaces the estimate whenever it finishes
+                    counted_rows: List[int] = []
+                    if self.run_config.row_count == RowCount.LAZY and isinstance(extract, BaseQuery):
+                        Thread(
+                            target=self._count_rows,
+                            args=(extract, main_engine, counted_rows),
+                            name='dbgen-row-count',
+                            daemon=True,
+                        ).start()
+                    error = None
+                    self._progress = dict.fromkeys(PROGRESS_FIELDS, 0)
+                    with RunMetricsWriter(
+                        meta_engine, self._etl_step_run, self.run_config.metrics_interval
+                    ) as metrics:
+                        if isinstance(extract, BaseQuery) and extract._checkpoint is not None:
+                            # Carry the checkpoint over in case this run fails before loading a batch
+                            metrics.update(checkpoint=to_json_value(extract._checkpoint))
+                        for batch_ind, batch in enumerate(self.batchify(extract, batch_size, dashboard)):
+                            (
+                                _,
+                                rows_to_load,
+                                rows_processed,
+                                inputs_skipped,
+                                error,
+                            ) = self.etl_step.transform_batch(batch, self.run_config)
+                            # Check if transforms or loads raised an error
+                            if error:
+                                break
+                            if dashboard is not None:
+                                dashboard.advance_bar(BarNames.TRANSFORMED, advance=len(batch))
+                            rows_inserted, rows_updated = self._load_data(
+                                rows_to_load, connection=main_raw_connection
+                            )
+                            if dashboard is not None:
+                                dashboard.advance_bar(BarNames.LOADED, advance=rows_processed)
+                            self._load_repeats(meta_raw_connection)
+                            self._logger.debug(
+                                f'Done loading batch {batch_ind}. Inserted {rows_inserted} and updated {rows_updated} rows.'
+                            )
+                            # Buffer the progress for the metrics writer rather than committing every batch
+                            self._progress['rows_inserted'] += rows_inserted
+                            self._progress['rows_updated'] += rows_updated
+                            self._progress['inputs_skipped'] += inputs_skipped
+                            metrics.update(**self._progress)
+                            if self.etl_step.keyset and batch:
+                                # Record the key of the last loaded row so a failed run can resume after it
+                                checkpoint = extract.get_checkpoint(batch[-1][1][extract.hash])  # type: ignore
+                                metrics.update(checkpoint=to_json_value(checkpoint))
+                            if counted_rows and dashboard is not None:
+                                dashboard.set_total(counted_rows.pop())
+                    # The counters only reach the ORM row once the writer is closed, as a pending update in
+                    # meta_session would be autoflushed and hold the row lock the writer needs to flush
+                    for field, value in self._progress.items():
+                        setattr(self._etl_step_run, field, value)
+                    if error:
+                        msg = f"Error when running etl_step {self.etl_step.name}"
+                        self._logger.error(msg)
+                        self._etl_step_run.status = Status.failed
+                        self._etl_step_run.error = error
+                        run = meta_session.get(RunEntity, run_id)
+                        assert run
+                        run.errors = run.errors + 1 if run.errors else 1
                         meta_session.commit()
+                        meta_session.close()
+                        return 1
 
                 # Finish the run and commit to DB
+                self._save_watermark(meta_session, run_id)
+                self._save_manifest(meta_session)
                 self._etl_step_run.status = Status.completed
                 self._etl_step_run.runtime = round(time() - start, 3)
                 self._logger.info(
@@ -168,25 +218,55 @@ class ETLStepExecutor(BaseETLStepExecutor):
                 meta_session.close()
                 raise
 
+    def _get_checkpoint(self, meta_session: Session) -> Optional[Dict[str, Any]]:
+        """Get the checkpoint of the last run of this etl_step if it failed part way through."""
+        if not self.run_config.resume or self.run_config.retry:
+            return None
+        last_run = meta_session.exec(
+            select(ETLStepRunEntity)
+            .where(ETLStepRunEntity.etl_step_id == self.etl_step.uuid)
+            .where(ETLStepRunEntity.run_id != self._etl_step_run.run_id)
+            .where(ETLStepRunEntity.status.in_((Status.completed, Status.failed, Status.running)))  # type: ignore
+            .order_by(ETLStepRunEntity.run_id.desc())  # type: ignore
+            .limit(1)
+        ).first()
+        if last_run is None or last_run.status == Status.completed or not last_run.checkpoint:
+            return None
+        self._logger.info(f'Resuming ETLStep {self.etl_step.name!r} after {last_run.checkpoint}')
+        return last_run.checkpoint
+
+    def _get_row_count(self, extract: Extract) -> Optional[int]:
+        """Get the number of rows to extract according to the run_config's row_count mode."""
+        row_count = self.run_config.row_count
+        if row_count == RowCount.SKIP:
+            return None
+        # Lazy mode starts from the estimate so batch sizes and progress bars are set without waiting
+        if row_count in (RowCount.ESTIMATE, RowCount.LAZY) and isinstance(extract, BaseQuery):
+            return extract.estimated_length()
+        return extract.length()
+
+    def _count_rows(self, extract: BaseQuery, main_engine: Engine, counted_rows: List[int]) -> None:
+        """Count the rows to extract on a separate connection, handing the total back through counted_rows."""
+        engine = extract.connection.get_engine() if isinstance(extract, ExternalQuery) else main_engine
+        try:
+            with engine.connect() as connection:
+                counted_rows.append(extract.length(connection=connection))
+        except Exception as exc:
+            self._logger.warning(f'Failed to count the rows to extract: {exc}')
+
     def batchify(
         self, extract: Extract, batch_size: int, dashboard: Optional[Dashboard]
     ) -> Generator[List[Tuple[UUID, NAMESPACE_TYPE]], None, None]:
-        # initialize the batch and counts
+        # initialize the batch
         batch: List[Tuple[UUID, NAMESPACE_TYPE]] = []
-        self._etl_step_run.inputs_extracted = 0
-        self._etl_step_run.unique_inputs = 0
         # Loop the the rows in the extract function
-        for row in extract.extract():
-            # Check the hash of the inputs against the metadatabase
-            processed_row = extract.process_row(row)
-            is_repeat, input_hash = self._check_repeat(processed_row, self.etl_step.uuid)
-
+        for processed_row, (is_repeat, input_hash) in self._extract_rows(extract):
             # If we are running with --retry redo repeats
             if self.run_config.retry or not is_repeat:
                 # Store the hash for newly seen rows for later loading
-                self._etl_step_run.inputs_extracted += 1
+                self._progress['inputs_extracted'] += 1
                 if not is_repeat:
-                    self._etl_step_run.unique_inputs += 1
+                    self._progress['unique_inputs'] += 1
                     self._new_repeats.add(input_hash)
                 batch.append((input_hash, {extract.hash: processed_row}))
             elif dashboard is not None:
@@ -205,7 +285,24 @@ class ETLStepExecutor(BaseETLStepExecutor):
                 dashboard.advance_bar(BarNames.EXTRACTED, advance=len(batch))
             yield batch
         if dashboard is not None:
-            dashboard.set_total(total=self._etl_step_run.inputs_extracted)
+            dashboard.set_total(total=self._progress['inputs_extracted'])
+
+    def _extract_rows(
+        self, extract: Extract
+    ) -> Generator[Tuple[Dict[str, Any], Tuple[bool, UUID]], None, None]:
+        """Yield each processed row along with whether it is a repeat and its input hash."""
+        if not extract.yields_batches():
+            for row in extract.extract():
+                # Check the hash of the inputs against the metadatabase
+                processed_row = extract.process_row(row)
+                yield processed_row, self._check_repeat(processed_row, self.etl_step.uuid)
+            return
+        # Batched extracts are processed and hashed a batch at a time
+        for extracted_batch in extract.extract_batches():
+            rows = extract.process_batch(extracted_batch)
+            for row, input_hash in zip(rows, self._hash_rows(rows, self.etl_step.uuid)):
+                # Rows are checked as they are consumed so repeats within a batch are caught
+                yield row, (input_hash in self._old_repeats or input_hash in self._new_repeats, input_hash)
 
     def _load_data(self, rows_to_load: Dict[str, Dict[UUID, Any]], connection) -> Tuple[int, int]:
         rows_inserted = 0
@@ -280,8 +377,8 @@ class BaseETLStepRun(Base):
             etl_step_run.status = Status.upstream_failed
             meta_session.commit()
             return
-        # Initialize the ETLStepExecutor
-        executor = self.get_executor(etl_step, self._run_config)
+        # Initialize the ETLStepExecutor on a frozen copy so the hashes used on every row are memoized
+        executor = self.get_executor(etl_step.frozen(), self._run_config)
         return_code = executor.execute(
             main_engine=main_engine,
             meta_engine=meta_engine,
@@ -307,6 +404,11 @@ class BaseETLStepRun(Base):
             session.refresh(run)
             ordering = 0
             run_id = run.id
+        else:
+            # Model runs register every etl_step run up front
+            etl_step_run = session.get(ETLStepRunEntity, {'etl_step_id': etl_step.uuid, 'run_id': run_id})
+            if etl_step_run is not None:
+                return etl_step_run
         etl_step_row = etl_step._get_etl_step_row()
         session.merge(etl_step_row)
         session.commit()
@@ -324,6 +426,48 @@ class BaseETLStepRun(Base):
         return etl_step_run
 
 
+# ETLSteps deserialized from the metadatabase by this process keyed by their ID
+_etl_step_cache: Dict[UUID, ETLStep] = {}
+
+
+def load_etl_step(meta_engine: Engine, etl_step_id: UUID) -> ETLStep:
+    """Load an ETLStep from the metadatabase, deserializing it at most once per process."""
+    etl_step = _etl_step_cache.get(etl_step_id)
+    if etl_step is not None:
+        return etl_step
+    with Session(meta_engine) as sess:
+        etl_step_binary, etl_step_json = sess.exec(
+            select(ETLStepEntity.etl_step_binary, ETLStepEntity.etl_step_json).where(
+                ETLStepEntity.id == etl_step_id
+            )
+        ).one()
+    try:
+        etl_step = _deserialize_etl_step(etl_step_id, etl_step_binary, etl_step_json)
+    except ModuleNotFoundError as exc:
+        import os
+
+        raise SerializationError(
+            f"While deserializing etl_step id {etl_step_id} an unknown module was encountered. Are you using custom dbgen objects reachable by your python environment? Make sure any custom extractors or code can be found in your PYTHONPATH environment variable\nError: {exc}\nPYTHONPATH={os.environ.get('PYTHONPATH')}"
+        ) from exc
+    etl_step._resolve_entities()
+    _etl_step_cache[etl_step_id] = etl_step
+    return etl_step
+
+
+def _deserialize_etl_step(etl_step_id: UUID, etl_step_binary: Optional[bytes], etl_step_json: Any) -> ETLStep:
+    # The binary form records the hash it was written with so it can skip validation when they match
+    if etl_step_binary is not None:
+        try:
+            return ETLStep.deserialize_binary(etl_step_binary, expected_uuid=etl_step_id)
+        except SerializationError as exc:
+            logger.debug(f"Falling back on validated deserialization: {exc}")
+    etl_step = ETLStep.deserialize(etl_step_json)
+    if etl_step.uuid != etl_step_id:
+        error = f"Deserialization Failed the etl_step hash has changed for etl_step named {etl_step.name}!\n{etl_step}\n{etl_step_id}"
+        raise exceptions.SerializationError(error)
+    return etl_step
+
+
 class ETLStepRun(BaseETLStepRun):
     etl_step: ETLStep
 
@@ -338,22 +482,7 @@ class RemoteETLStepRun(BaseETLStepRun):
     etl_step_id: UUID
 
     def get_etl_step(self, meta_engine, *args, **kwargs):
-        with Session(meta_engine) as sess:
-            etl_step_json = sess.exec(
-                select(ETLStepEntity.etl_step_json).where(ETLStepEntity.id == self.etl_step_id)
-            ).one()
-            try:
-                etl_step = ETLStep.deserialize(etl_step_json)
-            except ModuleNotFoundError as exc:
-                import os
-
-                raise SerializationError(
-                    f"While deserializing etl_step id {self.etl_step_id} an unknown module was encountered. Are you using custom dbgen objects reachable by your python environment? Make sure any custom extractors or code can be found in your PYTHONPATH environment variable\nError: {exc}\nPYTHONPATH={os.environ.get('PYTHONPATH')}"
-                ) from exc
-            if etl_step.uuid != self.etl_step_id:
-                error = f"Deserialization Failed the etl_step hash has changed for etl_step named {etl_step.name}!\n{etl_step}\n{self.etl_step_id}"
-                raise exceptions.SerializationError(error)
-        return etl_step
+        return load_etl_step(meta_engine, self.etl_step_id)
 
     def get_executor(self, etl_step, run_config) -> BaseETLStepExecutor:
         return ETLStepExecutor(etl_step=etl_step, run_config=run_config)
@@ -373,22 +502,7 @@ class AsyncRemoteETLStepRun(BaseETLStepRun):
     etl_step_id: UUID
 
     def get_etl_step(self, meta_engine, *args, **kwargs):
-        with Session(meta_engine) as sess:
-            etl_step_json = sess.exec(
-                select(ETLStepEntity.etl_step_json).where(ETLStepEntity.id == self.etl_step_id)
-            ).one()
-            try:
-                etl_step = ETLStep.deserialize(etl_step_json)
-            except ModuleNotFoundError as exc:
-                import os
-
-                raise SerializationError(
-                    f"While deserializing etl_step id {self.etl_step_id} an unknown module was encountered. Are you using custom dbgen objects reachable by your python environment? Make sure any custom extractors or code can be found in your PYTHONPATH environment variable\nError: {exc}\nPYTHONPATH={os.environ.get('PYTHONPATH')}"
-                ) from exc
-            if etl_step.uuid != self.etl_step_id:
-                error = f"Deserialization Failed the etl_step hash has changed for etl_step named {etl_step.name}!\n{etl_step}\n{self.etl_step_id}"
-                raise exceptions.SerializationError(error)
-        return etl_step
+        return load_etl_step(meta_engine, self.etl_step_id)
 
     def get_executor(self, etl_step, run_config) -> BaseETLStepExecutor:
         return AsyncETLStepExecutor(etl_step=etl_step, run_config=run_config)
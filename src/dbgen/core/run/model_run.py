@@ -15,16 +15,28 @@
 """Objects related to the running of Models and ETLSteps."""
 from datetime import datetime, timedelta
 from time import time
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Dict, List
 
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.future import Engine
 from sqlmodel import Session, select
 
 from dbgen.core.base import Base
 from dbgen.core.dashboard import BarNames, Dashboard
+from dbgen.core.entity import BaseEntity
 from dbgen.core.etl_step import ETLStep
-from dbgen.core.metadata import ETLStepsToRun, ModelEntity, RunEntity, Status
+from dbgen.core.metadata import (
+    ETLStepEntity,
+    ETLStepRunEntity,
+    ETLStepsToRun,
+    ModelEntity,
+    ModelETLStepMap,
+    RunEntity,
+    Status,
+)
 from dbgen.core.model import Model
+from dbgen.core.node.query import BaseQuery
 from dbgen.core.run.etl_step_run import (
     AsyncETLStepRun,
     AsyncRemoteETLStepRun,
@@ -39,6 +51,16 @@ if TYPE_CHECKING:
     pass
 
 
+def _row_values(row: BaseEntity) -> Dict[str, Any]:
+    """Get the column values of an entity row leaving out unset columns with server defaults."""
+    table = row.__table__  # type: ignore
+    return {
+        column.name: getattr(row, column.name)
+        for column in table.columns
+        if column.server_default is None or getattr(row, column.name) is not None
+    }
+
+
 class ModelRun(Base):
     model: Model
 
@@ -48,7 +70,8 @@ class ModelRun(Base):
         copy_on_model_validation = False
 
     def get_etl_step_run(self, etl_step: ETLStep, run_async: bool, remote: bool) -> BaseETLStepRun:
-        if run_async:
+        # Keyset checkpoints rely on batches being loaded in order so those etl_steps always run synchronously
+        if run_async and not etl_step.keyset:
             if remote:
                 return AsyncRemoteETLStepRun(etl_step_id=etl_step.uuid)
             else:
@@ -58,6 +81,69 @@ class ModelRun(Base):
                 return RemoteETLStepRun(etl_step_id=etl_step.uuid)
             return ETLStepRun(etl_step=etl_step)
 
+    def _register_run(self, meta_engine: Engine, run_id: int, etl_steps: List[ETLStep]) -> None:
+        """
+        Bulk insert the metadata rows needed by the run in a single transaction.
+
+        ETLSteps are identified by their hash so only the etl_steps missing from the metadatabase are serialized.
+        """
+        now = datetime.now()
+        etl_step_ids = [etl_step.uuid for etl_step in etl_steps]
+        with meta_engine.begin() as conn:
+            existing_ids = set(
+                conn.execute(select(ETLStepEntity.id).where(ETLStepEntity.id.in_(etl_step_ids))).scalars()  # type: ignore
+            )
+            new_etl_steps = [
+                etl_step._get_etl_step_row() for etl_step in etl_steps if etl_step.uuid not in existing_ids
+            ]
+            if new_etl_steps:
+                conn.execute(
+                    insert(ETLStepEntity.__table__)
+                    .values([_row_values(row) for row in new_etl_steps])
+                    .on_conflict_do_nothing()
+                )
+            model_exists = conn.execute(
+                select(ModelEntity.id).where(ModelEntity.id == self.model.uuid)
+            ).first()
+            if model_exists:
+                conn.execute(
+                    update(ModelEntity.__table__)
+                    .where(ModelEntity.id == self.model.uuid)
+                    .values(last_run=now)
+                )
+            else:
+                model_row = self.model._get_model_row(include_etl_steps=False)
+                model_row.last_run = now
+                conn.execute(
+                    insert(ModelEntity.__table__).values(_row_values(model_row)).on_conflict_do_nothing()
+                )
+                conn.execute(
+                    insert(ModelETLStepMap.__table__)
+                    .values(
+                        [
+                            {'model_id': self.model.uuid, 'etl_step_id': etl_step_id}
+                            for etl_step_id in etl_step_ids
+                        ]
+                    )
+                    .on_conflict_do_nothing()
+                )
+            etl_step_runs = [
+                ETLStepRunEntity(
+                    run_id=run_id,
+                    etl_step_id=etl_step.uuid,
+                    status=Status.initialized,
+                    ordering=ordering,
+                    query=etl_step.extract.render_query() if isinstance(etl_step.extract, BaseQuery) else '',
+                )
+                for ordering, etl_step in enumerate(etl_steps)
+            ]
+            if etl_step_runs:
+                conn.execute(
+                    insert(ETLStepRunEntity.__table__)
+                    .values([_row_values(row) for row in etl_step_runs])
+                    .on_conflict_do_nothing()
+                )
+
     def execute(
         self,
         main_engine: Engine,
@@ -78,6 +164,8 @@ class ModelRun(Base):
 
         # If doing last failed run query for ETLSteps to run and add to include
         if rerun_failed:
+            # Keyset paginated ETLSteps pick up from the checkpoint of their failed run
+            run_config.resume = True
             with meta_engine.connect() as conn:
                 result = conn.execute(select(ETLStepsToRun.__table__.c.name))
                 for (etl_step_name,) in result:
@@ -87,16 +175,8 @@ class ModelRun(Base):
         run_init = RunInitializer()
         run_id = run_init.execute(meta_engine, run_config)
         sorted_etl_steps = self.model._sort_graph()
-        # Add etl_steps to metadb
-        with Session(meta_engine) as meta_session:
-            model_row = self.model._get_model_row()
-            model_row.last_run = datetime.now()
-            existing_model = meta_session.get(ModelEntity, model_row.id)
-            if not existing_model:
-                meta_session.merge(model_row)
-            else:
-                existing_model.last_run = datetime.now()
-            meta_session.commit()
+        # Register the model, its etl_steps, and this run's etl_step runs in the metadb
+        self._register_run(meta_engine, run_id, sorted_etl_steps)
 
         # Apply start and until to exclude etl_steps not between start_idx and until_idx
         if run_config.start or run_config.until:
@@ -13,47 +13,91 @@
 #   limitations under the License.
 
 """Objects related to the running of Models and ETLSteps."""
+import json
 from abc import abstractmethod
+from datetime import datetime
+from logging import getLogger
 from os import cpu_count
-from typing import TYPE_CHECKING, Dict, List, Optional, Set
+from threading import Event, Lock, Thread
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
 from uuid import UUID
 
+from pydantic import validator
 from pydantic.fields import Field, PrivateAttr
+from pydasher import hasher
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.future import Engine
-from sqlmodel import Session
+from sqlmodel import Session, select
 
-from dbgen.core.base import Base
+from dbgen.configuration import RowCount
+from dbgen.core.base import Base, encoders
 from dbgen.core.dashboard import Dashboard
 from dbgen.core.etl_step import ETLStep
-from dbgen.core.metadata import ETLStepRunEntity, RunEntity, Status
+from dbgen.core.metadata import ETLStepRunEntity, FileManifest, RunEntity, Status, Watermark
 from dbgen.core.model import Model
 from dbgen.core.model_settings import BaseModelSettings
-from dbgen.utils.log import LogLevel
+from dbgen.core.node.extract import Extract
+from dbgen.core.node.query import BaseQuery
+from dbgen.utils.log import LogLevel, StdoutCapture
 
 if TYPE_CHECKING:
-    pass
+    from sqlalchemy.engine import Connection as SAConnection  # pragma: no cover
+
+logger = getLogger(__name__)
+# The number of file manifest rows upserted per statement
+MANIFEST_CHUNK_SIZE = 10000
 
 
 class RunConfig(Base):
     """Configuration for the running of an ETLStep and Model"""
 
     retry: bool = False
+    resume: bool = False
     include: Set[str] = Field(default_factory=set)
     exclude: Set[str] = Field(default_factory=set)
     upstream_fail_exclude: Set[str] = Field(default_factory=set)
     start: Optional[str]
     until: Optional[str]
     batch_size: Optional[int]
+    itersize: Optional[int]
     progress_bar: bool = True
     skip_row_count: bool = False
+    row_count: RowCount = RowCount.EXACT
     fail_downstream: bool = False
     fast_fail: bool = False
     skip_on_error: bool = False
     batch_number: int = 10
     log_level: LogLevel = LogLevel.INFO
+    capture_stdout: StdoutCapture = StdoutCapture.ALWAYS
+    stdout_sample_rate: int = 100
+    metrics_interval: float = 1.0
     settings: BaseModelSettings = Field(default_factory=lambda: BaseModelSettings())
     cpu_count: Optional[int] = Field(default_factory=lambda: cpu_count())
 
+    @validator('stdout_sample_rate')
+    def validate_stdout_sample_rate(cls, stdout_sample_rate: int) -> int:
+        if stdout_sample_rate < 1:
+            raise ValueError(f'stdout_sample_rate must be a positive integer: {stdout_sample_rate}')
+        return stdout_sample_rate
+
+    @validator('row_count', always=True)
+    def validate_row_count(cls, row_count: RowCount, values: Dict[str, Any]) -> RowCount:
+        # skip_row_count predates the row count modes and takes precedence
+        return RowCount.SKIP if values.get('skip_row_count') else row_count
+
+    @validator('itersize')
+    def validate_itersize(cls, itersize: Optional[int]) -> Optional[int]:
+        if itersize is not None and itersize < 1:
+            raise ValueError(f'itersize must be a positive integer: {itersize}')
+        return itersize
+
+    @validator('metrics_interval')
+    def validate_metrics_interval(cls, metrics_interval: float) -> float:
+        if metrics_interval <= 0:
+            raise ValueError(f'metrics_interval must be positive: {metrics_interval}')
+        return metrics_interval
+
     def should_etl_step_run(self, etl_step: ETLStep) -> bool:
         """Check an ETLStep against include/exclude to see if it should run."""
         markers = (etl_step.name, *etl_step.tags)
@@ -96,6 +140,11 @@ class RunConfig(Base):
         return invalid_marks
 
 
+def to_json_value(value: Any) -> Any:
+    """Coerce an extracted value to one that can be stored in a json column of the metadatabase."""
+    return json.loads(json.dumps(value, default=str))
+
+
 def update_run_by_id(run_id, status: Status, session: Session):
     run = session.get(RunEntity, run_id)
     assert run, f"No run found with id {run_id}"
@@ -123,12 +172,80 @@ class RunInitializer(Base):
         return run_id
 
 
+# The ETLStepRunEntity counters updated while an ETLStep runs
+PROGRESS_FIELDS = ('inputs_extracted', 'unique_inputs', 'inputs_skipped', 'rows_inserted', 'rows_updated')
+
+
+class RunMetricsWriter:
+    """
+    Buffers the progress counters of an ETLStep run and flushes them to the metadatabase.
+
+    Counters are written from a background thread every interval seconds so the batch loop never waits on
+    a metadatabase commit, the latest values are flushed once more when the writer is closed.
+    """
+
+    def __init__(self, meta_engine: Engine, etl_step_run: ETLStepRunEntity, interval: float = 1.0) -> None:
+        self._meta_engine = meta_engine
+        self._etl_step_id = etl_step_run.etl_step_id
+        self._run_id = etl_step_run.run_id
+        self._interval = interval
+        self._lock = Lock()
+        self._pending: Dict[str, Any] = {}
+        self._stopped = Event()
+        self._thread = Thread(target=self._flush_periodically, name='dbgen-run-metrics', daemon=True)
+
+    def __enter__(self) -> 'RunMetricsWriter':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def update(self, **counters: Any) -> None:
+        """Buffer the latest values of the counters."""
+        with self._lock:
+            self._pending.update(counters)
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._flush()
+
+    def flush(self) -> None:
+        """Write the buffered counters to the metadatabase."""
+        with self._lock:
+            counters, self._pending = self._pending, {}
+        if not counters:
+            return
+        statement = (
+            update(ETLStepRunEntity.__table__)  # type: ignore
+            .where(ETLStepRunEntity.etl_step_id == self._etl_step_id)
+            .where(ETLStepRunEntity.run_id == self._run_id)
+            .values(**counters)
+        )
+        with self._meta_engine.begin() as conn:
+            conn.execute(statement)
+
+    def _flush(self) -> None:
+        try:
+            self.flush()
+        except Exception as exc:
+            # Progress is best effort as the final counters are committed along with the run's status
+            logger.warning(f'Failed to write run metrics: {exc}')
+
+    def _flush_periodically(self) -> None:
+        while not self._stopped.wait(self._interval):
+            self._flush()
+
+
 class BaseETLStepExecutor(Base):
     etl_step: ETLStep
     run_config: RunConfig
     _etl_step_run: ETLStepRunEntity = PrivateAttr()
     _old_repeats: Set[UUID] = PrivateAttr(default_factory=set)
     _new_repeats: Set[UUID] = PrivateAttr(default_factory=set)
+    _high_water_mark: Any = PrivateAttr(None)
 
     @abstractmethod
     def execute(
@@ -141,3 +258,73 @@ class BaseETLStepExecutor(Base):
         etl_step_run: ETLStepRunEntity,
     ) -> int:
         pass
+
+    def _set_watermark(
+        self, extract: Extract, meta_session: Session, connection: Optional['SAConnection'] = None
+    ) -> None:
+        """Restrict the query to the rows above the stored watermark and at most the current high water mark."""
+        column = self.etl_step.watermark
+        if not column or not isinstance(extract, BaseQuery):
+            return
+        low = None
+        # Retries extract everything regardless of the watermark
+        if not self.run_config.retry:
+            watermark = meta_session.get(Watermark, self.etl_step.uuid)
+            if watermark is not None and watermark.watermark:
+                low = watermark.watermark.get(column)
+        # Bounding the extraction by the high water mark makes rows added while running wait for the next run
+        self._high_water_mark = to_json_value(extract.max_watermark(column, connection))
+        self._logger.debug(f'Extracting rows with {column} after {low} up to {self._high_water_mark}')
+        extract.set_watermark(column, low, self._high_water_mark)
+
+    def _save_watermark(self, meta_session: Session, run_id: Optional[int]) -> None:
+        """Store the high water mark of a completed run, the caller commits it along with the run's status."""
+        if not self.etl_step.watermark or self._high_water_mark is None:
+            return
+        meta_session.merge(
+            Watermark(
+                etl_step_id=self.etl_step.uuid,
+                run_id=run_id,
+                watermark={self.etl_step.watermark: self._high_water_mark},
+                updated_at=datetime.now(),
+            )
+        )
+
+    @staticmethod
+    def _hash_rows(rows: List[Dict[str, Any]], etl_step_uuid: UUID) -> List[UUID]:
+        """Hash a batch of extracted rows for repeat checking in a single pass."""
+        return [UUID(hasher((etl_step_uuid, row), encoders=encoders)) for row in rows]
+
+    def _set_manifest(self, extract: Extract, meta_session: Session) -> None:
+        """Hand the file manifest of this etl_step to an extractor that skips unchanged files."""
+        if not extract.uses_manifest():
+            return
+        manifest: Dict[str, Tuple[int, float]] = {}
+        # Retries extract every file but still record the manifest once they complete
+        if not self.run_config.retry:
+            rows = meta_session.exec(
+                select(FileManifest.path, FileManifest.size, FileManifest.mtime).where(
+                    FileManifest.etl_step_id == self.etl_step.uuid
+                )
+            )
+            manifest = {path: (size, mtime) for path, size, mtime in rows}
+        self._logger.debug(f'Found {len(manifest)} files in the manifest')
+        extract.set_manifest(manifest)
+
+    def _save_manifest(self, meta_session: Session) -> None:
+        """Record the files extracted by a completed run, the caller commits them along with the run's status."""
+        extract = self.etl_step.extract
+        if not extract.uses_manifest():
+            return
+        rows = [
+            {'etl_step_id': self.etl_step.uuid, 'path': path, 'size': size, 'mtime': mtime}
+            for path, (size, mtime) in extract.get_manifest().items()
+        ]
+        for start in range(0, len(rows), MANIFEST_CHUNK_SIZE):
+            statement = insert(FileManifest.__table__).values(rows[start : start + MANIFEST_CHUNK_SIZE])  # type: ignore
+            meta_session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=['etl_step_id', 'path'],
+                    set_={'size': statement.excluded.size, 'mtime': statement.excluded.mtime},
+                )
+            )
@@ -12,14 +12,22 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import hashlib
+import os
 import re
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Dict
 from typing import Generator as GenType
 from typing import List, Optional, Tuple
 
 import boto3
+from pydantic import validator
 
 from dbgen import Extract
+from dbgen.core.node.transforms import MapExecutor, _get_pool
+from dbgen.providers.common.extract import _check_positive, _prefetch
 
 
 class S3FileNameExtractor(Extract[str]):
@@ -31,45 +39,80 @@ class S3FileNameExtractor(Extract[str]):
 
     def extract(self) -> GenType[str, None, None]:
         """Return the files in a directory on s3 bucket that match pattern."""
-        session = boto3.Session(profile_name=self.profile)
-        s3 = session.client("s3")
+        for content in self._list_objects(self._get_client()):
+            yield content['Key']
+
+    def _get_client(self) -> Any:
+        # Unlike sessions and resources, clients can be shared between threads
+        return boto3.Session(profile_name=self.profile).client('s3')
+
+    def _list_objects(self, client: Any) -> GenType[Dict[str, Any], None, None]:
+        """Yield the listed objects whose keys match pattern, requesting each page while the last is yielded."""
         regex = re.compile(self.pattern, re.MULTILINE)
+        pages = iter(client.get_paginator('list_objects_v2').paginate(Bucket=self.bucket, Prefix=self.prefix))
+        with ThreadPoolExecutor(max_workers=1) as lister:
+            next_page = lister.submit(next, pages, None)
+            while (page := next_page.result()) is not None:
+                next_page = lister.submit(next, pages, None)
+                for content in page.get('Contents', ()):
+                    if regex.search(content['Key']):
+                        yield content
 
-        response = s3.list_objects_v2(Bucket=self.bucket, Prefix=self.prefix)
-        assert "Contents" in response, response
-        if not response or response["KeyCount"] == 0:
-            return
 
-        def process_keys(response: dict) -> Tuple[List[str], Any]:
-            return (
-                [content["Key"] for content in response["Contents"] if regex.search(content["Key"])],
-                response.get("NextContinuationToken"),
-            )
+class S3FileExtractor(S3FileNameExtractor):
+    """
+    Returns both the key and contents of the file on s3
 
-        vals, token = process_keys(response)
-        yield from vals
-        count = 0
-        while token:
-            response = s3.list_objects_v2(Bucket=self.bucket, Prefix=self.prefix, ContinuationToken=token)
-            if not response["IsTruncated"]:
-                break
+    Objects are downloaded by a pool of max_workers threads that keeps at most prefetch objects in flight and
+    yields them in order. The contents are decoded with encoding, or yielded as bytes if encoding is None. When
+    cache_dir is set each downloaded object is kept there under its ETag so unchanged objects are read from
+    disk on later runs instead of being fetched again.
+    """
 
-            keys, token = process_keys(response)
-            yield from keys
-            count += response["KeyCount"]
+    outputs: List[str] = ['s3_key', 'contents']
+    max_workers: Optional[int] = None
+    prefetch: int = 32
+    encoding: Optional[str] = 'utf-8'
+    cache_dir: Optional[Path] = None
+    _settings_ = {'max_workers', 'prefetch', 'encoding', 'cache_dir'}
+    _hashexclude_ = _settings_
+    positive_prefetch = validator('prefetch', allow_reuse=True)(_check_positive)
 
+    def extract(self) -> GenType[Tuple[str, Any], None, None]:  # type: ignore
+        client = self._get_client()
+        pool = _get_pool(MapExecutor.THREAD, self.max_workers)
+        yield from _prefetch(
+            lambda content: pool.submit(self.read_object, client, content),
+            self._list_objects(client),
+            self.prefetch,
+        )
 
-class S3FileExtractor(S3FileNameExtractor):
-    """Returns both the key and contents of the file on s3"""
+    def read_object(self, client: Any, content: Dict[str, Any]) -> Tuple[str, Any]:
+        """Read a listed object from the cache if its ETag is unchanged, otherwise download it."""
+        key = content['Key']
+        if self.cache_dir is None:
+            _, body = self._download(client, key)
+        else:
+            cache_dir = self.cache_dir / self.bucket
+            digest, etag = hashlib.sha256(key.encode()).hexdigest(), content['ETag'].strip('"')
+            cache_path = cache_dir / f'{digest}.{etag}'
+            if cache_path.exists():
+                body = cache_path.read_bytes()
+            else:
+                etag, body = self._download(client, key)
+                self._write_cache(cache_dir, digest, etag, body)
+        return key, body if self.encoding is None else body.decode(self.encoding)
 
-    outputs: List[str] = ['s3_key', 'contents']
+    def _download(self, client: Any, key: str) -> Tuple[str, bytes]:
+        response = client.get_object(Bucket=self.bucket, Key=key)
+        return response['ETag'].strip('"'), response['Body'].read()
 
-    def extract(self) -> GenType[Tuple[str, str], None, None]:  # type: ignore
-        session = boto3.Session(profile_name=self.profile)
-        s3 = session.resource("s3")
-        key_gen = super().extract()
-        bucket = s3.Bucket(self.bucket)
-        for key in key_gen:
-            obj = bucket.Object(key=key)
-            body = obj.get()["Body"].read().decode("utf-8")
-            yield key, body
+    @staticmethod
+    def _write_cache(cache_dir: Path, digest: str, etag: str, body: bytes) -> None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale_path in cache_dir.glob(f'{digest}.*'):
+            stale_path.unlink(missing_ok=True)
+        # The download is written to a temporary file first so concurrent runs never read a partial object
+        with NamedTemporaryFile(dir=cache_dir, prefix=f'.{digest}.', delete=False) as tmp:
+            tmp.write(body)
+        os.replace(tmp.name, cache_dir / f'{digest}.{etag}')
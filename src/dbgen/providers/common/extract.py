@@ -13,35 +13,174 @@
 #   limitations under the License.
 
 import csv
+import gzip
+import mmap
+import os
 import re
-from io import TextIOWrapper
+from collections import deque
+from concurrent.futures import Future
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, Generator, List, Optional, TextIO, Tuple, TypeVar
+from typing import IO, Any, Callable, Deque, Dict, Generator, Iterable, List, Optional, TextIO, Tuple, TypeVar
 
 import yaml
-from pydantic import DirectoryPath, root_validator
+from pydantic import DirectoryPath, root_validator, validator
+from pydantic.fields import ModelField
 
 from dbgen.core.node.extract import Extract
+from dbgen.core.node.transforms import MapExecutor, _get_pool
 
 T = TypeVar('T')
 T2 = TypeVar('T2', bound=str)
+K = TypeVar('K')
+
+# Files with these suffixes are decompressed as they are read
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+# The number of bytes scanned at a time when counting lines
+LINE_COUNT_CHUNK = 1 << 20
+# The number of CSV lines read at a time by extract_chunks when no chunk_size is set
+DEFAULT_CHUNK_SIZE = 1000
+# The libyaml backed loader is much faster but is only available when PyYAML was built against libyaml
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def is_compressed(path: Path) -> bool:
+    return path.suffix.lower() in COMPRESSED_SUFFIXES
+
+
+def open_file(path: Path, mode: str = 'r', **kwargs) -> IO:
+    """Open a file for reading, decompressing .gz and .zst files as they are read."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix not in COMPRESSED_SUFFIXES:
+        return open(path, mode, **kwargs)
+    # Compressed files default to binary mode so text has to be asked for explicitly
+    compressed_mode = 'rb' if 'b' in mode else 'rt'
+    if suffix == '.gz':
+        return gzip.open(path, compressed_mode, **kwargs)
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise ImportError(
+            f"Reading {path} requires zstandard, install it with: pip install modelyst-dbgen[zstandard]"
+        ) from exc
+    return zstandard.open(path, compressed_mode, **kwargs)
+
+
+def _count_lines(path: Path) -> int:
+    """Count the lines of a file by scanning a memory map of it for newlines."""
+    if is_compressed(path):
+        # Compressed files cannot be mapped so their decompressed contents are streamed instead
+        with open_file(path, 'rb') as f:
+            lines, last = 0, b'\n'
+            while chunk := f.read(LINE_COUNT_CHUNK):
+                lines += chunk.count(b'\n')
+                last = chunk[-1:]
+            return lines if last == b'\n' else lines + 1
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            lines = sum(
+                mapped[start : start + LINE_COUNT_CHUNK].count(b'\n')
+                for start in range(0, size, LINE_COUNT_CHUNK)
+            )
+            # The last line is not always terminated by a newline
+            return lines if mapped[size - 1 : size] == b'\n' else lines + 1
+
+
+def _scan_files(directory: str, recursive: bool) -> Generator[os.DirEntry, None, None]:
+    """Yield the files in a directory with os.scandir, without following symlinks into subdirectories."""
+    subdirectories = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file():
+                yield entry
+            elif recursive and entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.path)
+    for subdirectory in subdirectories:
+        yield from _scan_files(subdirectory, recursive)
+
+
+def _check_positive(cls, value: int, field: ModelField) -> int:
+    """Validator for the prefetch window of the extractors that read ahead of the runner."""
+    if value < 1:
+        raise ValueError(f'{field.name} must be a positive integer: {value}')
+    return value
+
+
+def _prefetch(submit: Callable[[K], 'Future[T]'], items: Iterable[K], window: int) -> Generator[T, None, None]:
+    """Yield the results of the submitted items in order while keeping at most window items in flight."""
+    futures: Deque['Future[T]'] = deque()
+    try:
+        for item in items:
+            futures.append(submit(item))
+            if len(futures) >= window:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+    finally:
+        for future in futures:
+            future.cancel()
 
 
 class _FileExtractorBase(Extract[T]):
+    """
+    Base class for extractors of the files in a directory whose names match a pattern.
+
+    With skip_unchanged set the size and modification time of each file is recorded in the meta schema's file
+    manifest when a run completes, and files that are unchanged since are skipped before they are opened.
+    """
+
     directory: DirectoryPath
     pattern: Optional[str]
     recursive: bool = False
+    skip_unchanged: bool = False
+    _settings_ = {'skip_unchanged'}
+    _hashexclude_ = _settings_
     _file_paths: List[Path]
+    _file_stats: Dict[str, Tuple[int, float]]
+    _manifest: Optional[Dict[str, Tuple[int, float]]] = None
 
     def setup(self, **_):
-        file_gen = self.directory.rglob('*') if self.recursive else self.directory.iterdir()
-        self._file_paths = [
-            x for x in file_gen if x.is_file() and (self.pattern is None or re.search(self.pattern, x.name))
-        ]
+        search = re.compile(self.pattern).search if self.pattern is not None else None
+        manifest = self._manifest or {}
+        self._file_paths, self._file_stats = [], {}
+        for entry in _scan_files(str(self.directory), self.recursive):
+            if search is not None and not search(entry.name):
+                continue
+            if self.skip_unchanged:
+                stat = entry.stat()
+                path, file_stat = os.path.abspath(entry.path), (stat.st_size, stat.st_mtime)
+                if manifest.get(path) == file_stat:
+                    continue
+                self._file_stats[path] = file_stat
+            self._file_paths.append(Path(entry.path))
+
+    def uses_manifest(self) -> bool:
+        return self.skip_unchanged
+
+    def set_manifest(self, manifest: Dict[str, Tuple[int, float]]) -> None:
+        """Skip the files whose absolute path, size, and modification time are in the manifest."""
+        self._manifest = manifest
+
+    def get_manifest(self) -> Dict[str, Tuple[int, float]]:
+        """Get the size and modification time of each file found by setup when skip_unchanged is set."""
+        return getattr(self, '_file_stats', {})
 
     def length(self, **_):
         return len(self._file_paths)
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        # Extractors are sent to process pools to parse files so the file listings are left behind
+        private_values = dict(state['__private_attribute_values__'])
+        for key in ('_file_paths', '_file_stats', '_manifest'):
+            private_values.pop(key, None)
+        state['__private_attribute_values__'] = private_values
+        return state
+
 
 class FileNameExtractor(_FileExtractorBase[Path]):
     outputs: List[str] = ['file_name']
@@ -51,34 +190,101 @@ class FileNameExtractor(_FileExtractorBase[Path]):
 
 
 class FileExtractor(_FileExtractorBase[Tuple[Path, Any]]):
+    """
+    Extract the name and parsed contents of each file in a directory.
+
+    Files ending in .gz or .zst are decompressed as they are read. Files are read and parsed one at a time by
+    default. The thread executor overlaps the reading of files and the process executor also parses them in
+    parallel, both keep at most prefetch files in flight and yield the files in order.
+    """
+
     outputs: List[str] = ['file_name', 'parsed_file']
+    executor: MapExecutor = MapExecutor.SERIAL
+    max_workers: Optional[int] = None
+    prefetch: int = 32
+    _settings_ = {*_FileExtractorBase._settings_, 'executor', 'max_workers', 'prefetch'}
+    _hashexclude_ = _settings_
+    positive_prefetch = validator('prefetch', allow_reuse=True)(_check_positive)
 
     def file_parser(self, file_obj: TextIO) -> str:
         return file_obj.read()
 
     def extract(self) -> Generator[Tuple[Path, Any], None, None]:
-        for file_name in self._file_paths:
-            with open(file_name) as f:
-                yield file_name, self.file_parser(f)
+        if self.executor == MapExecutor.SERIAL:
+            yield from map(self.read_file, self._file_paths)
+            return
+        pool = _get_pool(self.executor, self.max_workers)
+        yield from _prefetch(
+            lambda file_name: pool.submit(self.read_file, file_name),
+            self._file_paths,
+            self.prefetch,
+        )
+
+    def read_file(self, file_name: Path) -> Tuple[Path, Any]:
+        with open_file(file_name) as f:
+            return file_name, self.file_parser(f)
 
 
 class YamlExtractor(FileExtractor):
     pattern: Optional[str] = r'.*\.(yaml|yml)'
 
     def file_parser(self, file_obj: TextIO):
-        return yaml.safe_load(file_obj)
+        return yaml.load(file_obj, Loader=YamlLoader)
+
+
+class MmapFileExtractor(FileExtractor):
+    """
+    Extract files by handing their parser a read only memoryview of a memory map of the file.
+
+    Subclasses define file_parser to read only what they need from the view, for example by slicing it or by
+    running a bytes regex over it, since calling tobytes copies the whole file. Nothing is copied into Python
+    memory until the parser reads from the view, so the parser must not keep a reference to the view as the
+    map is closed once it returns. Compressed files cannot be mapped, they are decompressed into memory and
+    handed over as a view of the decompressed bytes.
+    """
+
+    def file_parser(self, file_obj: memoryview) -> Any:  # type: ignore[override]
+        raise NotImplementedError(f'{self.canonical_name()} must define file_parser to read the memoryview')
+
+    def read_file(self, file_name: Path) -> Tuple[Path, Any]:
+        if is_compressed(file_name):
+            with open_file(file_name, 'rb') as f:
+                return file_name, self.file_parser(memoryview(f.read()))
+        with open(file_name, 'rb') as f:
+            # Empty files cannot be mapped
+            if os.fstat(f.fileno()).st_size == 0:
+                return file_name, self.file_parser(memoryview(b''))
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                return file_name, self.file_parser(view)
 
 
 class CSVExtractor(Extract[Dict[str, str]]):
-    """Extract each line in a CSV into its own input row."""
+    """
+    Extract each line in a CSV into its own input row.
+
+    Each line is read into a dictionary of every column. When chunk_size is set the runners read the CSV
+    chunk_size lines at a time through extract_batches and extract_chunks yields each chunk as columns of the
+    outputs. The rows are the same either way so setting chunk_size keeps the repeat hashes of a CSV.
+    CSVs ending in .gz or .zst are decompressed as they are read.
+    """
 
     path: Path
     ensure_path_exists: bool = True
     has_header: bool = True
     delimiter: str = ','
     outputs: List[str]
-    _file: TextIOWrapper
+    count_rows: bool = True
+    chunk_size: Optional[int] = None
+    _file: IO[str]
     _reader: csv.DictReader
+    _settings_ = {'count_rows', 'chunk_size'}
+    _hashexclude_ = _settings_
+
+    @validator('chunk_size')
+    def positive_chunk_size(cls, chunk_size: Optional[int]) -> Optional[int]:
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError(f'chunk_size must be a positive integer: {chunk_size}')
+        return chunk_size
 
     @root_validator
     def validate_path_exists(cls, values):
@@ -87,19 +293,47 @@ class CSVExtractor(Extract[Dict[str, str]]):
         return values
 
     def setup(self):
-        self._file = self.path.open('r')
+        self._file = open_file(self.path)
         fieldnames = None if self.has_header else self.outputs
-        self._reader = csv.DictReader(self._file, fieldnames=fieldnames)
+        self._reader = csv.DictReader(self._file, fieldnames=fieldnames, delimiter=self.delimiter)
 
     def teardown(self):
         self._file.close()
 
-    def length(self):
-        count = sum(1 for _ in self._reader)
-        self._file.seek(0)
-        fieldnames = None if self.has_header else self.outputs
-        self._reader = csv.DictReader(self._file, fieldnames=fieldnames)
-        return count
+    def length(self) -> Optional[int]:
+        """
+        Count the lines of the CSV without parsing it, or skip counting if count_rows is False.
+
+        Quoted values spanning several lines and blank lines are counted as rows so the length can be an
+        overestimate, it is only used to size batches and progress bars.
+        """
+        if not self.count_rows:
+            return None
+        lines = _count_lines(self.path)
+        return max(lines - 1, 0) if self.has_header else lines
 
     def extract(self) -> Generator[Dict[str, str], None, None]:
-        yield from self._reader
+        if self.chunk_size is None:
+            yield from self._reader
+            return
+        for rows in self._read_chunks():
+            yield from rows
+
+    def yields_batches(self) -> bool:
+        return self.chunk_size is not None
+
+    def extract_batches(self) -> Generator[List[Dict[str, str]], None, None]:
+        yield from self._read_chunks()
+
+    def extract_chunks(self) -> Generator[Dict[str, List[str]], None, None]:
+        """Yield the outputs of chunk_size lines at a time as columns."""
+        for rows in self._read_chunks():
+            yield {output: [row[output] for row in rows] for output in self.outputs}
+
+    def _read_chunks(self) -> Generator[List[Dict[str, str]], None, None]:
+        if self.has_header:
+            missing = [output for output in self.outputs if output not in (self._reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"CSV {self.path} is missing the output columns {missing}")
+        while chunk := list(islice(self._reader, self.chunk_size or DEFAULT_CHUNK_SIZE)):
+            yield chunk
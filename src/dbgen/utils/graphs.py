@@ -13,21 +13,26 @@
 #   limitations under the License.
 
 from pprint import pformat
-from typing import Any, Callable, Dict, List, Set, Tuple, Union
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Set, Tuple, Union
 from uuid import UUID
 
-from networkx import DiGraph, NetworkXUnfeasible
-from networkx.algorithms import lexicographical_topological_sort, simple_cycles
 from pydantic import BaseModel
 
+if TYPE_CHECKING:
+    from networkx import DiGraph  # pragma: no cover
+
 
 # Graph
 # --------
-def topsort_with_dict(G: DiGraph) -> List:
+def topsort_with_dict(G: "DiGraph") -> List:
     """
     Assuming a graph with object names and dict mapping names to objects,
     perform a topsort and return the list of objects.
     """
+    # networkx is slow to import so only load it once a graph needs sorting
+    from networkx import NetworkXUnfeasible
+    from networkx.algorithms import lexicographical_topological_sort, simple_cycles
+
     try:
         sortd = list(lexicographical_topological_sort(G))
         return sortd
@@ -13,9 +13,7 @@
 #   limitations under the License.
 
 from collections.abc import Iterable
-from functools import reduce
-from itertools import repeat
-from typing import Dict, Generator, Sequence, Set, Tuple, TypeVar, overload
+from typing import Generator, List, Sequence, Sized, Tuple, TypeVar, overload
 
 ##############################################################
 T = TypeVar("T")
@@ -26,18 +24,52 @@ _T4 = TypeVar("_T4")
 _T5 = TypeVar("_T5")
 
 
+def broadcast_length(*args: Sized) -> int:
+    """
+    Get the length that all the sequences broadcast to.
+
+    All non-length-1 sequences must have the same length; if any sequence is empty the result is 0.
+
+    Raises:
+        ValueError: if two sequences have different lengths greater than 1
+    """
+    length_set = {len(arg) for arg in args}
+    long_lengths = length_set - {0, 1}
+    if len(long_lengths) > 1:
+        raise ValueError(
+            f"Found {len(long_lengths)} different >1-length iterables, cannot broadcast: \nLengths: {length_set}"
+        )
+    if 0 in length_set:
+        return 0
+    return long_lengths.pop() if long_lengths else min(length_set, default=0)
+
+
 def is_broadcastable(*args) -> bool:
     """
     Enforce that all non-length-1 elements have the same length
     """
-    length_set: Set[int] = reduce(lambda x, y: x.union([len(y)]), args, set())
-    # Check lengths
-    error_message = f"Found {len(length_set)-(1 in length_set)} different >1-length iterables, cannot broadcast: \nLengths: {length_set}"
-    if not len(length_set) <= 2 or (len(length_set) > 1 and 1 not in length_set and 0 not in length_set):
-        raise ValueError(error_message)
+    broadcast_length(*args)
     return True
 
 
+def broadcast_columns(*args: Sequence[T]) -> List[Sequence[T]]:
+    """Broadcast sequences into columns of equal length.
+
+    Length-1 sequences are repeated to the common length and the rest are returned as is, so the
+    common cases of all length-1 inputs or one sequence alongside scalars need no copying at all.
+    If any sequence is empty, all the columns are empty.
+
+    Raises:
+        ValueError: if two sequences have different lengths greater than 1
+    """
+    length = broadcast_length(*args)
+    if length == 0:
+        return [[] for _ in args]
+    if length == 1:
+        return list(args)
+    return [arg if len(arg) == length else [arg[0]] * length for arg in args]
+
+
 @overload
 def broadcast(
     __vals1: Sequence[_T1],
@@ -82,35 +114,12 @@ def broadcast(*args: Sequence[T]) -> Generator[Tuple[T, ...], None, None]:
     Yields:
         Generator[Tuple[T, ...], None, None]: Generator that returns a tuple from each input Sequence
     """
-    # Check that args are broadcastable
-    is_broadcastable(*args)
-    iterators = [iter(arg) for arg in args]
-    num_active = len(iterators)
-    empty_lists = [l for l in args if len(l) == 0]
-    if empty_lists:
+    columns = broadcast_columns(*args)
+    if columns and not len(columns[0]):
         # If there are empty lists return N empty lists
-        yield from ([] for _ in range(num_active))  # type: ignore
-        return
-    fillvalue: Dict[int, T] = {}
-    if not num_active:
+        yield from ([] for _ in columns)  # type: ignore
         return
-    while True:
-        values = []
-        for i, it in enumerate(iterators):
-            try:
-                value = next(it)
-                fillvalue[i] = value
-            except StopIteration:
-                try:
-                    num_active -= 1
-                    if not num_active:
-                        return
-                    iterators[i] = repeat(fillvalue[i])
-                    value = fillvalue[i]
-                except KeyError:
-                    raise ValueError(f"Error broadcasting lists: {args}")
-            values.append(value)
-        yield tuple(values)
+    yield from zip(*columns)
 
 
 def flatten(thing):
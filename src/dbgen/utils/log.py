@@ -19,13 +19,12 @@ from logging import Formatter, Logger
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from textwrap import dedent
-from typing import Tuple
+from typing import Iterator, Optional, Tuple
 
 # Add error message as this is first module imported by dbgen
 try:
     from rich.console import Console
     from rich.logging import RichHandler
-    from rich.traceback import install
 except ModuleNotFoundError:
     print(
         dedent(
@@ -36,7 +35,6 @@ except ModuleNotFoundError:
         )
     )
     raise
-install()
 
 logging_console = Console()
 
@@ -52,9 +50,34 @@ class LogLevel(str, Enum):
         return getattr(logging, self)
 
 
-def capture_stdout(func):
-    def wrapped(*args, **kwargs):
+class StdoutCapture(str, Enum):
+    """When the stdout of user transforms is redirected into the debug logs."""
+
+    OFF = 'off'
+    SAMPLED = 'sampled'
+    BATCH = 'batch'
+    ALWAYS = 'always'
+
+
+@contextlib.contextmanager
+def captured_stdout(logger: Logger) -> Iterator[None]:
+    """Redirect stdout within the block and log anything printed at the debug level."""
+    stream = StringIO()
+    try:
+        with contextlib.redirect_stdout(stream):
+            yield
+    finally:
+        stdout = stream.getvalue().strip()
+        if stdout:
+            logger.debug(stdout)
+
+
+def capture_stdout(func, logger: Optional[Logger] = None):
+    # Resolve the logger once when wrapping rather than on every call
+    if logger is None:
         logger = logging.getLogger(f"dbgen.pyblock.{func.name}")
+
+    def wrapped(*args, **kwargs):
         stream = StringIO()
         with contextlib.redirect_stdout(stream):
             output = func(*args, **kwargs)
@@ -66,6 +89,13 @@ def capture_stdout(func):
     return wrapped
 
 
+def install_rich_traceback() -> None:
+    """Install rich's traceback handler, deferred from import so that importing dbgen has no global side effects."""
+    from rich.traceback import install
+
+    install()
+
+
 def setup_logger(
     level: LogLevel = LogLevel.DEBUG, std_out_level: LogLevel = LogLevel.INFO
 ) -> Tuple[Logger, RichHandler]:
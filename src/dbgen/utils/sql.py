@@ -12,17 +12,20 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from typing import List, Optional, Union, cast
+from collections import defaultdict
+from hashlib import md5
+from typing import Dict, List, Optional, Set, Tuple, Union, cast
 
 import sqlalchemy as sa
 from pydantic import Field
 from pydantic.networks import PostgresDsn
 from pydantic.tools import parse_obj_as
 from pydantic.types import SecretStr
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext import compiler
-from sqlalchemy.schema import DDLElement, PrimaryKeyConstraint
+from sqlalchemy.schema import AddConstraint, CreateIndex, CreateTable, DDLElement, PrimaryKeyConstraint
 
 from dbgen.core.base import Base
 from dbgen.utils.type_coercion import json_dumps
@@ -192,3 +195,77 @@ def refresh_all_mat_views(concurrently=True):
     mat_views = sa.inspect(sa.engine).get_view_names(include="materialized")
     for v in mat_views:
         refresh_mat_view(v, concurrently)
+
+
+def get_metadata_fingerprint(metadata: sa.MetaData) -> str:
+    """Hash the DDL of every table, index and view in the metadata."""
+    dialect = postgresql.dialect()  # type: ignore
+    fingerprint = md5()
+    for table in sorted(metadata.tables.values(), key=lambda x: x.fullname):
+        fingerprint.update(str(CreateTable(table).compile(dialect=dialect)).encode('utf-8'))
+        for index in sorted(table.indexes, key=lambda x: str(x.name)):
+            fingerprint.update(str(CreateIndex(index).compile(dialect=dialect)).encode('utf-8'))
+    # Views are created by DDL listeners rather than stored as tables on the metadata
+    for listener in metadata.dispatch.after_create:  # type: ignore
+        if isinstance(listener, DDLElement):
+            fingerprint.update(str(listener.compile(dialect=dialect)).encode('utf-8'))
+    return fingerprint.hexdigest()
+
+
+def get_missing_tables(connection: sa.engine.Connection, metadata: sa.MetaData) -> List[str]:
+    """Find the tables in the metadata missing from the database with a single query."""
+    preparer = connection.dialect.identifier_preparer
+    names = [
+        preparer.format_table(table, use_schema=True)
+        for table in sorted(metadata.tables.values(), key=lambda x: x.fullname)
+    ]
+    if not names:
+        return []
+    result = connection.execute(
+        text("select name from unnest(cast(:names as text[])) as name where to_regclass(name) is null"),
+        {'names': names},
+    )
+    return [name for (name,) in result]
+
+
+def get_missing_columns(connection: sa.engine.Connection, metadata: sa.MetaData) -> List[sa.Column]:
+    """Find the columns of existing tables in the metadata that are missing from the database."""
+    default_schema: str = connection.dialect.default_schema_name  # type: ignore
+    schemas = sorted({table.schema or default_schema for table in metadata.tables.values()})
+    result = connection.execute(
+        text(
+            "select table_schema, table_name, column_name from information_schema.columns "
+            "where table_schema = any(cast(:schemas as text[]))"
+        ),
+        {'schemas': schemas},
+    )
+    existing: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+    for schema, table_name, column_name in result:
+        existing[(schema, table_name)].add(column_name)
+    missing: List[sa.Column] = []
+    for table in sorted(metadata.tables.values(), key=lambda x: x.fullname):
+        columns = existing.get((table.schema or default_schema, table.name))
+        # Tables that do not exist at all are left to create_all
+        if columns:
+            missing.extend(column for column in table.columns if column.name not in columns)
+    return missing
+
+
+def add_column(connection: sa.engine.Connection, column: sa.Column) -> None:
+    """Add a column to an existing table as a nullable column, its foreign keys are added separately."""
+    preparer = connection.dialect.identifier_preparer
+    column_type = column.type.compile(dialect=connection.dialect)
+    statement = (
+        f"ALTER TABLE {preparer.format_table(column.table)} "
+        f"ADD COLUMN IF NOT EXISTS {preparer.format_column(column)} {column_type}"
+    )
+    if column.server_default is not None:
+        default = connection.dialect.ddl_compiler(connection.dialect, None).get_column_default_string(column)
+        statement += f" DEFAULT {default}"
+    connection.execute(text(statement))
+
+
+def add_column_foreign_keys(connection: sa.engine.Connection, column: sa.Column) -> None:
+    """Add the foreign key constraints of a column added by add_column."""
+    for foreign_key in column.foreign_keys:
+        connection.execute(AddConstraint(foreign_key.constraint))
@@ -94,7 +94,9 @@ def make_model():
     )
     query = Query(select(Parent.id, Parent.label))
 
-    @transform(env=Environment([Import('typing', ['Tuple'])]))
+    @transform(
+        env=Environment([Import('typing', ['Tuple']), Import('tests.example.full_model', ['ModelSettings'])])
+    )
     def concise_func(label: str, settings: ModelSettings) -> Tuple[str]:
         return (f"{label}-{settings.suffix}",)
 
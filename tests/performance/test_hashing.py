@@ -0,0 +1,65 @@
+#   Copyright 2022 Modelyst LLC
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import cProfile
+import pstats
+from uuid import uuid4
+
+import pytest
+from sqlmodel import select
+
+import tests.example.entities as entities
+from dbgen.core.args import Constant
+from dbgen.core.etl_step import ETLStep
+from dbgen.core.node.query import BaseQuery
+from dbgen.core.node.transforms import PythonTransform
+from dbgen.core.run.utilities import RunConfig
+
+pytestmark = pytest.mark.skip('performance tests')
+
+
+def add_child(x):
+    return f"{x}-child"
+
+
+@pytest.fixture
+def etl_step():
+    query = BaseQuery.from_select_statement(select(entities.Parent.label))
+    pyblock = PythonTransform(function=add_child, inputs=[query["label"]], outputs=["newnames"])
+    load = entities.Child.load(insert=True, label=pyblock["newnames"], type=Constant("child_type"))
+    return ETLStep(name="hashing", extract=query, transforms=[pyblock], loads=[load]).frozen()
+
+
+@pytest.fixture
+def batch(etl_step: ETLStep):
+    return [(uuid4(), {etl_step.extract.hash: {'label': f'parent_{i}'}}) for i in range(10000)]
+
+
+def test_transform_batch(etl_step: ETLStep, batch, benchmark):
+    run_config = RunConfig(progress_bar=False)
+    benchmark(lambda: etl_step.transform_batch(batch, run_config))
+
+
+def test_transform_batch_hashes_memoized(etl_step: ETLStep, batch):
+    """Once the hashes are warm the transform loop no longer rehashes the etl_step or its nodes."""
+    run_config = RunConfig(progress_bar=False)
+    etl_step.transform_batch(batch[:1], run_config)
+    profiler = cProfile.Profile()
+    profiler.runcall(etl_step.transform_batch, batch, run_config)
+    stats = pstats.Stats(profiler).stats  # type: ignore
+    # The only hashing left is of the loaded row values themselves
+    hasher_callers = {
+        caller[2] for func, (*_, callers) in stats.items() if func[2] == 'hasher' for caller in callers
+    }
+    assert hasher_callers <= {'hash_tuple'}
@@ -23,6 +23,7 @@ from unittest import mock
 import boto3
 import pytest
 from moto import mock_s3
+from pydantic import ValidationError
 
 from dbgen.exceptions import MissingImportError
 from dbgen.providers.aws.extract import S3FileExtractor, S3FileNameExtractor
@@ -88,6 +89,53 @@ def test_s3_extractor(mock_s3_bucket, bucket_name):
         assert contents == file_dict[key]
 
 
+def test_s3_extractor_threads(s3_client, bucket_name, region):
+    """Test that concurrently downloaded objects are yielded in order across listing pages."""
+    s3_client.create_bucket(Bucket=bucket_name, CreateBucketConfiguration={"LocationConstraint": region})
+    keys = [f"file_{i:04d}.txt" for i in range(1005)]
+    for key in keys:
+        s3_client.put_object(Bucket=bucket_name, Key=key, Body=key.encode())
+    extractor = S3FileExtractor(bucket=bucket_name, max_workers=4, prefetch=8)
+    assert list(extractor.extract()) == [(key, key) for key in keys]
+    assert list(S3FileNameExtractor(bucket=bucket_name, pattern=r"_000\d").extract()) == keys[:10]
+    with pytest.raises(ValidationError, match='prefetch must be a positive integer'):
+        S3FileExtractor(bucket=bucket_name, prefetch=0)
+
+
+def test_s3_extractor_bytes(mock_s3_bucket, bucket_name):
+    extractor = S3FileExtractor(bucket=bucket_name, encoding=None)
+    file_dict = {name: content for name, content in zip(*mock_s3_bucket)}
+    for key, contents in extractor.extract():
+        assert contents == file_dict[key].encode()
+
+
+def test_s3_extractor_cache(mock_s3_bucket, s3_client, bucket_name, tmp_path, monkeypatch):
+    """Test that only objects whose ETag changed are downloaded again when a cache_dir is set."""
+    downloaded = []
+    download = S3FileExtractor._download
+
+    def record_download(self, client, key):
+        downloaded.append(key)
+        return download(self, client, key)
+
+    monkeypatch.setattr(S3FileExtractor, "_download", record_download)
+    extractor = S3FileExtractor(bucket=bucket_name, cache_dir=tmp_path)
+    file_names, file_contents = mock_s3_bucket
+    file_dict = dict(zip(file_names, file_contents))
+    assert dict(extractor.extract()) == file_dict
+    assert sorted(downloaded) == sorted(file_names)
+
+    downloaded.clear()
+    assert dict(extractor.extract()) == file_dict
+    assert downloaded == []
+
+    s3_client.put_object(Bucket=bucket_name, Key=file_names[0], Body=b'{"c": 3}')
+    assert dict(extractor.extract()) == {**file_dict, file_names[0]: '{"c": 3}'}
+    assert downloaded == [file_names[0]]
+    # The stale copy of the changed object is replaced
+    assert len(list((tmp_path / bucket_name).iterdir())) == len(file_names)
+
+
 def test_missing_boto3():
     """Ensure helpful error is thrown when boto3 is installed and aws is accessed"""
     with pytest.raises(MissingImportError):
@@ -13,14 +13,25 @@
 #   limitations under the License.
 
 import csv
+import gzip
+import re
 from io import StringIO
 from pathlib import Path
+from uuid import uuid4
 
 import pytest
 import yaml
 from pydantic import ValidationError
 
-from dbgen.providers.common.extract import CSVExtractor, FileExtractor, FileNameExtractor, YamlExtractor
+from dbgen.core.node.transforms import MapExecutor
+from dbgen.core.run.utilities import BaseETLStepExecutor
+from dbgen.providers.common.extract import (
+    CSVExtractor,
+    FileExtractor,
+    FileNameExtractor,
+    MmapFileExtractor,
+    YamlExtractor,
+)
 
 # Test data
 rows = [
@@ -168,3 +179,119 @@ def test_yaml_extractor(tmpdir: Path):
         assert extract.length() == 3
         for i, (file_name, yaml_dict) in enumerate(extract.extract()):
             assert yaml_dict['i'] == int(file_name.name.split('.')[0])
+
+
+@pytest.mark.parametrize('executor', list(MapExecutor))
+def test_parallel_yaml_extractor(tmpdir: Path, executor: MapExecutor):
+    """Test that every executor parses the same files in the same order with a small prefetch window."""
+    for i in range(20):
+        with open(tmpdir / f'{i:02d}.yml', 'w') as f:
+            yaml.dump({'i': i}, f)
+    extract = YamlExtractor(directory=tmpdir, executor=executor, max_workers=2, prefetch=3)
+    with extract:
+        extracted = list(extract.extract())
+    assert [file_name for file_name, _ in extracted] == extract._file_paths
+    assert [int(file_name.name.split('.')[0]) for file_name, _ in extracted] == [
+        yaml_dict['i'] for _, yaml_dict in extracted
+    ]
+    with pytest.raises(ValidationError, match='prefetch must be a positive integer'):
+        YamlExtractor(directory=tmpdir, prefetch=0)
+
+
+@pytest.mark.parametrize('has_header', (True, False))
+@pytest.mark.parametrize('trailing_newline', (True, False))
+def test_csv_length(tmpdir: Path, has_header: bool, trailing_newline: bool):
+    """Test that the line count length matches the rows with or without a final newline."""
+    lines = [','.join(columns)] if has_header else []
+    lines += [f"{row['index']},{row['a']}" for row in rows]
+    test_file = tmpdir / 'length.csv'
+    test_file.write_text('\n'.join(lines) + ('\n' if trailing_newline else ''), encoding=encoding)
+    extract = CSVExtractor(path=test_file, has_header=has_header, outputs=columns)
+    assert extract.length() == 3
+    assert CSVExtractor(path=test_file, outputs=columns, count_rows=False).length() is None
+    empty_file = tmpdir / 'empty.csv'
+    empty_file.write_text('', encoding=encoding)
+    assert CSVExtractor(path=empty_file, has_header=has_header, outputs=columns).length() == 0
+
+
+def test_csv_chunks(tmpdir: Path, example_csv_with_header: StringIO):
+    """Test that chunked reading yields the same rows and picks out the outputs whatever the column order."""
+    test_file = tmpdir / 'chunks.csv'
+    test_file.write_text(example_csv_with_header.getvalue(), encoding=encoding)
+    extract = CSVExtractor(path=test_file, outputs=['a', 'index'], chunk_size=2)
+    with extract:
+        assert list(extract.extract()) == rows
+    with extract:
+        assert list(extract.extract_batches()) == [rows[:2], rows[2:]]
+    with extract:
+        assert list(extract.extract_chunks()) == [
+            {'a': ['i', 'j'], 'index': ['0', '1']},
+            {'a': ['k'], 'index': ['2']},
+        ]
+    missing = CSVExtractor(path=test_file, outputs=['b'], chunk_size=2)
+    with missing, pytest.raises(ValueError):
+        list(missing.extract())
+
+
+def test_csv_chunk_repeat_hashes(tmpdir: Path, example_csv_with_header: StringIO):
+    """Test that turning chunking on keeps the hash of the extract and the repeat hashes of its rows."""
+    test_file = tmpdir / 'chunks.csv'
+    test_file.write_text(example_csv_with_header.getvalue(), encoding=encoding)
+    extract = CSVExtractor(path=test_file, outputs=columns)
+    chunked = CSVExtractor(path=test_file, outputs=columns, chunk_size=2)
+    assert chunked.hash == extract.hash
+    etl_step_uuid = uuid4()
+    with extract:
+        hashes = BaseETLStepExecutor._hash_rows(list(extract.extract()), etl_step_uuid)
+    with chunked:
+        chunked_hashes = [
+            input_hash
+            for batch in chunked.extract_batches()
+            for input_hash in BaseETLStepExecutor._hash_rows(batch, etl_step_uuid)
+        ]
+    assert chunked_hashes == hashes
+
+
+def _compress(path: Path, contents: bytes, suffix: str) -> Path:
+    compressed = Path(f'{path}{suffix}')
+    if suffix == '.gz':
+        compressed.write_bytes(gzip.compress(contents))
+    else:
+        zstandard = pytest.importorskip('zstandard')
+        compressed.write_bytes(zstandard.ZstdCompressor().compress(contents))
+    return compressed
+
+
+@pytest.mark.parametrize('suffix', ('.gz', '.zst'))
+def test_compressed_extractors(tmpdir: Path, example_csv_with_header: StringIO, suffix: str):
+    """Test that compressed files are decompressed as they are read."""
+    test_file = _compress(Path(tmpdir) / 'rows.csv', example_csv_with_header.getvalue().encode(), suffix)
+    extract = CSVExtractor(path=test_file, outputs=columns)
+    with extract:
+        assert extract.length() == 3
+        assert list(extract.extract()) == rows
+    for i in range(3):
+        _compress(Path(tmpdir) / f'{i}.yml', yaml.dump({'i': i}).encode(), suffix)
+    yaml_extract = YamlExtractor(directory=tmpdir)
+    with yaml_extract:
+        assert sorted(yaml_dict['i'] for _, yaml_dict in yaml_extract.extract()) == [0, 1, 2]
+
+
+class HeaderLineCounter(MmapFileExtractor):
+    def file_parser(self, file_obj: memoryview):
+        return bytes(file_obj[:3]), len(re.findall(rb'\n', file_obj))
+
+
+def test_mmap_file_extractor(tmpdir: Path):
+    """Test that parsers read the views of the files in place and that they must be defined."""
+    contents = {'empty.txt': b'', 'text.txt': b'abc\n' * 1000, 'packed.txt.gz': b'packed\n'}
+    for name, content in contents.items():
+        (Path(tmpdir) / name).write_bytes(gzip.compress(content) if name.endswith('.gz') else content)
+    extract = HeaderLineCounter(directory=tmpdir)
+    with extract:
+        extracted = {file_name.name: parsed for file_name, parsed in extract.extract()}
+    assert extracted == {'empty.txt': (b'', 0), 'text.txt': (b'abc', 1000), 'packed.txt.gz': (b'pac', 1)}
+
+    extract = MmapFileExtractor(directory=tmpdir)
+    with extract, pytest.raises(NotImplementedError):
+        list(extract.extract())
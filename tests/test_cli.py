@@ -119,3 +119,22 @@ def test_run_status(tmpdir, sql_engine, reset_config_dsn):
     assert results.exit_code == 0
     results = runner.invoke(app, ['run', 'status'])
     assert results.exit_code == 0
+
+
+def test_run_compiled(tmpdir, sql_engine, reset_config_dsn):
+    """Test compiling a model and running it from the compiled artifact."""
+    config_file = tmpdir.mkdir("sub").join("good.env")
+    config_file.write(f'# DBgen Settings\ndbgen_main_dsn = {str(sql_engine.url)}')
+    results = runner.invoke(app, ['connect', '-c', config_file, '--test'])
+    assert results.exit_code == 0
+    compiled = tmpdir.join('compiled_model.json')
+    model_str = 'tests.example.full_model:make_model'
+    results = runner.invoke(app, ['model', 'compile', '--model', model_str, '-o', compiled])
+    assert results.exit_code == 0
+    assert compiled.exists()
+
+    results = runner.invoke(app, ['run', '--model', model_str, '--compiled', compiled, '--build', '-y'])
+    assert results.exit_code == 0
+    with Session(sql_engine) as session:
+        children = session.exec(select(Child)).all()
+        assert len(children) == 1002
@@ -12,6 +12,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import pickle
 from datetime import datetime
 from typing import Optional
 from uuid import UUID
@@ -360,6 +361,23 @@ def test_clear_registry_method(clear_registry):
         __tablename__ = "dummy"
 
 
+def test_load_entity_cache(clear_registry):
+    """Test that the LoadEntity is cached per class and rebuilt when the registry changes."""
+
+    class Cached(Entity, table=True):
+        __identifying__ = {'label'}
+        label: str
+
+    load_entity = Cached._get_load_entity()
+    assert load_entity is Cached._get_load_entity()
+    assert load_entity._load_entity() is Cached
+    # The entity class is not pickled with the LoadEntity
+    assert pickle.loads(pickle.dumps(load_entity))._entity is None
+    BaseEntity.metadata.remove(Cached.__table__)
+    Cached.__table__.to_metadata(BaseEntity.metadata)
+    assert Cached._get_load_entity() is not load_entity
+
+
 def test_duplicate_table_name(clear_registry):
     """Test that tables with the same name error and Entity.clear_registry works."""
     assert len(BaseEntity.metadata.tables) == 0
@@ -12,6 +12,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import pickle
 from random import shuffle
 from typing import Optional, cast
 
@@ -25,6 +26,7 @@ from dbgen.core.entity import Entity
 from dbgen.core.etl_step import ETLStep
 from dbgen.core.func import Import
 from dbgen.core.metadata import RunEntity
+from dbgen.core.node.extract import PythonExtract
 from dbgen.core.node.load import Load
 from dbgen.core.node.query import BaseQuery
 from dbgen.core.node.transforms import PythonTransform
@@ -94,6 +96,75 @@ def test_sorted_loads():
         ]
 
 
+def test_sorted_nodes_cached(basic_etl_step: ETLStep, monkeypatch):
+    """Test that the sorted nodes, loads, and dependency are cached until a node is added."""
+    sorted_loads = basic_etl_step._sorted_loads()
+    dependency = basic_etl_step._get_dependency()
+    sorted_nodes = basic_etl_step._sort_nodes()
+
+    def fail(*_):
+        raise AssertionError("The computational graph should not be re-sorted")
+
+    monkeypatch.setattr('dbgen.core.etl_step.topsort_with_dict', fail)
+    assert basic_etl_step._sort_nodes() == sorted_nodes
+    assert basic_etl_step._sorted_loads() is sorted_loads
+    assert basic_etl_step._get_dependency() is dependency
+    monkeypatch.undo()
+
+    new_load = entities.GrandParent.load(label=Constant("new"), type=Constant("new"))
+    basic_etl_step.add_node(new_load)
+    assert new_load in basic_etl_step._sorted_loads()
+    assert "public.grandparent" in basic_etl_step._get_dependency().tables_needed
+
+
+def test_hashes_memoized(basic_etl_step: ETLStep, monkeypatch):
+    """Test that only frozen copies memoize their hashes and that they cannot be changed."""
+    etl_step_hash = basic_etl_step.hash
+    frozen = basic_etl_step.frozen()
+    assert frozen.hash == etl_step_hash
+    assert all(sorted_load is load for sorted_load, load in zip(frozen._sorted_loads(), frozen.loads))
+    calls = []
+    monkeypatch.setattr('dbgen.core.base.hasher', lambda thing: calls.append(thing) or 'fail')
+    assert frozen.hash == etl_step_hash
+    assert frozen.uuid.hex == etl_step_hash
+    assert pickle.loads(pickle.dumps(frozen)).hash == etl_step_hash
+    assert not calls
+    monkeypatch.undo()
+
+    # The frozen copy rejects assignment and in place changes to its nested fields
+    load = frozen.loads[0]
+    with pytest.raises(TypeError):
+        load.insert = False
+    with pytest.raises(TypeError):
+        frozen.tags.append('new_tag')
+    with pytest.raises(TypeError):
+        frozen.extract.params['new_param'] = 1
+    with pytest.raises(TypeError):
+        frozen.add_node(entities.GrandParent.load(label=Constant("new"), type=Constant("new")))
+    assert frozen.hash == etl_step_hash
+
+    # The original is untouched and still rehashes after in place changes
+    basic_etl_step.tags.append('new_tag')
+    assert basic_etl_step.hash != etl_step_hash
+    basic_etl_step.tags.pop()
+    basic_etl_step.loads[0].insert = not basic_etl_step.loads[0].insert
+    assert basic_etl_step.hash != etl_step_hash
+    assert frozen.copy(update={'name': 'new_name'}).hash != etl_step_hash
+
+    # Runtime state that is not pickled, such as callables and connections, is kept by the frozen copy
+    connection = object()
+    basic_etl_step.extract.set_connection(connection)
+    assert basic_etl_step.frozen().extract._connection is connection
+    values = [1, 2]
+
+    def closure_extract():
+        yield from values
+
+    python_extract = PythonExtract(function=closure_extract, outputs=['value']).frozen()
+    assert python_extract.function._func is closure_extract
+    assert list(python_extract.extract()) == values
+
+
 @pytest.mark.skip
 def test_no_extractor(sql_engine: Engine):
     """Shuffle around the loads and make sure sorted_loads still works."""
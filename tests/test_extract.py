@@ -17,6 +17,7 @@ from typing import List, Optional, Tuple
 import pytest
 
 from dbgen.core.node.extract import Extract
+from dbgen.core.run.utilities import RunConfig
 
 
 def run_extract(extract: Extract) -> Tuple[List[dict], Optional[int]]:
@@ -79,6 +80,15 @@ def test_basic_custom_extract():
     assert outputs == [{extract.hash: {'char': char}} for char in string]
 
 
+def test_default_extract_batches():
+    """Test that extractors without their own batching yield the rows of extract in batches."""
+    extract = BaseCustomExtract(string='abcde')
+    assert not extract.yields_batches()
+    assert list(extract.extract_batches()) == [['a', 'b', 'c', 'd', 'e']]
+    extract._set_run_config(RunConfig(batch_size=2))
+    assert list(extract.extract_batches()) == [['a', 'b'], ['c', 'd'], ['e']]
+
+
 def test_custom_setup_teardown():
     """Test that a custom extract's setup and teardown methods are correctly called in order."""
 
@@ -137,3 +147,21 @@ def test_good_return():
     extract = ListExtract()
     outputs, _ = run_extract(extract)
     assert outputs == [{extract.hash: {'list': [1, 2, 3]}}]
+
+
+def test_process_batch():
+    """Test that batches of rows and columns are converted to the same rows as process_row."""
+    extract = Extract(outputs=['a', 'b'])
+    rows = [(1, 'x'), (2, 'y')]
+    expected = [extract.process_row(row) for row in rows]
+    assert extract.process_batch(rows) == expected
+    assert extract.process_batch({'a': [1, 2], 'b': ['x', 'y']}) == expected
+    assert extract.process_batch([{'a': 1, 'b': 'x'}, {'a': 2, 'b': 'y'}]) == expected
+    assert extract.process_batch([]) == []
+    assert Extract(outputs=['a']).process_batch([1, 2]) == [{'a': 1}, {'a': 2}]
+    with pytest.raises(ValueError, match='rows of length'):
+        extract.process_batch([(1, 'x'), (2,)])
+    with pytest.raises(ValueError, match='different lengths'):
+        extract.process_batch({'a': [1, 2], 'b': ['x']})
+    with pytest.raises(ValueError, match='expected multiple outputs'):
+        extract.process_batch([1, 2])
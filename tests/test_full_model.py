@@ -12,16 +12,27 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+from pathlib import Path
+from time import sleep, time
+from typing import Any, List
+
 import pytest
+from sqlalchemy import text
 from sqlalchemy.future import Engine
 from sqlalchemy.orm import registry
 from sqlmodel import Session, select
 
 from dbgen.core.args import Constant
+from dbgen.core.decorators import extract, transform
 from dbgen.core.entity import Entity
 from dbgen.core.etl_step import ETLStep
+from dbgen.core.metadata import ETLStepRunEntity, ModelETLStepMap, Watermark
 from dbgen.core.model import Model
-from dbgen.core.node.query import Query
+from dbgen.core.node.query import BaseQuery, Query
+from dbgen.core.run.async_run import AsyncETLStepExecutor
+from dbgen.core.run.etl_step_run import ETLStepExecutor
+from dbgen.core.run.utilities import RowCount, RunConfig, RunMetricsWriter
+from dbgen.providers.common.extract import FileExtractor
 from dbgen.utils.typing import IDType
 
 test_registry = registry()
@@ -34,6 +45,11 @@ class Father(Entity, table=True, registry=test_registry):
     age: int
 
 
+class Number(Entity, table=True, registry=test_registry):
+    __identifying__ = {'value'}
+    value: int
+
+
 class Son(Entity, table=True, registry=test_registry):
     __identifying__ = {'first_name', 'last_name'}
     first_name: str
@@ -42,6 +58,43 @@ class Son(Entity, table=True, registry=test_registry):
     father_id: IDType = Father.foreign_key()
 
 
+@transform
+def check_number(value: int) -> int:
+    import os
+
+    if str(value) == os.environ.get('DBGEN_TEST_FAIL_AT'):
+        raise ValueError(f'Failed at {value}')
+    return value
+
+
+@transform
+def slow_number(value: int) -> int:
+    from time import sleep
+
+    sleep(0.05)
+    return value
+
+
+@transform
+def parse_number(contents: str) -> int:
+    return int(contents)
+
+
+@extract(outputs=['value'], batched=True)
+def batched_numbers():
+    yield [(0,), (1,), (1,)]
+    yield {'value': [2, 3, 0]}
+
+
+NUMBERS = (4, 5, 6)
+
+
+@extract(outputs=['value'])
+def global_numbers():
+    for value in NUMBERS:
+        yield (value,)
+
+
 @pytest.fixture
 def simple_model():
     with Model(name='test', registry=test_registry) as model:
@@ -64,6 +117,20 @@ def simple_model():
     return model
 
 
+@pytest.fixture
+def extracted_rows(monkeypatch) -> List[Any]:
+    """Record every extracted row that the sync and async executors check for repeats."""
+    rows: List[Any] = []
+    for executor in (ETLStepExecutor, AsyncETLStepExecutor):
+
+        def record_repeat(self, row, etl_step_uuid, check_repeat=executor._check_repeat):
+            rows.append(row)
+            return check_repeat(self, row, etl_step_uuid)
+
+        monkeypatch.setattr(executor, '_check_repeat', record_repeat)
+    return rows
+
+
 def test_model(simple_model: Model):
     assert len(simple_model.etl_steps) == 2
 
@@ -78,3 +145,213 @@ def test_full_model_run(simple_model: Model, sql_engine: Engine, run_async: bool
         assert parent.last_name == 'Simpson'
         assert child.first_name == 'Bart'
         assert child.last_name == 'Simpson'
+
+
+@pytest.mark.parametrize('run_async', (False, True), ids=['sync', 'async'])
+@pytest.mark.parametrize('row_count', list(RowCount))
+def test_full_model_row_count(simple_model: Model, sql_engine: Engine, run_async: bool, row_count: RowCount):
+    """Test that every row count mode runs the model to completion."""
+    run_config = RunConfig(row_count=row_count, progress_bar=False)
+    run = simple_model.run(sql_engine, sql_engine, run_config=run_config, build=True, run_async=run_async)
+    assert run.status == 'completed'
+    with Session(sql_engine) as session:
+        assert session.exec(select(Son.first_name)).all() == ['Bart']
+
+
+def test_model_run_registration(simple_model: Model, sql_engine: Engine, monkeypatch):
+    """Test that all metadata rows are registered up front and unchanged etl_steps are not reserialized."""
+    run = simple_model.run(sql_engine, sql_engine, build=True)
+    with Session(sql_engine) as session:
+        etl_step_runs = session.exec(
+            select(ETLStepRunEntity)
+            .where(ETLStepRunEntity.run_id == run.id)
+            .order_by(ETLStepRunEntity.ordering)
+        ).all()
+        assert [(x.etl_step_id, x.status) for x in etl_step_runs] == [
+            (etl_step.uuid, 'completed') for etl_step in simple_model._sort_graph()
+        ]
+        model_etl_steps = session.exec(
+            select(ModelETLStepMap.etl_step_id).where(ModelETLStepMap.model_id == simple_model.uuid)
+        ).all()
+        assert set(model_etl_steps) == {etl_step.uuid for etl_step in simple_model.etl_steps}
+
+    def fail(self):
+        raise AssertionError(f'ETLStep {self.name!r} was reserialized')
+
+    monkeypatch.setattr(ETLStep, '_get_etl_step_row', fail)
+    run = simple_model.run(sql_engine, sql_engine)
+    assert run.status == 'completed'
+
+
+def test_run_metrics_writer(simple_model: Model, sql_engine: Engine):
+    """Test that progress counters are flushed in the background and once more on close."""
+    run = simple_model.run(sql_engine, sql_engine, build=True)
+    with Session(sql_engine) as session:
+        etl_step_run = session.exec(select(ETLStepRunEntity).where(ETLStepRunEntity.run_id == run.id)).first()
+        assert etl_step_run
+        get_counters = lambda: session.exec(
+            select(ETLStepRunEntity.rows_inserted, ETLStepRunEntity.rows_updated)
+            .where(ETLStepRunEntity.etl_step_id == etl_step_run.etl_step_id)
+            .where(ETLStepRunEntity.run_id == run.id)
+            .execution_options(populate_existing=True)
+        ).one()
+        with RunMetricsWriter(sql_engine, etl_step_run, interval=0.01) as metrics:
+            metrics.update(rows_inserted=10)
+            deadline = time() + 5
+            while get_counters() != (10, 0) and time() < deadline:
+                session.rollback()
+                sleep(0.01)
+            assert get_counters() == (10, 0)
+            metrics.update(rows_inserted=20, rows_updated=5)
+        session.rollback()
+        assert get_counters() == (20, 5)
+
+
+def test_run_metrics_writer_batches(sql_engine: Engine):
+    """Test that progress is flushed while a sync etl_step loads several batches."""
+    with Model(name='test_metrics_batches', registry=test_registry) as model:
+        with ETLStep('add_slow_numbers', batch_size=2):
+            value = BaseQuery(query='select generate_series(1, 6) as id', outputs=['id']).results()
+            Number.load(insert=True, value=slow_number(value).results())
+
+    run_config = RunConfig(metrics_interval=0.01)
+    run = model.run(sql_engine, sql_engine, build=True, run_async=False, run_config=run_config)
+    assert run.status == 'completed'
+    with Session(sql_engine) as session:
+        etl_step_run = session.get(ETLStepRunEntity, (model.etl_steps[0].uuid, run.id))
+        assert etl_step_run and etl_step_run.status == 'completed'
+        assert (etl_step_run.inputs_extracted, etl_step_run.unique_inputs, etl_step_run.rows_inserted) == (6, 6, 6)
+
+
+def test_keyset_resume(sql_engine: Engine, monkeypatch, extracted_rows: List[Any]):
+    """Test that a failed keyset paginated etl_step resumes after its checkpoint when rerunning failed steps."""
+    with Model(name='test_keyset', registry=test_registry) as model:
+        with ETLStep('add_numbers', keyset=['id'], batch_size=5):
+            value = BaseQuery(query='select generate_series(1, 20) as id', outputs=['id']).results()
+            Number.load(insert=True, value=check_number(value).results())
+
+    monkeypatch.setenv('DBGEN_TEST_FAIL_AT', '13')
+    run = model.run(sql_engine, sql_engine, build=True)
+    assert run.errors == 1
+    with Session(sql_engine) as session:
+        status, checkpoint = session.exec(
+            select(ETLStepRunEntity.status, ETLStepRunEntity.checkpoint).where(
+                ETLStepRunEntity.run_id == run.id
+            )
+        ).one()
+        assert (status, checkpoint) == ('failed', {'id': 10})
+
+    extracted_rows.clear()
+    monkeypatch.delenv('DBGEN_TEST_FAIL_AT')
+    run = model.run(sql_engine, sql_engine, rerun_failed=True)
+    assert not run.errors
+    assert [row['id'] for row in extracted_rows] == list(range(11, 21))
+    with Session(sql_engine) as session:
+        assert sorted(session.exec(select(Number.value)).all()) == list(range(1, 21))
+
+
+@pytest.mark.parametrize('run_async', (False, True), ids=['sync', 'async'])
+def test_watermark_incremental(sql_engine: Engine, extracted_rows: List[Any], run_async: bool):
+    """Test that only rows above the stored watermark are extracted unless retrying."""
+    with sql_engine.begin() as conn:
+        conn.execute(text('drop table if exists watermark_source'))
+        conn.execute(text('create table watermark_source as select generate_series(1, 10) as id'))
+
+    with Model(name='test_watermark', registry=test_registry) as model:
+        with ETLStep('add_watermarked_numbers', watermark='id'):
+            value = BaseQuery(query='select id from watermark_source', outputs=['id']).results()
+            Number.load(insert=True, value=value)
+
+    extracted = lambda: sorted(row['id'] for row in extracted_rows)
+    run = lambda **kwargs: model.run(sql_engine, sql_engine, run_async=run_async, **kwargs)
+    run(build=True)
+    assert extracted() == list(range(1, 11))
+    with Session(sql_engine) as session:
+        watermark = session.get(Watermark, model.etl_steps[0].uuid)
+        assert watermark and watermark.watermark == {'id': 10}
+
+    extracted_rows.clear()
+    with sql_engine.begin() as conn:
+        conn.execute(text('insert into watermark_source select generate_series(11, 15)'))
+    run()
+    assert extracted() == list(range(11, 16))
+
+    extracted_rows.clear()
+    run()
+    assert extracted() == []
+
+    extracted_rows.clear()
+    run(run_config=RunConfig(retry=True))
+    assert extracted() == list(range(1, 16))
+    with Session(sql_engine) as session:
+        assert sorted(session.exec(select(Number.value)).all()) == list(range(1, 16))
+        session.execute(text('drop table watermark_source'))
+        session.commit()
+
+
+@pytest.mark.parametrize('run_async', (False, True), ids=['sync', 'async'])
+def test_file_manifest(sql_engine: Engine, tmp_path, extracted_rows: List[Any], run_async: bool):
+    """Test that files unchanged since the last completed run are skipped before they are extracted."""
+    for i in range(3):
+        (tmp_path / f'{i}.txt').write_text(str(i))
+    with Model(name='test_manifest', registry=test_registry) as model:
+        with ETLStep('add_file_numbers'):
+            _, contents = FileExtractor(directory=tmp_path, skip_unchanged=True).results()
+            Number.load(insert=True, value=parse_number(contents).results())
+
+    extracted = lambda: sorted(
+        Path(row['file_name'] if isinstance(row, dict) else row[0]).name for row in extracted_rows
+    )
+    run = lambda **kwargs: model.run(sql_engine, sql_engine, run_async=run_async, **kwargs)
+    run(build=True)
+    assert extracted() == ['0.txt', '1.txt', '2.txt']
+
+    extracted_rows.clear()
+    run()
+    assert extracted() == []
+
+    extracted_rows.clear()
+    (tmp_path / '1.txt').write_text('10')
+    run()
+    assert extracted() == ['1.txt']
+
+    extracted_rows.clear()
+    run(run_config=RunConfig(retry=True))
+    assert extracted() == ['0.txt', '1.txt', '2.txt']
+    with Session(sql_engine) as session:
+        assert sorted(session.exec(select(Number.value)).all()) == [0, 1, 2, 10]
+
+
+@pytest.mark.parametrize('run_async', (False, True), ids=['sync', 'async'])
+def test_batched_python_extract(sql_engine: Engine, run_async: bool):
+    """Test that batches of rows and columns are loaded and hashed for repeat checking."""
+    with Model(name='test_batched', registry=test_registry) as model:
+        with ETLStep('add_batched_numbers'):
+            Number.load(insert=True, value=batched_numbers().results())
+
+    run = lambda **kwargs: model.run(sql_engine, sql_engine, run_async=run_async, **kwargs)
+    first_run = run(build=True)
+    assert first_run.status == 'completed'
+    with Session(sql_engine) as session:
+        assert sorted(session.exec(select(Number.value)).all()) == [0, 1, 2, 3]
+        etl_step_run = session.get(ETLStepRunEntity, (model.etl_steps[0].uuid, first_run.id))
+        # The rows repeated within the run are only counted and transformed once
+        assert etl_step_run and etl_step_run.unique_inputs == 4
+
+    second_run = run()
+    with Session(sql_engine) as session:
+        etl_step_run = session.get(ETLStepRunEntity, (model.etl_steps[0].uuid, second_run.id))
+        assert etl_step_run and etl_step_run.unique_inputs == 0
+
+
+@pytest.mark.parametrize('run_async', (False, True), ids=['sync', 'async'])
+def test_python_extract_globals(sql_engine: Engine, run_async: bool):
+    """Test that local runs call extract functions as defined, with access to their module globals."""
+    with Model(name='test_globals', registry=test_registry) as model:
+        with ETLStep('add_global_numbers'):
+            Number.load(insert=True, value=global_numbers().results())
+
+    run = model.run(sql_engine, sql_engine, build=True, run_async=run_async, remote=False)
+    assert run.status == 'completed'
+    with Session(sql_engine) as session:
+        assert sorted(session.exec(select(Number.value)).all()) == list(NUMBERS)
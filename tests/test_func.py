@@ -12,6 +12,12 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import traceback
+from inspect import getsource
+
+import pytest
+
+import dbgen.core.func as func_module
 from dbgen.core.func import Func, func_from_callable, get_callable_source_code
 
 
@@ -26,24 +32,20 @@ def no_arg_func() -> int:
 basic_lambda = lambda arg_1, arg_2, arg_3: f"{arg_1}->{arg_2}->{arg_3}"
 
 
-def test_function_parser(tmpdir):
+def test_function_parser():
     assert basic_function(1, 1, 1) == "1->1->1"
     source_code = get_callable_source_code(basic_function)
     assert isinstance(source_code, str)
-    p = tmpdir.mkdir("sub").join("test.py")
-    p.write(source_code)
-    func = Func.path_to_func(p)
+    func = Func.src_to_func(source_code, "<test basic_function>")
     assert func(1, 1, 1) == basic_function(1, 1, 1)
 
 
-def test_lambda_parser(tmpdir):
+def test_lambda_parser():
     assert basic_lambda(1, 1, 1) == "1->1->1"
-    source_code = get_callable_source_code(basic_function)
+    source_code = get_callable_source_code(basic_lambda)
     assert isinstance(source_code, str)
-    p = tmpdir.mkdir("sub").join("test.py")
-    p.write(source_code)
-    func = Func.path_to_func(p)
-    assert func(1, 1, 1) == basic_function(1, 1, 1)
+    func = Func.src_to_func(f"f = {source_code}", "<test basic_lambda>")
+    assert func(1, 1, 1) == basic_lambda(1, 1, 1)
 
 
 def test_func_from_callable():
@@ -68,3 +70,28 @@ def test_func_path_name():
     func = func_from_callable(no_arg_func)
     func.store_func(force=True)
     assert func._func != no_arg_func
+
+
+def failing_function() -> int:
+    raise ValueError("failed")
+
+
+def test_func_materialized_in_memory(monkeypatch):
+    """Assert that funcs are materialized without temp files and only once per process."""
+    monkeypatch.setattr(func_module, '_materialized_funcs', {})
+    func = func_from_callable(basic_function)
+    func.set_func(None)
+    assert func(1, 1, 1) == basic_function(1, 1, 1)
+    other_func = Func.parse_obj(func.dict())
+    assert other_func._from_src() is func._func
+    assert func_module._materialized_funcs == {func.hash: func._func}
+
+
+def test_func_materialized_traceback():
+    """Assert that tracebacks from materialized funcs still show their source."""
+    func = func_from_callable(failing_function)
+    func.store_func(force=True)
+    with pytest.raises(ValueError) as exc_info:
+        func()
+    assert 'raise ValueError("failed")' in ''.join(traceback.format_tb(exc_info.tb))
+    assert getsource(func._func) == func.src
@@ -0,0 +1,62 @@
+#   Copyright 2022 Modelyst LLC
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Track the import time of dbgen and its CLI with python -X importtime."""
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+
+# Dependencies that are slow to import and should only load once they are needed
+HEAVY_MODULES = {'networkx', 'sqlalchemy', 'sqlmodel', 'psycopg', 'cookiecutter'}
+
+
+def import_times(module: str) -> Dict[str, int]:
+    """Import a module in a fresh interpreter and return the cumulative import time (us) of every module loaded."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:') :].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize('module', ['dbgen', 'dbgen.cli.main', 'dbgen.configuration'])
+def test_no_heavy_imports(module: str):
+    """Test that importing dbgen and its CLI does not load the heavy dependencies."""
+    times = import_times(module)
+    loaded = sorted(name for name in times if name.split('.')[0] in HEAVY_MODULES)
+    assert not loaded, f"Importing {module} loaded {loaded}"
+
+
+@pytest.mark.parametrize('module', ['dbgen', 'dbgen.cli.main', 'dbgen.configuration', 'dbgen.core.etl_step'])
+def test_no_config_on_import(module: str):
+    """Test that importing dbgen modules does not read the config or set up the dbgen logger."""
+    check = f'import {module}, dbgen.configuration as c; assert c._config is None and c._logger is None'
+    subprocess.run([sys.executable, '-c', check], check=True)
+
+
+def test_cli_import_time(record_property):
+    """Record the CLI import time so that regressions show up in the test reports."""
+    times = import_times('dbgen.cli.main')
+    record_property('dbgen_cli_import_time_us', times['dbgen.cli.main'])
+    assert 'dbgen.core.model' not in times
@@ -26,7 +26,7 @@ from dbgen.core.args import Arg, Constant
 from dbgen.core.dependency import Dependency
 from dbgen.core.entity import Entity
 from dbgen.core.node.load import Load, LoadEntity
-from dbgen.utils.lists import broadcast
+from dbgen.utils.lists import broadcast, broadcast_columns
 from dbgen.utils.postgresql_load import get_statements
 from tests.strategies import (
     basic_insert_load_strat,
@@ -164,6 +164,20 @@ def test_empty_list_broadcast():
     assert all(map(lambda x: len(x) == 0, out))
 
 
+def test_broadcast_columns():
+    scalars = ([1], ("a",))
+    assert broadcast_columns(*scalars) == list(scalars)
+    values = [1, 2, 3]
+    columns = broadcast_columns([0], values, ("a",))
+    assert columns == [[0, 0, 0], [1, 2, 3], ["a", "a", "a"]]
+    # Full length columns are passed through without copying
+    assert columns[1] is values
+    assert broadcast_columns([], [1, 2]) == [[], []]
+    assert broadcast_columns() == []
+    with pytest.raises(ValueError):
+        broadcast_columns([1, 2, 3], (1, 2))
+
+
 def test_load_validation():
     good_kwargs = {
         "load_entity": LoadEntity(name="test", entity_class_str='', primary_key_name="id"),
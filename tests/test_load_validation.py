@@ -18,7 +18,9 @@ from pydantic import ValidationError
 from sqlalchemy.orm import registry
 
 from dbgen import Constant, Entity
+from dbgen.configuration import ValidationEnum
 from dbgen.exceptions import DBgenMissingInfo
+from dbgen.exceptions import ValidationError as DBgenValidationError
 
 validate_registry = registry()
 
@@ -33,36 +35,42 @@ class ValidateLoad(Entity, table=True, registry=validate_registry):
 load_entity = ValidateLoad._get_load_entity()
 
 
+def validate(data, validation=ValidationEnum.COERCE, insert=False):
+    """Validate a single row with the batch validator of the load entity."""
+    validator = load_entity._get_validator(list(data), validation, insert=insert)
+    return {key: val for key, (val,) in validator({key: [val] for key, val in data.items()}).items()}
+
+
 def test_simple_type_validation():
     """Simple strict type validation."""
     good_data = {'int_field': 1, 'str_field': '1'}
-    assert good_data == load_entity._strict_validate(good_data)
+    assert good_data == validate(good_data, ValidationEnum.STRICT)
     for bad_data in ({'str_field': 1}, {'int_field': '1'}):
-        # Check a coercible data passes _validate but not _strict_validate
-        assert good_data == load_entity._validate({**good_data, **bad_data})
+        # Check a coercible data passes coerced validation but not strict validation
+        assert good_data == validate({**good_data, **bad_data})
         with pytest.raises(ValidationError):
-            load_entity._strict_validate({**good_data, **bad_data})
+            validate({**good_data, **bad_data}, ValidationEnum.STRICT)
 
 
 def test_uncoercible_data():
     """Assert validation error is raised when uncoercible data is provided."""
     unocoercible = {'int_field': 'asdf', 'str_field': 'foo'}
     with pytest.raises(ValidationError):
-        load_entity._strict_validate(unocoercible)
+        validate(unocoercible, ValidationEnum.STRICT)
     with pytest.raises(ValidationError):
-        load_entity._validate(unocoercible)
+        validate(unocoercible)
 
 
 def test_required_data():
     """Test that missing data does not raise any errors."""
     missing_data = {'int_field': 1}
-    load_entity._strict_validate(missing_data, insert=False)
-    load_entity._validate(missing_data, insert=False)
+    validate(missing_data, ValidationEnum.STRICT, insert=False)
+    validate(missing_data, insert=False)
 
     with pytest.raises(ValidationError):
-        load_entity._strict_validate(missing_data, insert=True)
+        validate(missing_data, ValidationEnum.STRICT, insert=True)
     with pytest.raises(ValidationError):
-        load_entity._validate(missing_data, insert=True)
+        validate(missing_data, insert=True)
 
 
 # integration tests
@@ -92,3 +100,64 @@ def test_load_without_insert():
     assert len(out['validateload_id']) == 1
 
     ValidateLoad.load(insert=False, int_field=Constant(1), opt_field=Constant(1.0))
+
+
+def test_batch_validator_reports_all_rows():
+    """Test that the batch validator collects errors from every bad row."""
+    validator = load_entity._get_validator(('int_field', 'str_field'), ValidationEnum.COERCE)
+    assert validator is load_entity._get_validator(('int_field', 'str_field'), ValidationEnum.COERCE)
+    columns = {'int_field': [1, '2', 'a', 'b'], 'str_field': ['1', 2, '3', '4']}
+    with pytest.raises(ValidationError) as exc_info:
+        validator(columns)
+    assert [err['loc'] for err in exc_info.value.errors()] == [(2, 'int_field'), (3, 'int_field')]
+    assert validator({'int_field': [1, '2'], 'str_field': ['1', 2]}) == {
+        'int_field': [1, 2],
+        'str_field': ['1', '2'],
+    }
+
+
+def test_batch_validator_strict():
+    """Test that strict batch validation does not coerce and reports each bad value."""
+    validator = load_entity._get_validator(('int_field', 'str_field'), ValidationEnum.STRICT)
+    good = {'int_field': [1, 2], 'str_field': ['1', '2']}
+    assert validator(good) == good
+    with pytest.raises(ValidationError) as exc_info:
+        validator({'int_field': [1, '2'], 'str_field': [1, '2']})
+    assert {err['loc'] for err in exc_info.value.errors()} == {(1, 'int_field'), (0, 'str_field')}
+
+
+def test_batch_validator_insert():
+    """Test that missing required columns are only reported on insert."""
+    columns = {'int_field': [1, 2]}
+    assert load_entity._get_validator(('int_field',), ValidationEnum.COERCE)(columns) == columns
+    with pytest.raises(ValidationError):
+        load_entity._get_validator(('int_field',), ValidationEnum.COERCE, insert=True)(columns)
+
+
+def test_load_validation_off():
+    """Test that turning validation off skips all validation and coercion."""
+    load = ValidateLoad.load(str_field=Constant(1), int_field=Constant(1), validation='off')
+    rows_to_load = {load.hash: {}}
+    out = load.new_run({}, rows_to_load)
+    assert len(out['validateload_id']) == 1
+    assert list(rows_to_load[load.hash].values()) == [(1, 1)]
+    with pytest.raises(DBgenValidationError):
+        ValidateLoad.load(str_field=Constant(1), int_field=Constant(1), validation='strict').new_run(
+            {}, {load.hash: {}}
+        )
+
+
+def test_load_validates_broadcast_batch():
+    """Test that a broadcasted batch is coerced column-wise before loading."""
+    load = ValidateLoad.load(int_field=Constant(['1', 2, 3]), str_field=Constant('a'))
+    rows_to_load = {load.hash: {}}
+    out = load.new_run({}, rows_to_load)
+    assert len(out['validateload_id']) == 3
+    assert sorted(rows_to_load[load.hash].values()) == [(1, 'a'), (2, 'a'), (3, 'a')]
+
+
+def test_batch_hashes_match_row_hashes():
+    """Test that hashing a batch of columns matches hashing each row."""
+    columns = {'int_field': [1, 2, 3], 'str_field': ['a', 'b', 'c']}
+    rows = [dict(zip(columns, row)) for row in zip(*columns.values())]
+    assert load_entity._get_hashes(columns, 3) == [load_entity._get_hash(row) for row in rows]
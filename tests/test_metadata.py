@@ -16,8 +16,10 @@ from typing import cast
 
 import pytest
 import sqlalchemy
+from sqlalchemy import update
 from sqlmodel import Session, func, select, text
 
+import dbgen.core.run.etl_step_run as etl_step_run
 from dbgen.core.args import Constant
 from dbgen.core.etl_step import ETLStep
 from dbgen.core.metadata import ETLStepEntity, ETLStepRunEntity, RunEntity, meta_registry
@@ -102,6 +104,31 @@ def test_etl_step_insertion(connection, recreate_meta, etl_step: ETLStep):
         query_etl_step = ETLStep.deserialize(etl_step_dict)
         assert query_etl_step._id_dict() == etl_step._id_dict()
         assert query_etl_step.hash == etl_step.hash
+        etl_step_binary = sess.exec(select(ETLStepEntity.etl_step_binary)).one()
+        binary_etl_step = ETLStep.deserialize_binary(etl_step_binary, expected_uuid=etl_step.uuid)
+        assert binary_etl_step.hash == etl_step.hash
+
+
+@pytest.mark.database
+def test_load_etl_step(connection, recreate_meta, monkeypatch):
+    """Test that remote etl_steps are loaded from the binary form and cached per process."""
+    etl_step = etl_steps[-1]
+    etl_step_row = etl_step._get_etl_step_row()
+    with Session(connection) as sess:
+        sess.merge(etl_step_row)
+        sess.commit()
+    monkeypatch.setattr(etl_step_run, '_etl_step_cache', {})
+    monkeypatch.setattr(ETLStep, 'deserialize', None)
+    loaded = etl_step_run.load_etl_step(connection, etl_step.uuid)
+    assert loaded.hash == etl_step.hash
+    assert etl_step_run.load_etl_step(connection, etl_step.uuid) is loaded
+    # Without a valid binary form the etl_step is validated from its json
+    monkeypatch.undo()
+    monkeypatch.setattr(etl_step_run, '_etl_step_cache', {})
+    with Session(connection) as sess:
+        sess.execute(update(ETLStepEntity).values(etl_step_binary=b'corrupted'))
+        sess.commit()
+    assert etl_step_run.load_etl_step(connection, etl_step.uuid).hash == etl_step.hash
 
 
 @pytest.mark.database
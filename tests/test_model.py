@@ -12,11 +12,15 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import sys
+from typing import Optional
+
 import pytest
 from pydantic import ValidationError
 from sqlalchemy import exc, select, text
 from sqlalchemy.orm import registry
 
+from dbgen.core.compiled_model import CompiledModel, load_compiled_model
 from dbgen.core.dependency import Dependency
 from dbgen.core.entity import Entity
 from dbgen.core.etl_step import ETLStep
@@ -51,6 +55,38 @@ def test_basic_etl_step_graph():
     Model(name="test", etl_steps=[a_etl_step, b_etl_step, c_etl_step, d_etl_step])
 
 
+def test_indexed_etl_step_graph():
+    """Test that the indexed graph matches comparing every pair of etl_steps and is reused."""
+    etl_steps = [
+        ETLStep(
+            name=f"step_{i}",
+            additional_dependencies=Dependency(
+                tables_needed={f"t{i - 1}", f"t{i - 3}"},
+                columns_needed={f"t{i - 2}.col"},
+                tables_yielded={f"t{i}"},
+                columns_yielded={f"t{i}.col"},
+            ),
+        )
+        for i in range(20)
+    ]
+    model = Model(name="test", etl_steps=list(reversed(etl_steps)))
+    graph = model._etl_step_graph()
+    expected = {
+        (target.name, source.name)
+        for source in etl_steps
+        for target in etl_steps
+        if source is not target and source._get_dependency().test(target._get_dependency())
+    }
+    assert set(graph.edges) == expected
+    assert model._sort_graph() == etl_steps
+    assert model._etl_step_graph() is graph
+    # Changing an etl_step's dependencies rebuilds the graph
+    etl_steps[0].additional_dependencies = Dependency(tables_needed={"t19"}, tables_yielded={"t0"})
+    assert model._etl_step_graph() is not graph
+    with pytest.raises(ValueError):
+        model._sort_graph()
+
+
 @pytest.mark.database
 def test_model_sync(sql_engine):
     sa_registry = registry()
@@ -82,8 +118,93 @@ def test_model_sync(sql_engine):
         connection.execute(text('drop schema other_schema'))
 
 
+def test_model_sync_fingerprint(sql_engine, monkeypatch):
+    """Test that syncing an unchanged registry skips DDL and that changes only add what is missing."""
+    sa_registry = registry()
+
+    class FingerprintDummy(Entity, table=True, registry=sa_registry):
+        __tablename__ = 'fingerprint_dummy'
+        value: Optional[int]
+
+    model = Model(name="test_model", registry=sa_registry)
+    model.sync(sql_engine, sql_engine, build=True)
+    create_calls = []
+    create_metadata = Model.create_metadata
+    monkeypatch.setattr(
+        Model,
+        'create_metadata',
+        lambda self, *args: create_calls.append(args) or create_metadata(self, *args),
+    )
+    model.sync(sql_engine, sql_engine)
+    assert not create_calls
+
+    # Tables dropped outside of dbgen are recreated even though the fingerprint is unchanged
+    with sql_engine.begin() as conn:
+        conn.execute(text('drop table fingerprint_dummy'))
+    model.sync(sql_engine, sql_engine)
+    assert len(create_calls) == 1
+    with sql_engine.connect() as conn:
+        assert conn.execute(select(FingerprintDummy.id)).one_or_none() is None
+
+    # A new column is added to the existing table
+    new_registry = registry()
+
+    class NewFingerprintDummy(Entity, table=True, registry=new_registry):
+        __tablename__ = 'fingerprint_dummy'
+        value: Optional[int]
+        new_value: Optional[str]
+
+    Model(name="test_model", registry=new_registry).sync(sql_engine, sql_engine)
+    assert len(create_calls) == 2
+    with sql_engine.connect() as conn:
+        assert conn.execute(select(NewFingerprintDummy.new_value)).one_or_none() is None
+    model.drop_metadata(sql_engine, sa_registry.metadata)
+
+
 def test_empty_model(sql_engine):
     """Test the error produced when an empty model is run."""
     model = Model(name='test')
     with pytest.raises(ModelRunError, match='Model test has no ETLSteps'):
         model.run(sql_engine, sql_engine)
+
+
+def test_compiled_model(tmp_path):
+    """Test that a compiled model loads back without validation into an identical model."""
+    from tests.example.full_model import make_model
+
+    model_str = 'tests.example.full_model:make_model'
+    model = make_model()
+    model.settings.suffix = 'compiled'
+    path = tmp_path / 'compiled_model.json'
+    CompiledModel.compile(model, model_str).write(path)
+    compiled_model = load_compiled_model(path, model_str)
+    assert compiled_model is not None
+    assert compiled_model.hash == model.hash
+    assert compiled_model.registry is model.registry
+    assert type(compiled_model.settings) is type(model.settings)
+    assert compiled_model.settings == model.settings
+    assert [etl_step.name for etl_step in compiled_model._sort_graph()] == [
+        etl_step.name for etl_step in model._sort_graph()
+    ]
+    for etl_step, compiled_etl_step in zip(model.etl_steps, compiled_model.etl_steps):
+        assert [node.hash for node in compiled_etl_step._sort_nodes()] == [
+            node.hash for node in etl_step._sort_nodes()
+        ]
+        assert compiled_etl_step._get_dependency() == etl_step._get_dependency()
+    assert compiled_model._get_model_row().graph_json == model._get_model_row().graph_json
+
+    # A different model string or a changed source invalidates the artifact
+    assert load_compiled_model(path, 'tests.example.simple_model:make_model') is None
+    compiled = CompiledModel.read(path)
+    # The files defining the node classes and functions are tracked even outside the model's packages
+    assert sys.modules['dbgen.core.node.load'].__file__ in compiled.source_files
+    assert sys.modules['tests.example.full_model'].__file__ in compiled.source_files
+    compiled.source_files.append(str(tmp_path / 'missing.py'))
+    compiled.write(path)
+    assert load_compiled_model(path, model_str) is None
+    compiled.source_hash = 'stale'
+    compiled.write(path)
+    assert load_compiled_model(path, model_str) is None
+    # Corrupted artifacts are ignored
+    path.write_text(path.read_text().replace('add_parents', 'add_parent'))
+    assert load_compiled_model(path, model_str) is None
@@ -12,15 +12,20 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import logging
+
 import pytest
 from hypothesis import given
 from pydantic import ValidationError
 
 from dbgen.core.args import Arg, Constant
 from dbgen.core.decorators import transform
+from dbgen.core.etl_step import ETLStep
 from dbgen.core.func import Environment, Func, func_from_callable
 from dbgen.core.node.transforms import PythonTransform
+from dbgen.core.run.utilities import RunConfig
 from dbgen.exceptions import DBgenMissingInfo, DBgenPythonTransformError, NodeUsedAsInput
+from dbgen.utils.log import StdoutCapture
 from tests.example_functions import nonary, ternary
 from tests.strategies import pyblock_strat
 
@@ -131,3 +136,44 @@ def test_python_transform_input():
         second_func(x)
     with pytest.raises(ValidationError):
         second_func({})
+
+
+def printer(x):
+    print(f'printed {x}')
+    return x
+
+
+@pytest.mark.parametrize(
+    'policy,sample_rate,expected_captures',
+    [
+        (StdoutCapture.ALWAYS, 100, 5),
+        (StdoutCapture.OFF, 100, 0),
+        (StdoutCapture.BATCH, 100, 0),
+        (StdoutCapture.SAMPLED, 2, 3),
+    ],
+)
+def test_stdout_capture_policy(policy, sample_rate, expected_captures, caplog, capsys):
+    """Only the calls selected by the capture policy have their stdout logged."""
+    pb = PythonTransform(function=printer, inputs=[Constant(1)])
+    run_config = RunConfig(capture_stdout=policy, stdout_sample_rate=sample_rate)
+    with caplog.at_level(logging.DEBUG, logger=pb.function.stdout_logger.name):
+        for _ in range(5):
+            assert pb.run({}, run_config) == {'out': 1}
+    captured = [record for record in caplog.records if record.name == pb.function.stdout_logger.name]
+    assert len(captured) == expected_captures
+    assert capsys.readouterr().out.count('printed 1') == 5 - expected_captures
+
+
+def test_stdout_capture_batch(caplog, capsys):
+    """Batch capture logs the stdout of the whole batch once on the ETLStep's logger."""
+    with ETLStep(name='printer') as etl_step:
+        PythonTransform(function=printer, inputs=[Constant(1)])
+    run_config = RunConfig(capture_stdout=StdoutCapture.BATCH)
+    batch = [(None, {}) for _ in range(3)]
+    stdout_logger = etl_step._logger.getChild('stdout')
+    with caplog.at_level(logging.DEBUG, logger=stdout_logger.name):
+        etl_step.transform_batch(batch, run_config)
+    captured = [record for record in caplog.records if record.name == stdout_logger.name]
+    assert len(captured) == 1
+    assert captured[0].getMessage().count('printed 1') == 3
+    assert capsys.readouterr().out == ''
@@ -25,6 +25,16 @@ def simple_extract(n: int = 10) -> Tuple[int, str]:
         yield i, str(i)
 
 
+@extract(outputs=['n', 'str_n'], batched=True)
+def batched_extract(n: int = 10, batch_size: int = 3):
+    for start in range(0, n, batch_size):
+        batch = range(start, min(start + batch_size, n))
+        if start % 2:
+            yield [(i, str(i)) for i in batch]
+        else:
+            yield {'n': list(batch), 'str_n': list(map(str, batch))}
+
+
 @transform
 def simple_transform(n: int):
     return n + 1
@@ -51,6 +61,24 @@ def test_basic_python_extract_initialization_with_arg():
     assert test_run.status == 'completed'
 
 
+def test_batched_python_extract():
+    """Test that batches of rows and columns are flattened into the same rows as an unbatched extract."""
+    with ETLStep(name='test') as step:
+        extractor = batched_extract(10)
+        simple_transform(extractor['n']).results()
+
+    node = step.extract
+    assert node.yields_batches()
+    with node:
+        assert [node.process_row(row) for row in node.extract()] == [
+            {'n': i, 'str_n': str(i)} for i in range(10)
+        ]
+        assert sum(len(node.process_batch(batch)) for batch in node.extract_batches()) == 10
+    test_run = ETLStepTestRunner().test(step)
+    assert test_run.number_of_extracted_rows == 10
+    assert test_run.status == 'completed'
+
+
 class ModelSettings(BaseModelSettings):
     n_value: int = 10
 
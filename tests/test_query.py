@@ -12,6 +12,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 import pytest
+from sqlalchemy import event
 
 from dbgen.core.args import Arg
 from dbgen.core.node.query import BaseQuery, Connection, ExternalQuery
@@ -28,8 +29,9 @@ def test_base_query(seed_db):
     with engine.connect() as conn:
         ext.set_connection(connection=conn)
         output = list(ext.extract())
-        assert len(output)
-        assert all(map(lambda x: "test" in x, output))
+        # Rows whose columns match the outputs are extracted as tuples
+        assert output == [(1,)]
+        assert ext.process_row(output[0]) == {"test": 1}
         assert isinstance(ext["test"], Arg)
 
 
@@ -37,7 +39,7 @@ def test_base_query(seed_db):
 def test_external_connection(seed_db):
     ext = ExternalQuery(query="Select 1 as test", outputs=["test"], connection=test_connection)
     with ext:
-        output = list(ext.extract())
+        output = list(map(ext.process_row, ext.extract()))
         assert len(output)
         assert all(map(lambda x: "test" in x, output))
     ext = ExternalQuery(
@@ -61,10 +63,72 @@ def test_external_connection_streaming(seed_db):
     )
     ext._yield_per = 10
     with ext:
-        for row in ext.extract():
+        for row in map(ext.process_row, ext.extract()):
             assert "name" in row
     with ext:
         ext._yield_per = 10
-        output = list(ext.extract())
+        output = list(map(ext.process_row, ext.extract()))
         assert len(output) == 100
         assert all(map(lambda x: "name" in x, output))
+
+
+@pytest.mark.database
+def test_query_length(seed_db):
+    """Test the exact and estimated lengths of a query."""
+    ext = BaseQuery(
+        query="Select name from users where id <= :max_id", outputs=["name"], params={'max_id': 10}
+    )
+    with test_engine.connect() as conn:
+        ext.set_connection(connection=conn)
+        assert ext.length() == 10
+        estimate = ext.estimated_length()
+        assert isinstance(estimate, int) and estimate > 0
+    with test_engine.connect() as conn:
+        assert ext.length(connection=conn) == 10
+        assert isinstance(ext.estimated_length(connection=conn), int)
+
+
+@pytest.mark.database
+def test_query_rows_mapped_to_outputs(seed_db):
+    """Test that extracted tuples follow the order of the outputs rather than the query's columns."""
+    ext = BaseQuery(query="Select id, name from users order by id asc", outputs=["name", "id"])
+    with test_engine.connect() as conn:
+        ext.set_connection(connection=conn, yield_per=7)
+        output = list(ext.extract())
+    assert len(output) == 100
+    assert output[0] == ("user_0", 1)
+    assert ext.process_row(output[0]) == {"name": "user_0", "id": 1}
+
+
+@pytest.mark.database
+def test_query_keyset_pages(seed_db):
+    """Test that keyset paginated queries extract every row in key order starting after the checkpoint."""
+    ext = BaseQuery(query="Select id, name from users", outputs=["id", "name"])
+    with test_engine.connect() as conn:
+        statements = []
+        event.listen(conn, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        ext.set_connection(connection=conn, yield_per=7)
+        ext.set_keyset(["id"])
+        assert [row[0] for row in ext.extract()] == list(range(1, 101))
+        # The ordered query is executed once and streamed rather than re-run for each page
+        assert len(statements) == 1
+        ext.set_keyset(["id"], checkpoint={"id": 90})
+        output = list(ext.extract())
+    assert [row[0] for row in output] == list(range(91, 101))
+    assert ext.get_checkpoint(ext.process_row(output[-1])) == {"id": 100}
+
+
+@pytest.mark.database
+def test_query_watermark(seed_db):
+    """Test that only the rows within the watermark range are extracted and counted."""
+    ext = BaseQuery(query="Select id, name from users", outputs=["id", "name"])
+    with test_engine.connect() as conn:
+        ext.set_connection(connection=conn, yield_per=7)
+        assert ext.max_watermark("id") == 100
+        ext.set_watermark("id", low=90, high=95)
+        assert sorted(row[0] for row in ext.extract()) == [91, 92, 93, 94, 95]
+        assert ext.length() == 5
+        ext.set_keyset(["id"])
+        assert [row[0] for row in ext.extract()] == [91, 92, 93, 94, 95]
+        ext.set_watermark("id", low=95)
+        assert ext.length() == 5
@@ -13,7 +13,7 @@
 #   limitations under the License.
 
 from dbgen.core.etl_step import ETLStep
-from dbgen.core.run.utilities import RunConfig
+from dbgen.core.run.utilities import RowCount, RunConfig
 
 basic_run_config = RunConfig()
 run_config = RunConfig(
@@ -76,3 +76,10 @@ def test_conflicts():
     """Test that steps that are both excluded and included are not run."""
     step = ETLStep(name='z', tags=['included', 'excluded'])
     assert not run_config.should_etl_step_run(step)
+
+
+def test_row_count_mode():
+    assert basic_run_config.row_count == RowCount.EXACT
+    assert RunConfig(row_count='estimate').row_count == RowCount.ESTIMATE
+    # skip_row_count takes precedence over the row count mode
+    assert RunConfig(skip_row_count=True, row_count='lazy').row_count == RowCount.SKIP
@@ -13,13 +13,16 @@
 #   limitations under the License.
 
 from datetime import date, datetime
+from typing import List
 from uuid import UUID
 
+import pytest
 from hypothesis import HealthCheck, given, settings
 from hypothesis import strategies as st
 
 from dbgen.core.base import Base
 from dbgen.core.node.query import BaseQuery, Dependency
+from dbgen.exceptions import SerializationError
 from tests.strategies import (
     arg_like_strat,
     env_strat,
@@ -131,3 +134,35 @@ class DummyClass2(Base):
 @given(st.builds(DummyClass2))
 def test_non_builtin_serialization_reverse(instance: DummyClass2):
     reverse_serial(instance)
+
+
+def test_binary_serialization():
+    dummy = DummyClass(key_1="1", key_2=2, ex_key="1")
+    data = dummy.serialize_binary()
+    assert DummyClass.deserialize_binary(data, expected_uuid=dummy.uuid).dict() == dummy.dict()
+    with pytest.raises(SerializationError):
+        DummyClass.deserialize_binary(data, expected_uuid=DummyClass(key_1="2", key_2=2, ex_key="1").uuid)
+    with pytest.raises(SerializationError):
+        DummyClass.deserialize_binary(data[:-1] + b'0')
+    with pytest.raises(SerializationError):
+        DummyClass2.deserialize_binary(data)
+
+
+class DummySettings(Base):
+    key_1: str
+    setting: int = 0
+    _settings_ = {'setting'}
+    _hashexclude_ = _settings_
+
+
+class DummyParent(Base):
+    children: List[DummySettings]
+
+
+def test_nested_settings_serialization():
+    """Test that settings of nested models are serialized even though they are left out of the hash."""
+    parent = DummyParent(children=[DummySettings(key_1="1", setting=3)])
+    assert parent.hash == DummyParent(children=[DummySettings(key_1="1")]).hash
+    assert DummyParent.deserialize(parent.serialize()).children[0].setting == 3
+    assert DummyParent.deserialize_trusted(parent.serialize()).children[0].setting == 3
+    assert DummySettings.deserialize(DummySettings(key_1="1", setting=3).serialize()).setting == 3
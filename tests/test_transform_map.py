@@ -12,9 +12,11 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import pytest
+
 from dbgen import Constant, ETLStep
 from dbgen.core.decorators import transform
-from dbgen.core.node.transforms import MapTransform
+from dbgen.core.node.transforms import MapExecutor, MapTransform
 from dbgen.testing import ETLStepTestRunner
 
 
@@ -40,3 +42,45 @@ def test_map_etl_step():
         func.map(added, added, z=3)
 
     ETLStepTestRunner(log_level='DEBUG').test(test)
+
+
+def add_and_negate(x: int, y: int = 0):
+    return x + y, -x
+
+
+@pytest.mark.parametrize('executor', list(MapExecutor))
+def test_map_executors(executor):
+    """All executors produce the same transposed outputs in input order."""
+    python_transform = MapTransform(
+        inputs=[Constant(list(range(100)))],
+        kwargs={'y': Constant(1)},
+        function=add_and_negate,
+        outputs=['added', 'negated'],
+        executor=executor,
+        max_workers=2,
+        chunksize=7,
+    )
+    output = python_transform.run({})
+    assert output == {'added': tuple(range(1, 101)), 'negated': tuple(-x for x in range(100))}
+
+
+def test_map_executor_not_hashed():
+    """Execution settings do not change the hash of the MapTransform."""
+    kwargs = dict(inputs=[Constant([1, 2])], function=transform_function)
+    serial = MapTransform(**kwargs)
+    threaded = MapTransform(**kwargs, executor=MapExecutor.THREAD, max_workers=4, chunksize=2)
+    assert serial.hash == threaded.hash
+
+
+def add(x: int, y: int):
+    return x + y
+
+
+def test_map_broadcasts_scalars():
+    python_transform = MapTransform(inputs=[Constant([1, 2, 3]), Constant(10)], function=add)
+    assert python_transform.run({}) == {'out': (11, 12, 13)}
+
+
+def test_map_empty_input():
+    python_transform = MapTransform(inputs=[Constant([])], function=transform_function)
+    assert python_transform.run({}) == {'out': ()}